@@ -2,6 +2,7 @@ from django.contrib import admin
 from .models import (Subject, FacultySubject, Attendance, 
                     InternalMark, Assignment, AssignmentSubmission, 
                     StudyMaterial)
+from .utils import refresh_attendance_summaries
 
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
@@ -19,6 +20,24 @@ class AttendanceAdmin(admin.ModelAdmin):
     list_display = ('student', 'subject', 'date', 'hour', 'present')
     list_filter = ('date', 'hour', 'present', 'subject')
     search_fields = ('student__user__username', 'subject__name')
+    
+    # Keep the AttendanceSummary rollup in step with admin edits
+    def save_model(self, request, obj, form, change):
+        pairs = {(obj.student_id, obj.subject_id)}
+        if change and form.initial.get('student') and form.initial.get('subject'):
+            pairs.add((form.initial['student'], form.initial['subject']))
+        super().save_model(request, obj, form, change)
+        refresh_attendance_summaries(pairs)
+    
+    def delete_model(self, request, obj):
+        pair = (obj.student_id, obj.subject_id)
+        super().delete_model(request, obj)
+        refresh_attendance_summaries([pair])
+    
+    def delete_queryset(self, request, queryset):
+        pairs = set(queryset.values_list('student_id', 'subject_id').distinct())
+        super().delete_queryset(request, queryset)
+        refresh_attendance_summaries(pairs)
 
 @admin.register(InternalMark)
 class InternalMarkAdmin(admin.ModelAdmin):
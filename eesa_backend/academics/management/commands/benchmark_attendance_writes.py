@@ -0,0 +1,175 @@
+# academics/management/commands/benchmark_attendance_writes.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+from django.utils import timezone
+from academics.models import Subject, FacultySubject
+from academics.utils import upsert_attendance
+from users.counters import increment
+from users.models import CustomUser, Student, Faculty
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'BENCH'
+
+class Command(BaseCommand):
+    help = ('Simulate many faculty marking attendance at the same moment and report '
+            'throughput, latency and lock errors. Creates its own BENCH* users, subjects '
+            'and students and deletes them afterwards; run it on a staging copy')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--faculty',
+            type=int,
+            default=50,
+            help='Number of faculty marking concurrently (one thread each)',
+        )
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=60,
+            help='Students on each faculty\'s roster',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=3,
+            help='Attendance slots each faculty marks',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the benchmark data instead of deleting it',
+        )
+
+    def handle(self, *args, **options):
+        if Faculty.objects.filter(faculty_id__startswith=PREFIX).exists():
+            raise CommandError(
+                f'{PREFIX} data from an earlier run exists; delete users named '
+                f'{PREFIX.lower()}_* first'
+            )
+
+        self.stdout.write(
+            f'Database: {connection.vendor}, pragmas: {settings.SQLITE_PRAGMAS or "none"}, '
+            f'serialized writes: {settings.SQLITE_SERIALIZE_WRITES}'
+        )
+        self.stdout.write(
+            f'Creating {options["faculty"]} faculty with {options["students"]} students each...'
+        )
+        pairs = self.create_data(options['faculty'], options['students'])
+
+        try:
+            latencies, failures, elapsed = self.run(pairs, options['rounds'])
+        finally:
+            if not options['keep']:
+                self.delete_data()
+
+        self.write_summary(latencies, failures, elapsed, options)
+
+    def create_data(self, faculty_count, student_count):
+        """
+        Bulk insert one subject, faculty member and batch of students per
+        simulated faculty. Returns [(faculty, subject, student ids)].
+        """
+        today = timezone.now().date()
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f'{PREFIX.lower()}_f{i}', user_type='faculty', password='!')
+            for i in range(faculty_count)
+        ] + [
+            CustomUser(username=f'{PREFIX.lower()}_s{i}_{j}', user_type='student', password='!')
+            for i in range(faculty_count) for j in range(student_count)
+        ])
+        faculty = Faculty.objects.bulk_create([
+            Faculty(user=users[i], faculty_id=f'{PREFIX}F{i:04d}', department=PREFIX,
+                    designation='Assistant Professor', joining_date=today)
+            for i in range(faculty_count)
+        ])
+        subjects = Subject.objects.bulk_create([
+            Subject(code=f'{PREFIX}{i:04d}', name=f'Benchmark {i}', semester=1)
+            for i in range(faculty_count)
+        ])
+        FacultySubject.objects.bulk_create([
+            FacultySubject(faculty=faculty[i], subject=subjects[i], batch=f'{PREFIX}-{i}')
+            for i in range(faculty_count)
+        ])
+        students = Student.objects.bulk_create([
+            Student(user=users[faculty_count + i * student_count + j],
+                    student_id=f'{PREFIX}{i:04d}{j:04d}', enrollment_year=today.year,
+                    current_semester=1, batch=f'{PREFIX}-{i}')
+            for i in range(faculty_count) for j in range(student_count)
+        ])
+        # bulk_create skips the counter signals; deleting the data decrements them
+        increment({
+            'faculty': len(faculty), 'subjects': len(subjects), 'students': len(students)
+        })
+
+        return [
+            (faculty[i], subjects[i],
+             [student.pk for student in students[i * student_count:(i + 1) * student_count]])
+            for i in range(faculty_count)
+        ]
+
+    def delete_data(self):
+        self.stdout.write('Deleting benchmark data...')
+        Subject.objects.filter(code__startswith=PREFIX).delete()
+        CustomUser.objects.filter(username__startswith=f'{PREFIX.lower()}_').delete()
+
+    def run(self, pairs, rounds):
+        """Start every faculty thread at once; returns (latencies, failures, seconds)"""
+        latencies = []
+        failures = []
+        lock = threading.Lock()
+        start = threading.Barrier(len(pairs))
+        date = timezone.now().date()
+
+        def mark(faculty, subject, student_ids):
+            start.wait()
+            try:
+                for hour in range(1, rounds + 1):
+                    marks = {student_id: (student_id + hour) % 5 != 0 for student_id in student_ids}
+                    began = time.perf_counter()
+                    try:
+                        upsert_attendance(faculty, subject, date, hour, marks)
+                    except OperationalError as e:
+                        with lock:
+                            failures.append(str(e))
+                        continue
+                    with lock:
+                        latencies.append(time.perf_counter() - began)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=mark, args=pair) for pair in pairs]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, failures, time.perf_counter() - began
+
+    def write_summary(self, latencies, failures, elapsed, options):
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        marks = len(latencies) * options['students']
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(f'Bulk marks completed: {len(latencies)}')
+        self.stdout.write(f'Attendance rows written: {marks}')
+        self.stdout.write(f'Elapsed: {elapsed:.2f}s ({len(latencies) / elapsed:.1f} bulk marks/s, '
+                          f'{marks / elapsed:.0f} rows/s)')
+        if latencies:
+            self.stdout.write(f'Latency p50: {percentile(0.5):.0f}ms, p95: {percentile(0.95):.0f}ms, '
+                              f'max: {latencies[-1] * 1000:.0f}ms')
+        if failures:
+            self.stdout.write(self.style.ERROR(f'Failed bulk marks: {len(failures)} ({failures[0]})'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Failed bulk marks: 0'))
+        self.stdout.write('='*50 + '\n')
+
+        logger.info(f'Attendance write benchmark: {len(latencies)} bulk marks in {elapsed:.2f}s, '
+                    f'{len(failures)} failed')
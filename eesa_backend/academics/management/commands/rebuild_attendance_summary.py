@@ -0,0 +1,91 @@
+# academics/management/commands/rebuild_attendance_summary.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from academics.models import Attendance, AttendanceSummary
+from academics.utils import attendance_rollup
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Rebuild the attendance rollup table from scratch and verify it against Attendance'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='Only compare the rollup table with Attendance, without rebuilding',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of summary rows written per INSERT',
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            self.rebuild(options['batch_size'])
+
+        mismatches = self.verify()
+
+        self.stdout.write('\n' + '='*50)
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'Attendance summary mismatches: {mismatches}'))
+            self.stdout.write('='*50 + '\n')
+            raise CommandError(
+                'Attendance summary does not match attendance records. '
+                'Run without --verify-only to rebuild it.'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Attendance summary matches attendance records'))
+        self.stdout.write('='*50 + '\n')
+
+    def rebuild(self, batch_size):
+        self.stdout.write('Rebuilding attendance summary...')
+
+        with transaction.atomic():
+            AttendanceSummary.objects.all().delete()
+            created = AttendanceSummary.objects.bulk_create(
+                (AttendanceSummary(**row)
+                 for row in attendance_rollup(Attendance.objects.all()).iterator()),
+                batch_size=batch_size,
+            )
+
+        self.stdout.write(f'Summary rows written: {len(created)}')
+        logger.info(f'Rebuilt attendance summary with {len(created)} rows')
+
+    def verify(self):
+        self.stdout.write('Verifying attendance summary...')
+
+        expected = {
+            (row['student_id'], row['subject_id']): (row['total'], row['present'])
+            for row in attendance_rollup(Attendance.objects.all()).iterator()
+        }
+
+        mismatches = 0
+        summaries = AttendanceSummary.objects.values_list(
+            'student_id', 'subject_id', 'total', 'present'
+        )
+        for student_id, subject_id, total, present in summaries.iterator():
+            counts = expected.pop((student_id, subject_id), None)
+            if counts != (total, present):
+                mismatches += 1
+                self.stdout.write(self.style.WARNING(
+                    f'Student {student_id}, subject {subject_id}: '
+                    f'summary {present}/{total}, expected '
+                    f'{"none" if counts is None else f"{counts[1]}/{counts[0]}"}'
+                ))
+
+        # Pairs with attendance but no summary row
+        for (student_id, subject_id), (total, present) in expected.items():
+            mismatches += 1
+            self.stdout.write(self.style.WARNING(
+                f'Student {student_id}, subject {subject_id}: '
+                f'summary missing, expected {present}/{total}'
+            ))
+
+        if mismatches:
+            logger.error(f'Attendance summary verification found {mismatches} mismatches')
+
+        return mismatches
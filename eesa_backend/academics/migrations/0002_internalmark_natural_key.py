@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:08
+
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def remove_duplicate_marks(apps, schema_editor):
+    """Keep only the most recent mark for each natural key before enforcing it"""
+    InternalMark = apps.get_model('academics', 'InternalMark')
+    duplicates = (
+        InternalMark.objects
+        .values('student', 'subject', 'faculty', 'test_name')
+        .annotate(latest_id=Max('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        InternalMark.objects.filter(
+            student=duplicate['student'],
+            subject=duplicate['subject'],
+            faculty=duplicate['faculty'],
+            test_name=duplicate['test_name'],
+        ).exclude(id=duplicate['latest_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0001_initial'),
+        ('users', '0003_alter_customuser_date_joined'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_marks, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='internalmark',
+            unique_together={('student', 'subject', 'faculty', 'test_name')},
+        ),
+    ]
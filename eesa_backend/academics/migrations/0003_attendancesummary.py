@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_attendance_summary(apps, schema_editor):
+    Attendance = apps.get_model('academics', 'Attendance')
+    AttendanceSummary = apps.get_model('academics', 'AttendanceSummary')
+    rollup = (
+        Attendance.objects
+        .values('student_id', 'subject_id')
+        .annotate(total=Count('id'), present=Count('id', filter=Q(present=True)))
+        .order_by()
+    )
+    AttendanceSummary.objects.bulk_create(
+        (AttendanceSummary(**row) for row in rollup.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0002_internalmark_natural_key'),
+        ('users', '0003_alter_customuser_date_joined'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='users.student')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='academics.subject')),
+            ],
+            options={
+                'unique_together': {('student', 'subject')},
+            },
+        ),
+        migrations.RunPython(populate_attendance_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0003_attendancesummary'),
+        ('users', '0008_personsearchentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['batch', '-created_at'], name='academics_a_batch_1e3a2a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', '-date', '-hour'], name='academics_a_student_3822b2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['faculty', '-date', '-hour'], name='academics_a_faculty_515701_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facultysubject',
+            index=models.Index(fields=['batch'], name='academics_f_batch_ddf613_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studymaterial',
+            index=models.Index(fields=['batch', '-created_at'], name='academics_s_batch_5137b1_idx'),
+        ),
+    ]
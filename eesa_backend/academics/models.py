@@ -17,6 +17,9 @@ class FacultySubject(models.Model):
     
     class Meta:
         unique_together = ('faculty', 'subject', 'batch')
+        indexes = [
+            models.Index(fields=['batch']),
+        ]
     
     def __str__(self):
         return f"{self.faculty.user.username} - {self.subject.name} - {self.batch}"
@@ -31,11 +34,33 @@ class Attendance(models.Model):
     
     class Meta:
         unique_together = ('student', 'subject', 'date', 'hour')
+        indexes = [
+            models.Index(fields=['student', '-date', '-hour']),
+            models.Index(fields=['faculty', '-date', '-hour']),
+        ]
     
     def __str__(self):
         status = "Present" if self.present else "Absent"
         return f"{self.student.user.username} - {self.subject.name} - Hour {self.hour} - {status}"
 
+class AttendanceSummary(models.Model):
+    """Per student/subject attendance rollup, kept in step with Attendance writes"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_summaries')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='attendance_summaries')
+    total = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('student', 'subject')
+    
+    @property
+    def percentage(self):
+        return round(self.present / self.total * 100, 2) if self.total else 0
+    
+    def __str__(self):
+        return f"{self.student.user.username} - {self.subject.name} - {self.present}/{self.total}"
+
 class InternalMark(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='internal_marks')
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='internal_marks')
@@ -45,6 +70,9 @@ class InternalMark(models.Model):
     obtained_mark = models.FloatField()
     remarks = models.TextField(blank=True, null=True)
     
+    class Meta:
+        unique_together = ('student', 'subject', 'faculty', 'test_name')
+    
     def __str__(self):
         return f"{self.student.user.username} - {self.subject.name} - {self.test_name}"
 
@@ -65,6 +93,11 @@ class Assignment(models.Model):
     file = models.FileField(upload_to='assignments/', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['batch', '-created_at']),
+        ]
+    
     def __str__(self):
         return f"{self.title} - {self.subject.name}"
 
@@ -88,5 +121,10 @@ class StudyMaterial(models.Model):
     file = models.FileField(upload_to='study_materials/')
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['batch', '-created_at']),
+        ]
+    
     def __str__(self):
         return f"{self.title} - {self.subject.name} - {self.batch}"
\ No newline at end of file
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import (Subject, FacultySubject, Attendance, InternalMark, 
+from .models import (Subject, FacultySubject, Attendance, AttendanceSummary, InternalMark, 
                     Assignment, AssignmentSubmission, StudyMaterial)
 
 class SubjectSerializer(serializers.ModelSerializer):
@@ -25,6 +25,16 @@ class AttendanceSerializer(serializers.ModelSerializer):
         fields = ['id', 'student', 'student_name', 'subject', 'subject_name', 
                  'faculty', 'faculty_name', 'date', 'hour', 'present']
 
+class AttendanceSummarySerializer(serializers.ModelSerializer):
+    student_name = serializers.ReadOnlyField(source='student.user.get_full_name')
+    subject_name = serializers.ReadOnlyField(source='subject.name')
+    percentage = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = AttendanceSummary
+        fields = ['student', 'student_name', 'subject', 'subject_name', 
+                 'total', 'present', 'percentage']
+
 class InternalMarkSerializer(serializers.ModelSerializer):
     student_name = serializers.ReadOnlyField(source='student.user.get_full_name')
     subject_name = serializers.ReadOnlyField(source='subject.name')
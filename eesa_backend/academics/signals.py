@@ -0,0 +1,35 @@
+# academics/signals.py
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from users.utils import invalidate_student_dashboards, invalidate_batch_dashboards
+from .models import InternalMark, Assignment, AssignmentSubmission
+
+@receiver(post_save, sender=InternalMark)
+@receiver(post_delete, sender=InternalMark)
+@receiver(post_save, sender=AssignmentSubmission)
+@receiver(post_delete, sender=AssignmentSubmission)
+def invalidate_student_dashboard(sender, instance, **kwargs):
+    """
+    Drop the cached dashboard of the student the record belongs to
+    """
+    invalidate_student_dashboards([instance.student_id])
+
+@receiver(post_init, sender=Assignment)
+def remember_assignment_batch(sender, instance, **kwargs):
+    """
+    Keep the loaded batch so moving an assignment also expires the old batch
+    """
+    # Reading a deferred field here would cost a query per loaded row
+    if 'batch' not in instance.get_deferred_fields():
+        instance._loaded_batch = instance.batch
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def invalidate_batch_dashboard(sender, instance, **kwargs):
+    """
+    Assignment totals are per batch, so expire every dashboard in the
+    assignment's batch and in the batch it was loaded with
+    """
+    for batch in {instance.batch, getattr(instance, '_loaded_batch', instance.batch)}:
+        invalidate_batch_dashboards(batch)
+    instance._loaded_batch = instance.batch
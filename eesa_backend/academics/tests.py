@@ -1,3 +1,226 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import CustomUser
+from users.testing import create_faculty, create_students
+from .models import (Subject, FacultySubject, Attendance, AttendanceSummary, InternalMark,
+                     Assignment, AssignmentSubmission, StudyMaterial)
+from .utils import upsert_attendance
 
-# Create your tests here.
+
+class AttendanceBulkMarkTests(TestCase):
+    """bulk_mark costs the same number of queries for any roster size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.faculty = create_faculty()
+        cls.subject = Subject.objects.create(code='EE101', name='Circuits', semester=1)
+        FacultySubject.objects.create(faculty=cls.faculty, subject=cls.subject, batch='2022-2026')
+        cls.students = create_students(60)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.faculty.user)
+
+    def bulk_mark(self, students, hour):
+        return self.client.post('/api/academics/attendance/bulk_mark/', {
+            'subject': self.subject.pk,
+            'date': timezone.now().date().isoformat(),
+            'hour': hour,
+            'attendance': [{'student': student.pk, 'present': True} for student in students],
+        }, format='json')
+
+    def test_query_count_is_flat(self):
+        # Warm up the per-request lookups that are cached after the first call
+        self.bulk_mark(self.students[:1], hour=1)
+
+        with self.assertNumQueries(11):
+            response = self.bulk_mark(self.students[:1], hour=2)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(11):
+            response = self.bulk_mark(self.students, hour=3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 60)
+        self.assertTrue(all(result['created'] for result in response.data['results']))
+
+    def test_remarking_updates_in_place(self):
+        self.bulk_mark(self.students, hour=1)
+        response = self.client.post('/api/academics/attendance/bulk_mark/', {
+            'subject': self.subject.pk,
+            'date': timezone.now().date().isoformat(),
+            'hour': 1,
+            'attendance': [{'student': student.pk, 'present': False} for student in self.students],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any(result['created'] for result in response.data['results']))
+        self.assertEqual(Attendance.objects.count(), 60)
+        self.assertFalse(Attendance.objects.filter(present=True).exists())
+        self.assertEqual(
+            list(AttendanceSummary.objects.values_list('total', 'present').distinct()), [(1, 0)]
+        )
+
+
+class AttendanceUpsertTests(TestCase):
+    """upsert_attendance writes one row per (student, subject, date, hour)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.faculty = create_faculty()
+        cls.subject = Subject.objects.create(code='EE101', name='Circuits', semester=1)
+        cls.students = create_students(3)
+
+    def test_same_slot_updates_the_existing_rows(self):
+        today = timezone.now().date()
+        first = upsert_attendance(self.faculty, self.subject, today, 1,
+                                  {student.pk: True for student in self.students[:2]})
+        second = upsert_attendance(self.faculty, self.subject, today, 1,
+                                   {student.pk: False for student in self.students})
+
+        self.assertTrue(all(result['created'] for result in first))
+        self.assertEqual([result['created'] for result in second], [False, False, True])
+        # Updated rows keep their ids
+        self.assertEqual({result['id'] for result in first},
+                         {result['id'] for result in second[:2]})
+        self.assertEqual(Attendance.objects.count(), 3)
+        self.assertFalse(Attendance.objects.filter(present=True).exists())
+
+        # Another hour is another slot
+        upsert_attendance(self.faculty, self.subject, today, 2, {self.students[0].pk: True})
+        self.assertEqual(Attendance.objects.count(), 4)
+        self.assertEqual(
+            AttendanceSummary.objects.get(student=self.students[0], subject=self.subject).total, 2
+        )
+
+
+class InternalMarkBulkMarkTests(TestCase):
+    """bulk_mark upserts on (student, subject, faculty, test_name) and reports bad rows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.faculty = create_faculty()
+        cls.subject = Subject.objects.create(code='EE101', name='Circuits', semester=1)
+        FacultySubject.objects.create(faculty=cls.faculty, subject=cls.subject, batch='2022-2026')
+        cls.students = create_students(3)
+        cls.outsider, = create_students(1, batch='2023-2027', prefix='OUT')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.faculty.user)
+
+    def bulk_mark(self, marks, test_name='Internal 1'):
+        response = self.client.post('/api/academics/internal-marks/bulk_mark/', {
+            'subject': self.subject.pk,
+            'test_name': test_name,
+            'max_mark': 50,
+            'marks': marks,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_remarking_updates_in_place(self):
+        first = self.bulk_mark([{'student': student.pk, 'obtained_mark': 30}
+                                for student in self.students])
+        second = self.bulk_mark([{'student': student.pk, 'obtained_mark': 45}
+                                 for student in self.students])
+
+        self.assertTrue(all(result['created'] for result in first['results']))
+        self.assertFalse(any(result['created'] for result in second['results']))
+        self.assertEqual(InternalMark.objects.count(), 3)
+        self.assertEqual(
+            list(InternalMark.objects.values_list('obtained_mark', flat=True).distinct()), [45]
+        )
+
+        # Another test name is another row
+        self.bulk_mark([{'student': self.students[0].pk, 'obtained_mark': 20}], 'Internal 2')
+        self.assertEqual(InternalMark.objects.count(), 4)
+
+    def test_invalid_rows_are_reported_and_valid_rows_written(self):
+        data = self.bulk_mark([
+            {'student': self.students[0].pk, 'obtained_mark': 40},
+            {'student': 'abc', 'obtained_mark': 40},
+            {'student': self.students[1].pk, 'obtained_mark': 51},
+            {'student': self.outsider.pk, 'obtained_mark': 40},
+            {'student': self.students[2].pk},
+        ])
+
+        self.assertEqual(sorted(error['row_num'] for error in data['errors']), [2, 3, 4, 5])
+        self.assertEqual([result['student'] for result in data['results']], [self.students[0].pk])
+        self.assertEqual(list(InternalMark.objects.values_list('student_id', 'obtained_mark')),
+                         [(self.students[0].pk, 40)])
+
+
+class ListQueryCountTests(TestCase):
+    """List endpoints run the same queries for 1 row as for many"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, = CustomUser.objects.bulk_create([
+            CustomUser(username='admin', user_type='admin', password='!')
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.rows = 0
+
+    def add_rows(self, count):
+        """Each row gets its own faculty, student and subject to load"""
+        for i in range(self.rows, self.rows + count):
+            faculty = create_faculty(username=f'faculty{i}', faculty_id=f'FAC{i:03d}')
+            student, = create_students(1, batch=f'B{i}', prefix=f'S{i}_')
+            subject = Subject.objects.create(code=f'EE{i:03d}', name=f'Subject {i}', semester=1)
+            FacultySubject.objects.create(faculty=faculty, subject=subject, batch=student.batch)
+            Attendance.objects.create(student=student, subject=subject, faculty=faculty,
+                                      date=timezone.now().date(), hour=1, present=True)
+            InternalMark.objects.create(student=student, subject=subject, faculty=faculty,
+                                        test_name='Internal 1', max_mark=50, obtained_mark=40)
+            assignment = Assignment.objects.create(title=f'Assignment {i}', description='',
+                                                   subject=subject, faculty=faculty,
+                                                   batch=student.batch, due_date=timezone.now())
+            AssignmentSubmission.objects.create(assignment=assignment, student=student,
+                                                file=f'assignment_submissions/{i}.pdf')
+            StudyMaterial.objects.create(title=f'Material {i}', description='', subject=subject,
+                                         faculty=faculty, batch=student.batch,
+                                         file=f'study_materials/{i}.pdf')
+        self.rows += count
+
+    def assertListQueriesFlat(self, url):
+        self.add_rows(1)
+        with CaptureQueriesContext(connection) as one_row:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+        self.add_rows(9)
+        with self.assertNumQueries(len(one_row)):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 10)
+
+    def test_subjects(self):
+        self.assertListQueriesFlat('/api/academics/subjects/')
+
+    def test_faculty_subjects(self):
+        self.assertListQueriesFlat('/api/academics/faculty-subjects/')
+
+    def test_attendance(self):
+        self.assertListQueriesFlat('/api/academics/attendance/')
+
+    def test_internal_marks(self):
+        self.assertListQueriesFlat('/api/academics/internal-marks/')
+
+    def test_assignments(self):
+        self.assertListQueriesFlat('/api/academics/assignments/')
+
+    def test_assignment_submissions(self):
+        self.assertListQueriesFlat('/api/academics/assignment-submissions/')
+
+    def test_study_materials(self):
+        self.assertListQueriesFlat('/api/academics/study-materials/')
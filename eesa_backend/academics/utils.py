@@ -0,0 +1,222 @@
+# academics/utils.py
+from collections import defaultdict
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from users.models import Student
+from users.utils import invalidate_student_dashboards
+from eesa_backend.sqlite import serialized_writes
+from .models import Subject, FacultySubject, Attendance, AttendanceSummary, InternalMark
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=500):
+    """
+    Insert or update objects on a unique key with one
+    INSERT ... ON CONFLICT DO UPDATE statement per batch
+    """
+    return model.objects.bulk_create(
+        objs,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=update_fields,
+    )
+
+
+def get_roster_student_ids(faculty, subject, student_ids):
+    """
+    Return the subset of student_ids that belong to a batch the faculty
+    teaches this subject to (single query)
+    """
+    batches = FacultySubject.objects.filter(
+        faculty=faculty, subject=subject
+    ).values('batch')
+    return set(
+        Student.objects.filter(pk__in=student_ids, batch__in=batches)
+        .values_list('pk', flat=True)
+    )
+
+
+def attendance_rollup(queryset):
+    """Group attendance rows into per student/subject total and present counts"""
+    return (
+        queryset
+        .values('student_id', 'subject_id')
+        .annotate(total=Count('id'), present=Count('id', filter=Q(present=True)))
+        .order_by()
+    )
+
+
+def refresh_attendance_summaries(pairs):
+    """
+    Recompute the AttendanceSummary rows for the given (student_id, subject_id)
+    pairs from the Attendance table. Each subject costs one grouped query served
+    by the (student, subject, date, hour) unique index plus one upsert, so the
+    work is proportional to the rows touched rather than the table size.
+    Pairs left without any attendance lose their summary row.
+    
+    The counts are absolute, so each subject's Subject row is locked before
+    counting. Under READ COMMITTED a concurrent bulk_mark for the same
+    subject then waits for this transaction to commit, and its count sees
+    these rows, instead of overwriting the totals with a count that missed
+    them. Subjects are locked in id order to avoid deadlocks. SQLite has no
+    row locks; it already runs one write transaction at a time.
+    """
+    students_by_subject = defaultdict(set)
+    for student_id, subject_id in pairs:
+        students_by_subject[subject_id].add(student_id)
+    
+    with transaction.atomic():
+        for subject_id, student_ids in sorted(students_by_subject.items()):
+            if connection.features.has_select_for_update:
+                list(Subject.objects.select_for_update().filter(pk=subject_id).values_list('pk'))
+            
+            rollup = list(attendance_rollup(
+                Attendance.objects.filter(subject_id=subject_id, student_id__in=student_ids)
+            ))
+            
+            if rollup:
+                bulk_upsert(
+                    AttendanceSummary,
+                    [AttendanceSummary(**row) for row in rollup],
+                    unique_fields=['student', 'subject'],
+                    update_fields=['total', 'present', 'updated_at'],
+                )
+            
+            emptied = student_ids - {row['student_id'] for row in rollup}
+            if emptied:
+                AttendanceSummary.objects.filter(
+                    subject_id=subject_id, student_id__in=emptied
+                ).delete()
+            
+            invalidate_student_dashboards(student_ids)
+
+
+def upsert_attendance(faculty, subject, date, hour, marks):
+    """
+    Mark attendance for one (subject, date, hour) slot in a single transaction.
+    `marks` maps student pk -> present flag. Existing rows for the slot are
+    fetched in one query so the per-student `created` flags can be reported,
+    then the whole slot is written with a set-based upsert on the
+    (student, subject, date, hour) unique key.
+    """
+    with serialized_writes(), transaction.atomic():
+        existing = set(
+            Attendance.objects.filter(
+                subject=subject, date=date, hour=hour, student_id__in=marks.keys()
+            ).values_list('student_id', flat=True)
+        )
+
+        records = [
+            Attendance(
+                student_id=student_id,
+                subject=subject,
+                faculty=faculty,
+                date=date,
+                hour=hour,
+                present=present,
+            )
+            for student_id, present in marks.items()
+        ]
+        records = bulk_upsert(
+            Attendance,
+            records,
+            unique_fields=['student', 'subject', 'date', 'hour'],
+            update_fields=['faculty', 'present'],
+        )
+        refresh_attendance_summaries((student_id, subject.id) for student_id in marks)
+
+    return [
+        {
+            'id': record.id,
+            'student': record.student_id,
+            'present': record.present,
+            'created': record.student_id not in existing,
+        }
+        for record in records
+    ]
+
+
+def upsert_internal_marks(faculty, subject, test_name, max_mark, marks_data):
+    """
+    Write a whole test's marks in one transaction. Each row is validated on
+    its own and invalid rows (bad student, mark missing or outside
+    0..max_mark, student not on the roster) are reported back instead of
+    aborting the batch. Valid rows are written with a set-based upsert on
+    the (student, subject, faculty, test_name) natural key.
+    Returns (results, errors).
+    """
+    errors = []
+    marks = {}
+    for row_num, item in enumerate(marks_data, start=1):
+        try:
+            student_id = int(item.get('student'))
+            obtained_mark = float(item.get('obtained_mark'))
+        except (TypeError, ValueError, AttributeError):
+            errors.append({
+                'row_num': row_num,
+                'student': item.get('student') if isinstance(item, dict) else None,
+                'error': 'student and a numeric obtained_mark are required'
+            })
+            continue
+        
+        if obtained_mark < 0 or obtained_mark > max_mark:
+            errors.append({
+                'row_num': row_num,
+                'student': student_id,
+                'error': f'obtained_mark must be between 0 and {max_mark}'
+            })
+            continue
+        
+        # Last entry wins if a student appears more than once
+        marks[student_id] = (row_num, obtained_mark, item.get('remarks', ''))
+    
+    roster = get_roster_student_ids(faculty, subject, marks.keys())
+    for student_id in [student_id for student_id in marks if student_id not in roster]:
+        row_num = marks.pop(student_id)[0]
+        errors.append({
+            'row_num': row_num,
+            'student': student_id,
+            'error': 'Student is not in a batch you teach for this subject'
+        })
+    
+    if not marks:
+        return [], errors
+    
+    with serialized_writes(), transaction.atomic():
+        existing = set(
+            InternalMark.objects.filter(
+                subject=subject, faculty=faculty, test_name=test_name,
+                student_id__in=marks.keys()
+            ).values_list('student_id', flat=True)
+        )
+        
+        records = [
+            InternalMark(
+                student_id=student_id,
+                subject=subject,
+                faculty=faculty,
+                test_name=test_name,
+                max_mark=max_mark,
+                obtained_mark=obtained_mark,
+                remarks=remarks,
+            )
+            for student_id, (_, obtained_mark, remarks) in marks.items()
+        ]
+        records = bulk_upsert(
+            InternalMark,
+            records,
+            unique_fields=['student', 'subject', 'faculty', 'test_name'],
+            update_fields=['max_mark', 'obtained_mark', 'remarks'],
+        )
+        invalidate_student_dashboards(marks.keys())
+    
+    results = [
+        {
+            'id': record.id,
+            'student': record.student_id,
+            'obtained_mark': record.obtained_mark,
+            'created': record.student_id not in existing,
+        }
+        for record in records
+    ]
+    return results, errors
@@ -2,16 +2,21 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
-from .models import (Subject, FacultySubject, Attendance, InternalMark, 
+from django.db import transaction
+from django.db.models import Q, Exists, OuterRef
+from .models import (Subject, FacultySubject, Attendance, AttendanceSummary, InternalMark, 
                     Assignment, AssignmentSubmission, StudyMaterial)
 from .serializers import (SubjectSerializer, FacultySubjectSerializer, 
-                         AttendanceSerializer, InternalMarkSerializer,
+                         AttendanceSerializer, AttendanceSummarySerializer, InternalMarkSerializer,
                          AssignmentSerializer, AssignmentSubmissionSerializer, 
                          StudyMaterialSerializer)
+from .utils import (get_roster_student_ids, refresh_attendance_summaries, 
+                   upsert_attendance, upsert_internal_marks)
 from users.permissions import IsAdmin, IsAdminOrFaculty, IsStudent, IsOwnerOrAdminOrFaculty
+from users.mixins import AutoPrefetchMixin
+from users.principal import get_principal
 
-class SubjectViewSet(viewsets.ModelViewSet):
+class SubjectViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     
@@ -22,7 +27,7 @@ class SubjectViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
 
-class FacultySubjectViewSet(viewsets.ModelViewSet):
+class FacultySubjectViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     queryset = FacultySubject.objects.all()
     serializer_class = FacultySubjectSerializer
     
@@ -34,23 +39,23 @@ class FacultySubjectViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         
         # Admin can see all
-        if user.is_superuser or user.user_type == 'admin':
+        if principal.is_admin:
             return FacultySubject.objects.all()
         
         # Faculty can see their assigned subjects
-        if user.user_type == 'faculty' and hasattr(user, 'faculty_profile'):
-            return FacultySubject.objects.filter(faculty=user.faculty_profile)
+        if principal.is_faculty and principal.faculty_id:
+            return FacultySubject.objects.filter(faculty_id=principal.faculty_id)
         
         # Students can see subjects for their batch
-        if user.user_type == 'student' and hasattr(user, 'student_profile'):
-            return FacultySubject.objects.filter(batch=user.student_profile.batch)
+        if principal.is_student and principal.student_id:
+            return FacultySubject.objects.filter(batch=principal.batch)
         
         return FacultySubject.objects.none()
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     serializer_class = AttendanceSerializer
     
     def get_permissions(self):
@@ -61,27 +66,79 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         
         # Admin can see all
-        if user.is_superuser or user.user_type == 'admin':
-            return Attendance.objects.all()
+        if principal.is_admin:
+            return Attendance.objects.order_by('-date', '-hour')
         
         # Faculty can see attendance they've marked
-        if user.user_type == 'faculty' and hasattr(user, 'faculty_profile'):
-            return Attendance.objects.filter(faculty=user.faculty_profile)
+        if principal.is_faculty and principal.faculty_id:
+            return Attendance.objects.filter(faculty_id=principal.faculty_id).order_by('-date', '-hour')
         
         # Students can see their own attendance
-        if user.user_type == 'student' and hasattr(user, 'student_profile'):
-            return Attendance.objects.filter(student=user.student_profile)
+        if principal.is_student and principal.student_id:
+            return Attendance.objects.filter(student_id=principal.student_id).order_by('-date', '-hour')
         
         return Attendance.objects.none()
     
+    @transaction.atomic
     def perform_create(self, serializer):
-        if self.request.user.user_type == 'faculty':
-            serializer.save(faculty=self.request.user.faculty_profile)
+        if get_principal(self.request).is_faculty:
+            attendance = serializer.save(faculty=self.request.user.faculty_profile)
         else:
-            serializer.save()
+            attendance = serializer.save()
+        refresh_attendance_summaries([(attendance.student_id, attendance.subject_id)])
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        previous = (serializer.instance.student_id, serializer.instance.subject_id)
+        attendance = serializer.save()
+        refresh_attendance_summaries({previous, (attendance.student_id, attendance.subject_id)})
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        pair = (instance.student_id, instance.subject_id)
+        instance.delete()
+        refresh_attendance_summaries([pair])
+    
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Per student/subject attendance percentages read from the rollup table"""
+        principal = get_principal(request)
+        queryset = AttendanceSummary.objects.select_related('student__user', 'subject')
+        
+        if principal.is_admin:
+            pass
+        elif principal.is_faculty and principal.faculty_id:
+            # Faculty see the batches they teach each subject to; the subject
+            # list lets the subject index narrow the rows the Exists checks
+            taught = FacultySubject.objects.filter(faculty_id=principal.faculty_id)
+            queryset = queryset.filter(
+                subject_id__in=taught.values('subject_id')
+            ).filter(Exists(taught.filter(
+                subject=OuterRef('subject'),
+                batch=OuterRef('student__batch')
+            )))
+        elif principal.is_student and principal.student_id:
+            queryset = queryset.filter(student_id=principal.student_id)
+        else:
+            queryset = queryset.none()
+        
+        subject = request.query_params.get('subject', None)
+        if subject:
+            queryset = queryset.filter(subject_id=subject)
+        
+        student = request.query_params.get('student', None)
+        if student:
+            queryset = queryset.filter(student_id=student)
+        
+        batch = request.query_params.get('batch', None)
+        if batch:
+            queryset = queryset.filter(student__batch=batch)
+        
+        serializer = AttendanceSummarySerializer(queryset, many=True)
+        return Response(serializer.data)
     
     @action(detail=False, methods=['post'])
     def bulk_mark(self, request):
@@ -106,31 +163,28 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             return Response({'error': 'You are not assigned to this subject'}, 
                           status=status.HTTP_403_FORBIDDEN)
         
-        results = []
-        for item in attendance_data:
-            student_id = item.get('student')
-            present = item.get('present', False)
-            
-            # Create or update attendance record
-            attendance, created = Attendance.objects.update_or_create(
-                student_id=student_id,
-                subject=subject,
-                faculty=faculty,
-                date=date,
-                hour=hour,
-                defaults={'present': present}
-            )
-            
-            results.append({
-                'id': attendance.id,
-                'student': student_id,
-                'present': attendance.present,
-                'created': created
-            })
+        # Last entry wins if a student appears more than once
+        marks = {}
+        try:
+            for item in attendance_data:
+                marks[int(item.get('student'))] = item.get('present', False)
+        except (TypeError, ValueError, AttributeError):
+            return Response({'error': 'Invalid student in attendance data'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        # Validate all students against the batch roster in one query
+        roster = get_roster_student_ids(faculty, subject, marks.keys())
+        invalid_students = [student_id for student_id in marks if student_id not in roster]
+        if invalid_students:
+            return Response({'error': 'Students not in a batch you teach for this subject',
+                           'invalid_students': invalid_students}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        results = upsert_attendance(faculty, subject, date, hour, marks)
         
         return Response({'message': 'Attendance marked successfully', 'results': results})
 
-class InternalMarkViewSet(viewsets.ModelViewSet):
+class InternalMarkViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     serializer_class = InternalMarkSerializer
     
     def get_permissions(self):
@@ -141,24 +195,24 @@ class InternalMarkViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         
         # Admin can see all
-        if user.is_superuser or user.user_type == 'admin':
+        if principal.is_admin:
             return InternalMark.objects.all()
         
         # Faculty can see marks they've given
-        if user.user_type == 'faculty' and hasattr(user, 'faculty_profile'):
-            return InternalMark.objects.filter(faculty=user.faculty_profile)
+        if principal.is_faculty and principal.faculty_id:
+            return InternalMark.objects.filter(faculty_id=principal.faculty_id)
         
         # Students can see their own marks
-        if user.user_type == 'student' and hasattr(user, 'student_profile'):
-            return InternalMark.objects.filter(student=user.student_profile)
+        if principal.is_student and principal.student_id:
+            return InternalMark.objects.filter(student_id=principal.student_id)
         
         return InternalMark.objects.none()
     
     def perform_create(self, serializer):
-        if self.request.user.user_type == 'faculty':
+        if get_principal(self.request).is_faculty:
             serializer.save(faculty=self.request.user.faculty_profile)
         else:
             serializer.save()
@@ -179,6 +233,12 @@ class InternalMarkViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Missing required fields'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
+        try:
+            max_mark = float(max_mark)
+        except (TypeError, ValueError):
+            return Response({'error': 'max_mark must be a number'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        
         subject = get_object_or_404(Subject, pk=subject_id)
         
         # Check if faculty is assigned to this subject
@@ -186,35 +246,11 @@ class InternalMarkViewSet(viewsets.ModelViewSet):
             return Response({'error': 'You are not assigned to this subject'}, 
                           status=status.HTTP_403_FORBIDDEN)
         
-        results = []
-        for item in marks_data:
-            student_id = item.get('student')
-            obtained_mark = item.get('obtained_mark')
-            remarks = item.get('remarks', '')
-            
-            # Create or update mark record
-            mark, created = InternalMark.objects.update_or_create(
-                student_id=student_id,
-                subject=subject,
-                faculty=faculty,
-                test_name=test_name,
-                defaults={
-                    'max_mark': max_mark,
-                    'obtained_mark': obtained_mark,
-                    'remarks': remarks
-                }
-            )
-            
-            results.append({
-                'id': mark.id,
-                'student': student_id,
-                'obtained_mark': mark.obtained_mark,
-                'created': created
-            })
-        
-        return Response({'message': 'Marks added successfully', 'results': results})
+        results, errors = upsert_internal_marks(faculty, subject, test_name, max_mark, marks_data)
+        
+        return Response({'message': 'Marks added successfully', 'results': results, 'errors': errors})
 
-class AssignmentViewSet(viewsets.ModelViewSet):
+class AssignmentViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     serializer_class = AssignmentSerializer
     
     def get_permissions(self):
@@ -225,29 +261,29 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         
         # Admin can see all
-        if user.is_superuser or user.user_type == 'admin':
-            return Assignment.objects.all()
+        if principal.is_admin:
+            return Assignment.objects.order_by('-created_at')
         
         # Faculty can see assignments they've created
-        if user.user_type == 'faculty' and hasattr(user, 'faculty_profile'):
-            return Assignment.objects.filter(faculty=user.faculty_profile)
+        if principal.is_faculty and principal.faculty_id:
+            return Assignment.objects.filter(faculty_id=principal.faculty_id).order_by('-created_at')
         
         # Students can see assignments for their batch
-        if user.user_type == 'student' and hasattr(user, 'student_profile'):
-            return Assignment.objects.filter(batch=user.student_profile.batch)
+        if principal.is_student and principal.student_id:
+            return Assignment.objects.filter(batch=principal.batch).order_by('-created_at')
         
         return Assignment.objects.none()
     
     def perform_create(self, serializer):
-        if self.request.user.user_type == 'faculty':
+        if get_principal(self.request).is_faculty:
             serializer.save(faculty=self.request.user.faculty_profile)
         else:
             serializer.save()
 
-class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
+class AssignmentSubmissionViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     serializer_class = AssignmentSubmissionSerializer
     
     def get_permissions(self):
@@ -262,22 +298,22 @@ class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         
         # Admin can see all
-        if user.is_superuser or user.user_type == 'admin':
+        if principal.is_admin:
             return AssignmentSubmission.objects.all()
         
         # Faculty can see submissions for assignments they created
-        if user.user_type == 'faculty' and hasattr(user, 'faculty_profile'):
+        if principal.is_faculty and principal.faculty_id:
             return AssignmentSubmission.objects.filter(
-                assignment__faculty=user.faculty_profile
+                assignment__faculty_id=principal.faculty_id
             )
         
         # Students can see their own submissions
-        if user.user_type == 'student' and hasattr(user, 'student_profile'):
+        if principal.is_student and principal.student_id:
             return AssignmentSubmission.objects.filter(
-                student=user.student_profile
+                student_id=principal.student_id
             )
         
         return AssignmentSubmission.objects.none()
@@ -302,7 +338,7 @@ class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(submission)
         return Response(serializer.data)
 
-class StudyMaterialViewSet(viewsets.ModelViewSet):
+class StudyMaterialViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     serializer_class = StudyMaterialSerializer
     
     def get_permissions(self):
@@ -313,24 +349,24 @@ class StudyMaterialViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         
         # Admin can see all
-        if user.is_superuser or user.user_type == 'admin':
-            return StudyMaterial.objects.all()
+        if principal.is_admin:
+            return StudyMaterial.objects.order_by('-created_at')
         
         # Faculty can see materials they've uploaded
-        if user.user_type == 'faculty' and hasattr(user, 'faculty_profile'):
-            return StudyMaterial.objects.filter(faculty=user.faculty_profile)
+        if principal.is_faculty and principal.faculty_id:
+            return StudyMaterial.objects.filter(faculty_id=principal.faculty_id).order_by('-created_at')
         
         # Students can see materials for their batch
-        if user.user_type == 'student' and hasattr(user, 'student_profile'):
-            return StudyMaterial.objects.filter(batch=user.student_profile.batch)
+        if principal.is_student and principal.student_id:
+            return StudyMaterial.objects.filter(batch=principal.batch).order_by('-created_at')
         
         return StudyMaterial.objects.none()
     
     def perform_create(self, serializer):
-        if self.request.user.user_type == 'faculty':
+        if get_principal(self.request).is_faculty:
             serializer.save(faculty=self.request.user.faculty_profile)
         else:
             serializer.save()
\ No newline at end of file
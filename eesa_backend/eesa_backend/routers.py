@@ -0,0 +1,127 @@
+# eesa_backend/routers.py
+"""
+Read-replica routing.
+
+Writes always go to `default`. Reads go to a replica only while
+ReplicaRoutingMiddleware is handling a GET/HEAD request whose URL name is
+in settings.REPLICA_READ_URL_NAMES (dashboards, exports, search and other
+report-style lists); everything else, including management commands and
+background workers, reads from the primary.
+
+Read-after-write is kept on the primary in two ways:
+
+* within a request, the first write switches the rest of the request's
+  reads to the primary;
+* after a client sends a write (any non-GET/HEAD/OPTIONS request), its
+  reads stay on the primary for REPLICA_STICKY_SECONDS. Clients are told
+  apart by a hash of their Authorization header or session cookie, and the
+  window is kept in the default cache. A client's next read can land on
+  any worker, so that cache has to be shared: check_sticky_cache fails the
+  system checks when replicas are configured with a per-process cache.
+
+Routing ends when the middleware returns, before a StreamingHttpResponse
+is iterated; a streaming view pins its queryset with `.using(queryset.db)`
+while it runs (see StudentViewSet.export).
+
+Tokens and sessions are always read from the primary, so a token issued
+at login is usable before it reaches the replicas.
+
+Replicas are configured with the DATABASE_REPLICAS environment variable
+(see settings.py). With none configured the router sends everything to
+`default`.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+
+PRIMARY_ONLY_MODELS = {'authtoken.token', 'sessions.session'}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# 'replica' while serving an eligible read, 'primary' once it has written
+_state = ContextVar('replica_routing', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def check_sticky_cache(app_configs, **kwargs):
+    """
+    Replicas need a default cache shared by every worker to keep a
+    client's reads on the primary after it writes
+    """
+    if replica_aliases() and isinstance(caches['default'], (LocMemCache, DummyCache)):
+        return [checks.Error(
+            'DATABASE_REPLICAS is set but CACHES["default"] is not shared between processes.',
+            hint='The sticky primary window after a write is kept in the default cache; '
+                 'use a shared backend such as Redis or Memcached.',
+            id='eesa_backend.E001',
+        )]
+    return []
+
+
+class ReplicaRouter:
+    """Send eligible reads to a random replica and everything else to default"""
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if (not replicas or _state.get() != 'replica'
+                or model._meta.label_lower in PRIMARY_ONLY_MODELS):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if _state.get() == 'replica':
+            _state.set('primary')
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+
+def _client_key(request):
+    credential = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credential:
+        return None
+    return 'replica:sticky:' + hashlib.sha256(credential.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Flag eligible read requests for the replicas and start the sticky
+    primary window after a client writes
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _state.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if request.method not in SAFE_METHODS and replica_aliases():
+            key = _client_key(request)
+            if key:
+                cache.set(key, True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in ('GET', 'HEAD') and replica_aliases()
+                and request.resolver_match.url_name in settings.REPLICA_READ_URL_NAMES):
+            key = _client_key(request)
+            if not (key and cache.get(key)):
+                _state.set('replica')
+        return None
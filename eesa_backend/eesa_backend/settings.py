@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import copy
 import os
 
 
@@ -62,6 +63,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.PrincipalMiddleware',
+    'eesa_backend.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -89,13 +92,134 @@ WSGI_APPLICATION = 'eesa_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLITE_TUNED=0 turns off the SQLite tuning below (e.g. to benchmark without it)
+SQLITE_TUNED = os.environ.get('SQLITE_TUNED', '1') == '1'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock when a transaction starts (see eesa_backend/sqlite.py)
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'} if SQLITE_TUNED else {},
     }
 }
 
+# Applied to every new SQLite connection (eesa_backend/sqlite.py)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -32000,  # KiB
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 10000)),  # ms
+} if SQLITE_TUNED else {}
+
+# Queue bulk attendance/mark writes within each process (SQLite only)
+SQLITE_SERIALIZE_WRITES = os.environ.get('SQLITE_SERIALIZE_WRITES', '0') == '1'
+
+# Production profile: DATABASE_ENGINE=postgresql switches default to PostgreSQL
+# (needs psycopg 3; psycopg[pool] for pooling), configured by DATABASE_NAME,
+# DATABASE_USER, DATABASE_PASSWORD, DATABASE_HOST and DATABASE_PORT.
+# Connections persist for DATABASE_CONN_MAX_AGE seconds and are health-checked
+# before reuse. Setting DATABASE_POOL_MAX_SIZE uses a psycopg connection pool
+# per worker instead (Django requires CONN_MAX_AGE = 0 with a pool).
+if os.environ.get('DATABASE_ENGINE') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DATABASE_NAME', 'eesa'),
+            'USER': os.environ.get('DATABASE_USER', 'eesa'),
+            'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),
+            'HOST': os.environ.get('DATABASE_HOST', 'localhost'),
+            'PORT': os.environ.get('DATABASE_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if int(os.environ.get('DATABASE_POOL_MAX_SIZE', 0)):
+        from psycopg_pool import ConnectionPool
+
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ['DATABASE_POOL_MAX_SIZE']),
+            'timeout': int(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+            # Test each connection as it leaves the pool
+            'check': ConnectionPool.check_connection,
+        }
+
+# Read replicas (see eesa_backend/routers.py)
+# DATABASE_REPLICAS is a comma-separated list of replica database NAMEs (SQLite
+# files or PostgreSQL databases), each optionally prefixed with HOST[:PORT]/ for
+# PostgreSQL. The other connection settings are copied from default; in tests
+# the replicas mirror default.
+REPLICA_DATABASES = []
+for index, entry in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), 1):
+    # A deep copy, so no replica shares OPTIONS (and its pool settings) with default
+    replica = {**copy.deepcopy(DATABASES['default']), 'TEST': {'MIRROR': 'default'}}
+    entry = entry.strip()
+    if 'sqlite3' not in replica['ENGINE'] and '/' in entry:
+        host, entry = entry.rsplit('/', 1)
+        replica['HOST'], _, replica['PORT'] = host.partition(':')
+    replica['NAME'] = entry
+    DATABASES[f'replica{index}'] = replica
+    REPLICA_DATABASES.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['eesa_backend.routers.ReplicaRouter']
+
+# Reads stay on the primary this long after a client writes (seconds);
+# keep it above the replicas' usual lag. The window is kept in
+# CACHES['default'], which must be shared when replicas are configured
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
+# GET routes, by URL name, that may read from a replica. Leave out views that
+# fill a cache from what they read (the student and faculty dashboards): a
+# lagging replica would put pre-write figures back into the cache right after
+# the write expired them, for the full DASHBOARD_CACHE_TIMEOUT
+REPLICA_READ_URL_NAMES = [
+    'note-dashboard-stats',
+    'student-list',
+    'student-export',
+    'faculty-list',
+    'people_autocomplete',
+    'note-list',
+    'note-pending',
+    'attendance-summary',
+]
+
+
+# Cache
+# LocMemCache is per process; point this at a shared backend (Redis/Memcached)
+# when running several workers so cache invalidations reach all of them.
+# The token authentication cache is only enabled with a shared backend, and
+# DATABASE_REPLICAS requires one (the sticky primary window lives here).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'eesa-default',
+    }
+}
+
+# Upper bound on how long a cached dashboard may be served (seconds)
+DASHBOARD_CACHE_TIMEOUT = 300
+
+
+# Student CSV imports (run by `manage.py run_import_worker`)
+# A worker renews its job's lease after every chunk; a running job whose lease
+# is this old (seconds) is taken over by another worker, which resumes after
+# the last finished chunk. Keep it well above the time one chunk takes.
+STUDENT_IMPORT_LEASE_SECONDS = 600
+
+
+# Email outbox (drained by `manage.py send_outbox`)
+# Failed sends are retried after EMAIL_OUTBOX_RETRY_DELAY * 2**(attempts - 1)
+# seconds and given up after EMAIL_OUTBOX_MAX_ATTEMPTS tries. A sender claims
+# its batch for EMAIL_OUTBOX_LEASE_SECONDS, so other senders skip it; if the
+# sender dies, the batch is sent again after that.
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_LEASE_SECONDS = 600
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -150,7 +274,7 @@ CORS_ALLOW_CREDENTIALS = True
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
@@ -159,5 +283,16 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Token authentication cache (per process; see users.authentication)
+# Entries are checked against a per-user version in CACHES['default'], so a
+# deleted token or deactivated user is refused by every worker sharing that
+# cache. With the LocMemCache (or dummy) default above the versions can't
+# reach other workers, so the token cache is not used and every request
+# loads its token. The TTL is the backstop for a change the version check
+# can miss (committed while a worker is loading the token; see
+# CachedTokenAuthentication)
+TOKEN_AUTH_CACHE_SIZE = 1024
+TOKEN_AUTH_CACHE_TTL = 60
+
 # Use custom user model
 AUTH_USER_MODEL = 'users.CustomUser'
\ No newline at end of file
@@ -0,0 +1,104 @@
+# eesa_backend/sqlite.py
+"""
+SQLite tuning for small single-server deployments.
+
+configure_connection() runs on every new SQLite connection and applies
+settings.SQLITE_PRAGMAS:
+
+* journal_mode=WAL lets readers keep reading while one connection writes;
+* synchronous=NORMAL only syncs at checkpoints, which is still safe
+  against corruption in WAL mode;
+* cache_size raises the page cache (negative values are KiB);
+* busy_timeout makes a blocked writer wait for the lock instead of
+  failing at once with "database is locked".
+
+The default database also opens its transactions with BEGIN IMMEDIATE
+(the transaction_mode option in settings), so a transaction that reads
+before writing takes the write lock up front and waits in busy_timeout,
+rather than failing when it later tries to upgrade its read lock.
+
+With SQLITE_SERIALIZE_WRITES on, the bulk marking paths also queue for
+write_queue, so writers in one process take turns in arrival order
+instead of all polling the file lock. Other processes still contend
+through busy_timeout.
+"""
+import threading
+from collections import deque
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+
+
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def connect_signals():
+    """Hook configure_connection up; called from UsersConfig.ready()"""
+    connection_created.connect(configure_connection, dispatch_uid='sqlite_configure_connection')
+
+
+class WriteQueue:
+    """Reentrant lock handed to waiting threads in FIFO order"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self._owner = None
+        self._depth = 0
+
+    def acquire(self):
+        me = threading.get_ident()
+        with self._lock:
+            if self._owner == me:
+                self._depth += 1
+                return
+            if self._owner is None:
+                self._owner, self._depth = me, 1
+                return
+            turn = threading.Event()
+            self._waiters.append((me, turn))
+        # release() makes us the owner before setting the event
+        turn.wait()
+
+    def release(self):
+        with self._lock:
+            self._depth -= 1
+            if self._depth:
+                return
+            if self._waiters:
+                self._owner, turn = self._waiters.popleft()
+                self._depth = 1
+                turn.set()
+            else:
+                self._owner = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+write_queue = WriteQueue()
+
+
+@contextmanager
+def serialized_writes(using=DEFAULT_DB_ALIAS):
+    """
+    Hold write_queue for the block when SQLITE_SERIALIZE_WRITES is on and
+    the database is SQLite; otherwise a no-op. Enter it before
+    transaction.atomic() so the queue is taken before the database lock.
+    """
+    if not (getattr(settings, 'SQLITE_SERIALIZE_WRITES', False)
+            and connections[using].vendor == 'sqlite'):
+        yield
+        return
+    with write_queue:
+        yield
@@ -1,3 +1,100 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import CustomUser
+from .models import Event, Project
 
-# Create your tests here.
+
+class ListQueryCountTests(TestCase):
+    """Event and project lists run the same queries for 1 row as for many"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.rows = 0
+
+    def add_rows(self, count):
+        """Each event gets its own organizer, each project two contributors"""
+        for i in range(self.rows, self.rows + count):
+            organizer, contributor = CustomUser.objects.bulk_create([
+                CustomUser(username=f'organizer{i}', user_type='faculty', password='!'),
+                CustomUser(username=f'contributor{i}', user_type='student', password='!'),
+            ])
+            Event.objects.create(title=f'Event {i}', description='', date=timezone.now(),
+                                 location='Seminar hall', organizer=organizer)
+            project = Project.objects.create(title=f'Project {i}', description='')
+            project.contributors.add(organizer, contributor)
+        self.rows += count
+
+    def assertListQueriesFlat(self, url):
+        self.add_rows(1)
+        with CaptureQueriesContext(connection) as one_row:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+        self.add_rows(9)
+        with self.assertNumQueries(len(one_row)):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 10)
+
+    def test_events(self):
+        self.assertListQueriesFlat('/api/events/events/')
+
+    def test_projects(self):
+        self.assertListQueriesFlat('/api/events/projects/')
+
+
+class ProjectContributorFilterTests(TestCase):
+    """?contributor= lists one user's projects, with every contributor shown"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob, cls.carol = CustomUser.objects.bulk_create([
+            CustomUser(username=name, first_name=name.title(), user_type='student', password='!')
+            for name in ['alice', 'bob', 'carol']
+        ])
+        cls.shared = Project.objects.create(title='Shared', description='')
+        cls.shared.contributors.add(cls.alice, cls.bob)
+        cls.solo = Project.objects.create(title='Solo', description='')
+        cls.solo.contributors.add(cls.carol)
+        for i in range(5):
+            project = Project.objects.create(title=f'Bob {i}', description='')
+            project.contributors.add(cls.bob, cls.carol)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def projects(self, contributor):
+        response = self.client.get('/api/events/projects/', {'contributor': contributor})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_filters_by_contributor(self):
+        projects = self.projects(self.alice.pk)
+        self.assertEqual([project['title'] for project in projects], ['Shared'])
+        # The filter picks projects; their contributor lists stay complete
+        self.assertEqual(len(projects[0]['contributors']), 2)
+
+        self.assertEqual(len(self.projects(self.bob.pk)), 6)
+
+        self.client.force_authenticate(user=self.carol)
+        self.assertEqual({project['title'] for project in self.projects('me')},
+                         {'Solo'} | {f'Bob {i}' for i in range(5)})
+
+    def test_invalid_contributor(self):
+        response = self.client.get('/api/events/projects/', {'contributor': 'me'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/events/projects/', {'contributor': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_query_count(self):
+        # The projects, then one prefetch of the contributors' shown fields
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.projects(self.alice.pk)), 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.projects(self.bob.pk)), 6)
+        self.assertEqual(len(queries), 2)
+        # only() keeps the prefetch to the fields the serializer shows
+        self.assertNotIn('"password"', queries[1]['sql'])
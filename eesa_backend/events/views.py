@@ -1,8 +1,12 @@
 from rest_framework import viewsets, permissions
+from rest_framework.exceptions import ValidationError
+from django.db.models import Prefetch
+from users.models import CustomUser
 from .models import Event, Project
 from .serializers import EventSerializer, ProjectSerializer
+from users.mixins import AutoPrefetchMixin
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     queryset = Event.objects.all().order_by('-date')
     serializer_class = EventSerializer
     
@@ -14,10 +18,28 @@ class EventViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     queryset = Project.objects.all().order_by('-created_at')
     serializer_class = ProjectSerializer
     
+    def get_queryset(self):
+        # One prefetch for all contributors, loading only what the serializer shows
+        queryset = Project.objects.prefetch_related(
+            Prefetch('contributors', queryset=CustomUser.objects.only('id', 'first_name', 'last_name'))
+        ).order_by('-created_at')
+        
+        # Filter by contributor (user id, or "me"), served by the M2M table's user index
+        contributor = self.request.query_params.get('contributor', None)
+        if contributor:
+            if contributor == 'me' and self.request.user.is_authenticated:
+                contributor = self.request.user.pk
+            try:
+                queryset = queryset.filter(contributors=int(contributor))
+            except (TypeError, ValueError):
+                raise ValidationError({'contributor': 'Must be a user id or "me".'})
+        
+        return queryset
+    
     # Make GET requests public
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -0,0 +1,155 @@
+# library/management/commands/benchmark_note_search.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from library.models import Note
+from library.search import search_available
+from library.views import NoteViewSet
+from users.counters import increment
+from users.management.commands.generate_department import NOTE_KINDS, NOTE_TOPICS, SUBJECTS
+from users.models import CustomUser, Student, Faculty
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'BENCH'
+DEFAULT_QUERIES = ['fourier series', 'transf', 'protection relays']
+
+class Command(BaseCommand):
+    help = ('Time note ?search= through the API with the full-text index and with the '
+            'LIKE fallback, as a student and as faculty. Creates its own BENCH* notes '
+            'and deletes them afterwards; run it on a staging copy')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--notes',
+            type=int,
+            default=100000,
+            help='Number of notes to search',
+        )
+        parser.add_argument(
+            '--query',
+            action='append',
+            dest='queries',
+            help='Search text to time (repeatable; default: a few typical searches and '
+                 'one single-note lookup). Note i has the unique word n<i> in its description',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Timed requests per search; the fastest is reported',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the benchmark data instead of deleting it',
+        )
+
+    def handle(self, *args, **options):
+        if CustomUser.objects.filter(username__startswith=f'{PREFIX.lower()}_').exists():
+            raise CommandError(
+                f'{PREFIX} data from an earlier run exists; delete users named '
+                f'{PREFIX.lower()}_* first'
+            )
+        if not search_available(connection):
+            raise CommandError('This database has no full-text index to compare against LIKE')
+
+        self.stdout.write(f'Creating {options["notes"]} notes...')
+        users = self.create_data(options['notes'])
+        queries = options['queries'] or DEFAULT_QUERIES + [f'n{options["notes"] // 2}']
+
+        try:
+            results = [
+                (text, role, self.measure(user, text, options['repeat']))
+                for text in queries
+                for role, user in users.items()
+            ]
+        finally:
+            if not options['keep']:
+                self.delete_data()
+
+        self.write_summary(results, options)
+
+    def create_data(self, count):
+        """BENCH student and faculty users, and `count` notes uploaded by the student"""
+        student_user, faculty_user = CustomUser.objects.bulk_create([
+            CustomUser(username=f'{PREFIX.lower()}_student', user_type='student', password='!'),
+            CustomUser(username=f'{PREFIX.lower()}_faculty', user_type='faculty', password='!'),
+        ])
+        student = Student.objects.create(user=student_user, student_id=f'{PREFIX}S0001')
+        Faculty.objects.create(user=faculty_user, faculty_id=f'{PREFIX}F0001')
+
+        rng = random.Random(0)
+        statuses = rng.choices(['approved', 'pending', 'rejected'], [6, 3, 1], k=count)
+        notes = []
+        for i, status in enumerate(statuses):
+            subject = rng.choice(SUBJECTS)
+            topic = rng.choice(NOTE_TOPICS)
+            notes.append(Note(
+                title=f'{rng.choice(NOTE_KINDS)}: {topic}',
+                description=f'{subject} notes n{i} covering {topic}, with worked examples.',
+                file='notes/benchmark.pdf',
+                uploaded_by=student,
+                subject=subject,
+                status=status,
+            ))
+        # The index triggers fill library_note_fts as the rows go in
+        Note.objects.bulk_create(notes, batch_size=2000)
+        # bulk_create skips the counter signals; deleting the data decrements them
+        increment({
+            'notes': count,
+            **{f'notes_{status}': statuses.count(status) for status in set(statuses)},
+        })
+        return {'student': student_user, 'faculty': faculty_user}
+
+    def delete_data(self):
+        self.stdout.write('Deleting benchmark data...')
+        with transaction.atomic():
+            CustomUser.objects.filter(username__startswith=f'{PREFIX.lower()}_').delete()
+
+    def request(self, user, text):
+        """One ?search= request through the viewset; returns (seconds, results, queries)"""
+        request = APIRequestFactory().get('/api/library/notes/', {'search': text},
+                                          HTTP_HOST='localhost')
+        force_authenticate(request, user=user)
+        began = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            response = NoteViewSet.as_view({'get': 'list'})(request)
+            response.render()
+        elapsed = time.perf_counter() - began
+        if response.status_code != 200:
+            raise CommandError(f'Note search returned {response.status_code}: {response.data}')
+        return elapsed, len(response.data), len(queries)
+
+    def measure(self, user, text, repeat):
+        result = {}
+        for mode, available in [('fts', True), ('like', False)]:
+            # search_available() caches its answer on the connection
+            connection.note_search_available = available
+            try:
+                runs = [self.request(user, text) for _ in range(repeat)]
+            finally:
+                connection.note_search_available = None
+            result[mode] = min(runs)
+        return result
+
+    def write_summary(self, results, options):
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(f'Notes searched: {options["notes"]}')
+        self.stdout.write(f'{"query":<20}{"role":<9}{"FTS (top 100)":>22}{"LIKE (all)":>22}')
+        for text, role, result in results:
+            cells = [
+                f'{seconds * 1000:.0f} ms / {rows} ({queries}q)'
+                for seconds, rows, queries in (result['fts'], result['like'])
+            ]
+            self.stdout.write(f'{text:<20}{role:<9}{cells[0]:>22}{cells[1]:>22}')
+        self.stdout.write('='*50 + '\n')
+
+        logger.info(f'Note search benchmark over {options["notes"]} notes: ' + ', '.join(
+            f'{text!r} as {role} {result["fts"][0] * 1000:.0f} ms'
+            for text, role, result in results
+        ))
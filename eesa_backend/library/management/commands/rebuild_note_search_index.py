@@ -0,0 +1,35 @@
+# library/management/commands/rebuild_note_search_index.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, DatabaseError
+from library.models import Note
+from library.search import FTS_TABLE, install_note_search, search_available
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = ('Recreate the note full-text index and repopulate it. Run after a migration '
+            'that rebuilds library_note on SQLite, which drops the index triggers')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding note search index...')
+
+        with connection.schema_editor() as schema_editor:
+            install_note_search(schema_editor, Note)
+
+        if not search_available(connection):
+            self.stdout.write(self.style.WARNING(
+                'This database has no full-text support; note search uses LIKE matching'
+            ))
+            return
+
+        if connection.vendor == 'sqlite':
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('integrity-check')")
+            except DatabaseError as e:
+                logger.error(f'Note search index integrity check failed: {str(e)}')
+                raise CommandError(f'Note search index integrity check failed: {str(e)}')
+
+        self.stdout.write(self.style.SUCCESS('Note search index is up to date'))
+        logger.info('Rebuilt note search index')
@@ -0,0 +1,78 @@
+from django.db import migrations
+
+
+# The search index as it was when this migration was written; later changes
+# to library.search must not change what this migration does
+FTS_TABLE = 'library_note_fts'
+GIN_INDEX = 'library_note_search_gin'
+
+CREATE_FTS_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS library_note_fts USING fts5("
+    "title, description, subject, content='library_note', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+CREATE_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS library_note_fts_ai AFTER INSERT ON library_note BEGIN
+        INSERT INTO library_note_fts(rowid, title, description, subject)
+        VALUES (new.id, new.title, new.description, new.subject);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS library_note_fts_ad AFTER DELETE ON library_note BEGIN
+        INSERT INTO library_note_fts(library_note_fts, rowid, title, description, subject)
+        VALUES ('delete', old.id, old.title, old.description, old.subject);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS library_note_fts_au
+    AFTER UPDATE OF title, description, subject ON library_note BEGIN
+        INSERT INTO library_note_fts(library_note_fts, rowid, title, description, subject)
+        VALUES ('delete', old.id, old.title, old.description, old.subject);
+        INSERT INTO library_note_fts(rowid, title, description, subject)
+        VALUES (new.id, new.title, new.description, new.subject);
+    END
+    """,
+)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            if not any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall()):
+                return
+            cursor.execute(CREATE_FTS_TABLE)
+            for trigger in CREATE_TRIGGERS:
+                cursor.execute(trigger)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    elif connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+        index = GinIndex(SearchVector('title', 'description', 'subject', config='english'),
+                         name=GIN_INDEX)
+        schema_editor.add_index(apps.get_model('library', 'Note'), index)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
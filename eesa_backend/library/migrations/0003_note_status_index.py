@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0002_note_search_index'),
+        ('users', '0008_personsearchentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['status', 'uploaded_by'], name='library_not_status_624174_idx'),
+        ),
+    ]
@@ -19,5 +19,11 @@ class Note(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Also serves status-only filters (leftmost column)
+            models.Index(fields=['status', 'uploaded_by']),
+        ]
+    
     def __str__(self):
         return f"{self.title} - {self.status}"
\ No newline at end of file
@@ -0,0 +1,246 @@
+# library/search.py
+"""
+Full-text search over notes.
+
+SQLite keeps an FTS5 external-content table (library_note_fts) over the
+title, description and subject columns; triggers on library_note keep it
+in step with every insert, update and delete, including queryset.update()
+and bulk_create(). PostgreSQL uses a GIN index on the same tsvector
+expression the queries build. Both are created by the
+0002_note_search_index migration; install_note_search() recreates them if a
+later table rebuild drops the SQLite triggers (see the
+rebuild_note_search_index command).
+
+Searches match every word, the last one as a prefix so results appear while
+typing, rank by relevance and return a highlighted snippet. Databases
+without either index fall back to DRF's SearchFilter.
+"""
+import html
+import re
+from django.db import connections
+from django.db.models import Case, IntegerField, TextField, Value, When
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+FTS_TABLE = 'library_note_fts'
+GIN_INDEX = 'library_note_search_gin'
+SEARCH_CONFIG = 'english'
+SEARCH_FIELDS = ('title', 'description', 'subject')
+# bm25 column weights: a hit in the title counts most
+FTS_WEIGHTS = (10.0, 1.0, 5.0)
+
+# Snippets are built with control characters as highlight markers, escaped,
+# and only then given <mark> tags, so note text can't inject markup
+_MARK_START, _MARK_END = '\x02', '\x03'
+_WORD = re.compile(r'\w+')
+
+_SQLITE_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON library_note BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, subject)
+        VALUES (new.id, new.title, new.description, new.subject);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON library_note BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, subject)
+        VALUES ('delete', old.id, old.title, old.description, old.subject);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF title, description, subject ON library_note BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, subject)
+        VALUES ('delete', old.id, old.title, old.description, old.subject);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, subject)
+        VALUES (new.id, new.title, new.description, new.subject);
+    END
+    """,
+)
+
+
+def _search_vector():
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector(*SEARCH_FIELDS, config=SEARCH_CONFIG)
+
+
+def install_note_search(schema_editor, note_model):
+    """
+    Create the search index for the connection's database (idempotent).
+    SQLite builds without FTS5 are left on the SearchFilter fallback.
+    """
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        if not _sqlite_has_fts5(connection):
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"title, description, subject, content='library_note', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            for trigger in _SQLITE_TRIGGERS:
+                cursor.execute(trigger)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    elif connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM pg_indexes WHERE indexname = %s', [GIN_INDEX])
+            if cursor.fetchone():
+                return
+        schema_editor.add_index(note_model, GinIndex(_search_vector(), name=GIN_INDEX))
+    connection.note_search_available = None
+
+
+def uninstall_note_search(schema_editor, note_model):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+    connection.note_search_available = None
+
+
+def _sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def search_available(connection):
+    """Whether the database has the note search index (checked once per connection)"""
+    available = getattr(connection, 'note_search_available', None)
+    if available is None:
+        if connection.vendor == 'sqlite':
+            available = FTS_TABLE in connection.introspection.table_names()
+        elif connection.vendor == 'postgresql':
+            available = True
+        else:
+            available = False
+        connection.note_search_available = available
+    return available
+
+
+def _highlight(snippet):
+    return (
+        html.escape(snippet or '')
+        .replace(_MARK_START, '<mark>')
+        .replace(_MARK_END, '</mark>')
+    )
+
+
+def _sqlite_matches(connection, queryset, words, limit):
+    # Quote each word so FTS5 syntax in user input is taken literally
+    match = ' '.join(f'"{word}"' for word in words[:-1])
+    match = f'{match} "{words[-1]}"*'.strip()
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+
+    # Apply the caller's scope to the matches only (primary key lookups),
+    # rather than letting FTS5 re-run the MATCH for every visible note
+    scope_sql, scope_params = (
+        queryset.filter(pk__in=RawSQL('SELECT id FROM hits', ()))
+        .order_by().values('pk').query.sql_with_params()
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"WITH hits AS MATERIALIZED ("
+            f"  SELECT rowid AS id, bm25({FTS_TABLE}, {weights}) AS score"
+            f"  FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+            f"), top AS MATERIALIZED ("
+            f"  SELECT id, score FROM hits WHERE id IN ({scope_sql}) ORDER BY score LIMIT %s"
+            f") "
+            f"SELECT {FTS_TABLE}.rowid, snippet({FTS_TABLE}, -1, %s, %s, '…', 16) "
+            f"FROM {FTS_TABLE} JOIN top ON {FTS_TABLE}.rowid = top.id "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY top.score",
+            [match, *scope_params, limit, _MARK_START, _MARK_END, match]
+        )
+        return cursor.fetchall()
+
+
+def _postgresql_matches(queryset, words, limit):
+    from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+    tsquery = ' & '.join(f"'{word}'" for word in words[:-1])
+    tsquery = f"{tsquery} & '{words[-1]}':*" if tsquery else f"'{words[-1]}':*"
+    query = SearchQuery(tsquery, search_type='raw', config=SEARCH_CONFIG)
+
+    vector = _search_vector()
+    return list(
+        queryset.annotate(document=vector)
+        .filter(document=query)
+        .annotate(
+            rank=SearchRank(vector, query),
+            snippet=SearchHeadline(
+                'description', query, config=SEARCH_CONFIG,
+                start_sel=_MARK_START, stop_sel=_MARK_END, max_words=16, min_words=8
+            ),
+        )
+        .order_by('-rank', '-pk')
+        .values_list('pk', 'snippet')[:limit]
+    )
+
+
+def search_notes(queryset, text, limit=100):
+    """
+    Best `limit` notes in queryset matching text, in rank order and
+    annotated with search_position and search_snippet. Returns None when the
+    database has no search index, so the caller can fall back.
+    """
+    connection = connections[queryset.db]
+    if not search_available(connection):
+        return None
+
+    words = _WORD.findall(text.lower())
+    if not words:
+        return queryset.none()
+
+    if connection.vendor == 'sqlite':
+        matches = _sqlite_matches(connection, queryset, words, limit)
+    else:
+        matches = _postgresql_matches(queryset, words, limit)
+
+    if not matches:
+        return queryset.none()
+
+    return queryset.filter(pk__in=[pk for pk, _ in matches]).annotate(
+        search_position=Case(
+            *[When(pk=pk, then=Value(position)) for position, (pk, _) in enumerate(matches)],
+            output_field=IntegerField()
+        ),
+        search_snippet=Case(
+            *[When(pk=pk, then=Value(_highlight(snippet))) for pk, snippet in matches],
+            output_field=TextField()
+        ),
+    ).order_by('search_position')
+
+
+class NoteSearchFilter(filters.SearchFilter):
+    """
+    ?search= backed by the full-text index, ranked and limited to
+    ?limit= results (default 100, at most 500), so a broad search can't
+    return every note. Falls back to the plain SearchFilter over
+    view.search_fields when there is no index, which is not limited.
+    """
+    default_limit = 100
+    max_limit = 500
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return min(max(limit, 1), self.max_limit)
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        results = search_notes(queryset, ' '.join(terms), self.get_limit(request))
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+        return results
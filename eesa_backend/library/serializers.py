@@ -10,8 +10,21 @@ class NoteSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'file', 'uploaded_by', 
                  'uploaded_by_name', 'subject', 'status', 'reviewer', 
                  'reviewer_name', 'review_comment', 'created_at', 'updated_at']
+        # Read by get_reviewer_name, which the prefetch planner can't see into
+        select_related = ['reviewer__user']
     
     def get_reviewer_name(self, obj):
         if obj.reviewer:
             return obj.reviewer.user.get_full_name()
-        return None
\ No newline at end of file
+        return None
+
+class NoteSearchSerializer(NoteSerializer):
+    """Note with the highlighted match from a ?search= query"""
+    search_snippet = serializers.SerializerMethodField()
+    
+    class Meta(NoteSerializer.Meta):
+        fields = NoteSerializer.Meta.fields + ['search_snippet']
+    
+    def get_search_snippet(self, obj):
+        # Absent when the SearchFilter fallback answered the query
+        return getattr(obj, 'search_snippet', None)
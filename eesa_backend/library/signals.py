@@ -0,0 +1,38 @@
+# library/signals.py
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from users.utils import invalidate_notes_dashboards
+from .models import Note
+
+@receiver(post_init, sender=Note)
+def remember_note_status(sender, instance, **kwargs):
+    """
+    Keep the loaded status so a save can tell whether it changed
+    """
+    # Reading a deferred field here would cost a query per loaded row
+    if 'status' not in instance.get_deferred_fields():
+        instance._loaded_status = instance.status
+
+@receiver(post_save, sender=Note)
+def invalidate_notes_dashboard_on_save(sender, instance, created, **kwargs):
+    """
+    Student dashboards show the approved notes total, so expire them all
+    when a note is approved or stops being approved
+    """
+    if created:
+        changed = instance.status == 'approved'
+    else:
+        before = getattr(instance, '_loaded_status', None)
+        # Without the loaded status, assume it may have changed
+        changed = before is None or (before == 'approved') != (instance.status == 'approved')
+    if changed:
+        invalidate_notes_dashboards()
+    instance._loaded_status = instance.status
+
+@receiver(post_delete, sender=Note)
+def invalidate_notes_dashboard_on_delete(sender, instance, **kwargs):
+    """
+    Deleting an approved note lowers the approved notes total
+    """
+    if instance.status == 'approved':
+        invalidate_notes_dashboards()
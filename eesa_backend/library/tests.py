@@ -1,3 +1,144 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from users.models import CustomUser, Student, Faculty
+from .models import Note
+from .search import NoteSearchFilter
 
-# Create your tests here.
+
+class NoteListQueryCountTests(TestCase):
+    """Note lists run the same queries for 1 row as for many"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, = CustomUser.objects.bulk_create([
+            CustomUser(username='admin', user_type='admin', password='!')
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.rows = 0
+
+    def add_notes(self, count, status):
+        """Each note gets its own uploader and reviewer to load"""
+        for i in range(self.rows, self.rows + count):
+            student_user, faculty_user = CustomUser.objects.bulk_create([
+                CustomUser(username=f'student{i}', user_type='student', password='!'),
+                CustomUser(username=f'faculty{i}', user_type='faculty', password='!'),
+            ])
+            Note.objects.create(
+                title=f'Note {i}', description='', file=f'notes/{i}.pdf', subject='Circuits',
+                status=status,
+                uploaded_by=Student.objects.create(user=student_user, student_id=f'STU{i:04d}'),
+                reviewer=Faculty.objects.create(user=faculty_user, faculty_id=f'FAC{i:03d}'),
+            )
+        self.rows += count
+
+    def assertListQueriesFlat(self, url, status='approved'):
+        self.add_notes(1, status)
+        # The first search checks once per process whether the index exists
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as one_row:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+        self.add_notes(9, status)
+        with self.assertNumQueries(len(one_row)):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 10)
+
+    def test_list(self):
+        self.assertListQueriesFlat('/api/library/notes/')
+
+    def test_search(self):
+        self.assertListQueriesFlat('/api/library/notes/?search=circuits')
+
+    def test_pending(self):
+        self.assertListQueriesFlat('/api/library/notes/pending/', status='pending')
+
+
+class NoteSearchTests(TestCase):
+    """Full-text ?search= ranking, prefix matching, snippets and scope"""
+
+    @classmethod
+    def setUpTestData(cls):
+        student_user, other_user = CustomUser.objects.bulk_create([
+            CustomUser(username='student', user_type='student', password='!'),
+            CustomUser(username='other', user_type='student', password='!'),
+        ])
+        cls.student = Student.objects.create(user=student_user, student_id='STU0001')
+        cls.other = Student.objects.create(user=other_user, student_id='STU0002')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student.user)
+
+    def add_note(self, title, description='', subject='Circuits', status='approved', uploaded_by=None):
+        return Note.objects.create(title=title, description=description, file='notes/n.pdf',
+                                   subject=subject, status=status,
+                                   uploaded_by=uploaded_by or self.other)
+
+    def search(self, text, **params):
+        response = self.client.get('/api/library/notes/', {'search': text, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_title_hits_rank_first(self):
+        in_description = self.add_note('Module summary', 'Worked examples on transformers')
+        in_title = self.add_note('Transformers', 'Worked examples')
+        self.assertEqual([note['id'] for note in self.search('transformers')],
+                         [in_title.pk, in_description.pk])
+
+    def test_last_word_matches_as_prefix(self):
+        note = self.add_note('Laplace transform tables')
+        self.add_note('Fourier series')
+        self.assertEqual([result['id'] for result in self.search('transf')], [note.pk])
+        self.assertEqual([result['id'] for result in self.search('laplace tr')], [note.pk])
+        # Every word has to match, and only the last one as a prefix
+        self.assertEqual(self.search('lap transform'), [])
+        self.assertEqual(self.search('fourier transform'), [])
+
+    def test_snippet_escapes_note_text(self):
+        self.add_note('Filters', 'Passive <mark>filters</mark> and <script>alert(1)</script> notes')
+        snippet, = [note['search_snippet'] for note in self.search('passive')]
+        self.assertEqual(snippet.count('<mark>'), 1)
+        self.assertIn('<mark>Passive</mark>', snippet)
+        self.assertIn('&lt;mark&gt;filters&lt;/mark&gt;', snippet)
+        self.assertIn('&lt;script&gt;', snippet)
+        self.assertNotIn('<script>', snippet)
+
+    def test_query_syntax_is_taken_literally(self):
+        self.add_note('Relay protection', 'NEAR the busbar')
+        self.assertEqual(self.search('NEAR("relay" OR *'), [])
+        self.assertEqual(len(self.search('relay NEAR')), 1)
+
+    def test_scope_and_limit(self):
+        own_pending = self.add_note('Stability notes', status='pending', uploaded_by=self.student)
+        self.add_note('Stability questions', status='pending')
+        for i in range(3):
+            self.add_note(f'Stability part {i}')
+
+        results = self.search('stability')
+        self.assertEqual(len(results), 4)
+        self.assertIn(own_pending.pk, [note['id'] for note in results])
+        self.assertEqual(len(self.search('stability', limit=2)), 2)
+
+    def test_results_are_capped(self):
+        Note.objects.bulk_create([
+            Note(title=f'Oscillator lab {i}', file='notes/n.pdf', subject='Circuits',
+                 status='approved', uploaded_by=self.other)
+            for i in range(NoteSearchFilter.default_limit + 1)
+        ])
+
+        self.assertEqual(len(self.search('oscillator')), NoteSearchFilter.default_limit)
+        self.assertEqual(len(self.search('oscillator', limit=1000)),
+                         NoteSearchFilter.default_limit + 1)
+        self.assertEqual(len(self.search('oscillator', limit=0)), 1)
+        # Without ?search= the list is not capped
+        response = self.client.get('/api/library/notes/')
+        self.assertEqual(len(response.data), NoteSearchFilter.default_limit + 1)
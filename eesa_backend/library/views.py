@@ -1,17 +1,34 @@
-from rest_framework import viewsets, permissions, filters
+from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Note
-from .serializers import NoteSerializer
+from .serializers import NoteSerializer, NoteSearchSerializer
+from .search import NoteSearchFilter
 from users.permissions import IsAdminOrFaculty, IsStudent, IsOwnerOrAdminOrFaculty
+from users.mixins import AutoPrefetchMixin
+from users.counters import read_counters
+from users.principal import get_principal
 
-class NoteViewSet(viewsets.ModelViewSet):
+class NoteViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
+    """
+    Notes visible to the current user.
+
+    ?search= returns the best matches in rank order, each with a highlighted
+    search_snippet. Search results are capped at ?limit= notes: 100 by
+    default, at most 500; lists without ?search= are not capped.
+    """
     serializer_class = NoteSerializer
-    filter_backends = [filters.SearchFilter]
+    # Full-text search with ranking and snippets; LIKE search where unsupported
+    filter_backends = [NoteSearchFilter]
     search_fields = ['title', 'description', 'subject']
     
+    def get_serializer_class(self):
+        if self.action == 'list' and self.request.query_params.get('search'):
+            return NoteSearchSerializer
+        return super().get_serializer_class()
+    
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         
         # Check if we have a status filter from query parameters
         status_filter = self.request.query_params.get('status', None)
@@ -19,7 +36,7 @@ class NoteViewSet(viewsets.ModelViewSet):
         # For list and retrieve actions
         if self.action in ['list', 'retrieve']:
             # If user is admin or faculty
-            if user.is_authenticated and (user.is_superuser or user.user_type in ['admin', 'faculty']):
+            if principal.is_admin_or_faculty:
                 queryset = Note.objects.all()
                 # Apply status filter if provided
                 if status_filter:
@@ -27,14 +44,14 @@ class NoteViewSet(viewsets.ModelViewSet):
                 return queryset
             
             # For students - can see approved notes and their own notes
-            if user.is_authenticated and user.user_type == 'student' and hasattr(user, 'student_profile'):
+            if principal.is_student and principal.student_id:
                 if status_filter:
                     if status_filter == 'approved':
                         return Note.objects.filter(status='approved')
                     else:
                         # For other statuses, only show their own notes
                         return Note.objects.filter(
-                            uploaded_by=user.student_profile,
+                            uploaded_by_id=principal.student_id,
                             status=status_filter
                         )
                 else:
@@ -42,22 +59,22 @@ class NoteViewSet(viewsets.ModelViewSet):
                     return Note.objects.filter(
                         status='approved'
                     ) | Note.objects.filter(
-                        uploaded_by=user.student_profile
+                        uploaded_by_id=principal.student_id
                     )
             
             # For unauthenticated users - only approved notes
             return Note.objects.filter(status='approved')
         
         # For other actions (create, update, delete, etc.)
-        if user.is_authenticated and (user.is_superuser or user.user_type in ['admin', 'faculty']):
+        if principal.is_admin_or_faculty:
             return Note.objects.all()
         
         # Students can only interact with approved notes and their own notes
-        if user.is_authenticated and user.user_type == 'student' and hasattr(user, 'student_profile'):
+        if principal.is_student and principal.student_id:
             return Note.objects.filter(
                 status='approved'
             ) | Note.objects.filter(
-                uploaded_by=user.student_profile
+                uploaded_by_id=principal.student_id
             )
         
         # Default: only approved notes
@@ -89,8 +106,10 @@ class NoteViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Status must be either approved or rejected'}, 
                         status=400)
         
+        principal = get_principal(request)
+        
         # Check if user is faculty or admin
-        if not request.user.is_superuser and not (hasattr(request.user, 'faculty_profile') or request.user.user_type in ['admin', 'faculty']):
+        if not (principal.is_admin_or_faculty or principal.faculty_id):
             return Response({'error': 'Only faculty or admin can review notes'}, 
                         status=403)
         
@@ -98,7 +117,7 @@ class NoteViewSet(viewsets.ModelViewSet):
         note.review_comment = comment
         
         # Set the reviewer if the user is faculty
-        if hasattr(request.user, 'faculty_profile'):
+        if principal.faculty_id:
             note.reviewer = request.user.faculty_profile
         
         note.save()
@@ -110,27 +129,31 @@ class NoteViewSet(viewsets.ModelViewSet):
     def pending(self, request):
         """Get all pending notes for admin/faculty review"""
         # No need to check permissions here as it's handled by get_permissions
-        pending_notes = Note.objects.filter(status='pending')
+        pending_notes = self.optimize_queryset(Note.objects.filter(status='pending'))
         serializer = self.get_serializer(pending_notes, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def dashboard_stats(self, request):
         """Get dashboard statistics for admin"""
-        # Calculate statistics
+        # Read the maintained counters in one query
+        counters = read_counters(['notes', 'notes_pending', 'notes_approved', 'notes_rejected'])
         stats = {
-            'total_notes': Note.objects.count(),
-            'pending_notes': Note.objects.filter(status='pending').count(),
-            'approved_notes': Note.objects.filter(status='approved').count(),
-            'rejected_notes': Note.objects.filter(status='rejected').count(),
+            'total_notes': counters['notes'],
+            'pending_notes': counters['notes_pending'],
+            'approved_notes': counters['notes_approved'],
+            'rejected_notes': counters['notes_rejected'],
         }
         return Response(stats)
     
     @action(detail=False, methods=['get'])
     def my_notes(self, request):
         """Get notes uploaded by the current student"""
-        if request.user.user_type == 'student' and hasattr(request.user, 'student_profile'):
-            my_notes = Note.objects.filter(uploaded_by=request.user.student_profile)
+        principal = get_principal(request)
+        if principal.is_student and principal.student_id:
+            my_notes = self.optimize_queryset(
+                Note.objects.filter(uploaded_by_id=principal.student_id)
+            )
             serializer = self.get_serializer(my_notes, many=True)
             return Response(serializer.data)
         return Response({'error': 'Only students can access their notes'}, status=403)
\ No newline at end of file
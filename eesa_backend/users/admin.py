@@ -1,9 +1,10 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
 from django import forms
 from django.utils import timezone
 from .models import CustomUser, Student, Faculty
+from .utils import update_student_semesters
 
 class StudentInline(admin.StackedInline):
     model = Student
@@ -116,13 +117,19 @@ class StudentAdmin(admin.ModelAdmin):
     actions = ['update_semesters', 'mark_as_alumni', 'mark_as_active']
     
     def update_semesters(self, request, queryset):
-        updated = 0
-        for student in queryset:
-            old_sem = student.current_semester
-            student.update_semester()
-            if old_sem != student.current_semester:
-                updated += 1
-        self.message_user(request, f'{updated} students had their semesters updated.')
+        """
+        Set-based: one UPDATE per group of (enrollment year, course), without
+        Student.save() or its signals; update_student_semesters expires the
+        caches those signals would
+        """
+        result = update_student_semesters(queryset)
+        self.message_user(request, f'{result["updated_count"]} students had their semesters updated.')
+        if result['error_count']:
+            self.message_user(
+                request,
+                f'{result["error_count"]} students could not be updated (enrollment year in the future).',
+                level=messages.WARNING
+            )
     update_semesters.short_description = 'Update semesters based on enrollment year'
     
     def mark_as_alumni(self, request, queryset):
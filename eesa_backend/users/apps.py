@@ -6,4 +6,11 @@ class UsersConfig(AppConfig):
     name = 'users'
     
     def ready(self):
-        import users.signals  # Import signals when app is ready
\ No newline at end of file
+        import users.signals  # Import signals when app is ready
+        from users.counters import connect_signals
+        connect_signals()
+        from eesa_backend import sqlite
+        sqlite.connect_signals()
+        from django.core import checks
+        from eesa_backend.routers import check_sticky_cache
+        checks.register(check_sticky_cache, checks.Tags.caches)
\ No newline at end of file
@@ -0,0 +1,166 @@
+# users/authentication.py
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """
+    Bounded, thread-safe LRU cache of token key -> (user, token, version),
+    with a TTL.
+
+    The cache lives in the worker process. Signals evict entries locally and
+    move the user to a new version in the shared cache (see user_version),
+    so other workers drop their copy on its next use. That only works when
+    CACHES['default'] really is shared, so it is not used otherwise (see
+    token_cache_enabled).
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_users(self, user_ids):
+        user_ids = set(user_ids)
+        with self._lock:
+            for key in [key for key, (_expires, (user, _token, _version)) in self._entries.items()
+                        if user.pk in user_ids]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(
+    max_size=getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'TOKEN_AUTH_CACHE_TTL', 60),
+)
+
+
+def token_cache_enabled():
+    """
+    Whether token_cache may be used. A per-process (LocMemCache) or dummy
+    default cache can't carry a user's new version to the other workers,
+    which would keep accepting a revoked token until the TTL runs out.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def _user_version_key(user_id):
+    return f'auth:user:{user_id}:version'
+
+
+def user_version(user_id):
+    """
+    Current version of a user's cached tokens, shared by every worker
+    through the default cache; a cached entry with another version is stale
+    """
+    key = _user_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def _expire_user_tokens(user_ids):
+    cache.set_many({_user_version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, None)
+    token_cache.delete_users(user_ids)
+
+
+def invalidate_token(key, user_id):
+    """Stop accepting a token in every worker once the transaction commits"""
+    # Evict again on commit, in case a request cached the old row meanwhile
+    token_cache.delete(key)
+    transaction.on_commit(lambda: _expire_user_tokens([user_id]))
+
+
+def invalidate_user_tokens(*user_ids):
+    """
+    Reload these users in every worker once the transaction commits, e.g.
+    after a user is deactivated or a profile is saved
+    """
+    if user_ids:
+        token_cache.delete_users(user_ids)
+        transaction.on_commit(lambda: _expire_user_tokens(user_ids))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that loads the user together with both profiles in
+    one query, so `hasattr(user, 'student_profile')` style checks in the
+    views are answered from the preloaded relations. When the default cache
+    is shared between workers the result is kept in token_cache, and a
+    cache hit costs no queries.
+
+    A hit is only used while the user's shared version is unchanged, so
+    deactivating a user or deleting a token takes effect in every worker on
+    the next request. The version is read after the row is loaded; a change
+    committed between the two is picked up within TOKEN_AUTH_CACHE_TTL.
+    """
+
+    def authenticate_credentials(self, key):
+        use_cache = token_cache_enabled()
+        cached = token_cache.get(key) if use_cache else None
+        if cached is not None and cached[2] != user_version(cached[0].pk):
+            cached = None
+        if cached is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related(
+                    'user', 'user__student_profile', 'user__faculty_profile'
+                ).get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if not use_cache:
+                return self.check_active(token.user, token)
+            cached = (token.user, token, user_version(token.user_id))
+            token_cache.set(key, cached)
+
+        user, token, _version = cached
+        # Each request gets its own copy, so views can't change the cached user
+        user = copy.deepcopy(user)
+        token = copy.copy(token)
+        token.user = user
+        return self.check_active(user, token)
+
+    def check_active(self, user, token):
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (user, token)
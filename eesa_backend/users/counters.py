@@ -0,0 +1,106 @@
+# users/counters.py
+"""
+Counter cache for dashboard totals.
+
+Each counter is a row in the Counter table holding the number of rows of a
+model that match an optional set of field values. Model signals keep the
+counters in step with creates, deletes and field changes, so dashboards read
+every total with a single query instead of running COUNT(*) over each table.
+reconcile_counters() recounts from scratch and is run by the
+reconcile_counters management command to repair any drift (e.g. from
+queryset.update() or bulk_create(), which bypass signals).
+"""
+from collections import Counter as Tally
+from django.apps import apps as django_apps
+from django.db.models import F
+from django.db.models.signals import post_init, post_save, post_delete
+from django.utils import timezone
+
+# counter name -> (model label, field values a row must match)
+COUNTERS = {
+    'students': ('users.Student', {}),
+    'faculty': ('users.Faculty', {}),
+    'subjects': ('academics.Subject', {}),
+    'notes': ('library.Note', {}),
+    'notes_pending': ('library.Note', {'status': 'pending'}),
+    'notes_approved': ('library.Note', {'status': 'approved'}),
+    'notes_rejected': ('library.Note', {'status': 'rejected'}),
+    'events': ('events.Event', {}),
+}
+
+def _counters_for(label):
+    return {name: match for name, (model, match) in COUNTERS.items() if model == label}
+
+def _matching(instance, counters):
+    """Names of the counters an instance currently counts towards"""
+    return frozenset(
+        name for name, match in counters.items()
+        if all(getattr(instance, field) == value for field, value in match.items())
+    )
+
+def increment(deltas):
+    """Apply {counter name: delta} with one UPDATE per changed counter"""
+    from .models import Counter
+    for name, delta in deltas.items():
+        if delta:
+            Counter.objects.filter(name=name).update(
+                value=F('value') + delta, updated_at=timezone.now()
+            )
+
+def read_counters(names):
+    """Read several counters with a single query; unknown counters read as 0"""
+    from .models import Counter
+    values = dict(Counter.objects.filter(name__in=names).values_list('name', 'value'))
+    return {name: values.get(name, 0) for name in names}
+
+def reconcile_counters(apps=django_apps, dry_run=False):
+    """
+    Recount every counter from its table and store the result.
+    Returns {name: (stored value, actual value)} for counters that drifted.
+    `apps` may be swapped for another app registry.
+    """
+    Counter = apps.get_model('users', 'Counter')
+    stored = dict(Counter.objects.values_list('name', 'value'))
+    drift = {}
+
+    for name, (label, match) in COUNTERS.items():
+        actual = apps.get_model(label).objects.filter(**match).count()
+        if stored.get(name) != actual:
+            drift[name] = (stored.get(name), actual)
+            if not dry_run:
+                Counter.objects.update_or_create(name=name, defaults={'value': actual})
+
+    return drift
+
+def _remember_state(sender, instance, **kwargs):
+    counters = _counters_for(sender._meta.label)
+    fields = {field for match in counters.values() for field in match}
+    # Reading a deferred field here would cost a query per loaded row
+    if fields & instance.get_deferred_fields():
+        return
+    instance._counter_state = _matching(instance, counters)
+
+def _count_save(sender, instance, created, **kwargs):
+    counters = _counters_for(sender._meta.label)
+    after = _matching(instance, counters)
+    # Without a remembered state only creates and deletes can move a counter
+    before = frozenset() if created else getattr(instance, '_counter_state', after)
+
+    deltas = Tally(after - before)
+    deltas.subtract(before - after)
+    increment(deltas)
+    instance._counter_state = after
+
+def _count_delete(sender, instance, **kwargs):
+    counters = _counters_for(sender._meta.label)
+    increment({name: -1 for name in _matching(instance, counters)})
+
+def connect_signals():
+    """Hook the counted models' signals up; called from UsersConfig.ready()"""
+    for label in {model for model, _ in COUNTERS.values()}:
+        model = django_apps.get_model(label)
+        # Only models with field-dependent counters need the loaded state
+        if any(_counters_for(label).values()):
+            post_init.connect(_remember_state, sender=model, dispatch_uid=f'counters_init_{label}')
+        post_save.connect(_count_save, sender=model, dispatch_uid=f'counters_save_{label}')
+        post_delete.connect(_count_delete, sender=model, dispatch_uid=f'counters_delete_{label}')
@@ -105,7 +105,7 @@ class StudentSearchForm(forms.Form):
     )
     course = forms.ChoiceField(
         required=False,
-        choices=[('', 'All Courses')] + Student.COURSE_CHOICES,
+        choices=[('', 'All Courses')] + list(Student.COURSE_CHOICES),
         widget=forms.Select(attrs={'class': 'form-control'})
     )
     branch = forms.CharField(
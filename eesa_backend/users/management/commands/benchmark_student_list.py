@@ -0,0 +1,138 @@
+# users/management/commands/benchmark_student_list.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from users.counters import increment
+from users.models import CustomUser, Student
+from users.views import StudentViewSet
+import logging
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'BENCH'
+
+class Command(BaseCommand):
+    help = ('Compare the full student list with ?view=compact over a large batch: '
+            'time, peak memory and queries per request. Creates its own BENCH* '
+            'students and deletes them afterwards; run it on a staging copy')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=10000,
+            help='Number of students in the listed batch',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Timed requests per mode; the fastest is reported',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the benchmark data instead of deleting it',
+        )
+
+    def handle(self, *args, **options):
+        if CustomUser.objects.filter(username__startswith=f'{PREFIX.lower()}_').exists():
+            raise CommandError(
+                f'{PREFIX} data from an earlier run exists; delete users named '
+                f'{PREFIX.lower()}_* first'
+            )
+
+        self.stdout.write(f'Creating {options["students"]} students...')
+        admin = self.create_data(options['students'])
+
+        try:
+            results = {
+                mode: self.measure(admin, params, options['repeat'])
+                for mode, params in [
+                    ('full', {'batch': PREFIX}),
+                    ('compact', {'batch': PREFIX, 'view': 'compact'}),
+                ]
+            }
+        finally:
+            if not options['keep']:
+                self.delete_data()
+
+        self.write_summary(results, options)
+
+    def create_data(self, count):
+        today = timezone.now().date()
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f'{PREFIX.lower()}_admin', user_type='admin', password='!')
+        ] + [
+            CustomUser(username=f'{PREFIX.lower()}_s{i}', user_type='student', password='!',
+                       first_name='Bench', last_name=f'Student {i}',
+                       email=f'{PREFIX.lower()}_s{i}@example.com')
+            for i in range(count)
+        ])
+        students = Student.objects.bulk_create([
+            Student(user=user, student_id=f'{PREFIX}{i:06d}', enrollment_year=today.year,
+                    current_semester=1, branch='Electrical', batch=PREFIX)
+            for i, user in enumerate(users[1:])
+        ])
+        # bulk_create skips the counter signals; deleting the data decrements them
+        increment({'students': len(students)})
+        return users[0]
+
+    def delete_data(self):
+        self.stdout.write('Deleting benchmark data...')
+        with transaction.atomic():
+            CustomUser.objects.filter(username__startswith=f'{PREFIX.lower()}_').delete()
+
+    def request(self, admin, params):
+        """Run one list request through the viewset and render it"""
+        request = APIRequestFactory().get('/api/users/students/', params, HTTP_HOST='localhost')
+        force_authenticate(request, user=admin)
+        response = StudentViewSet.as_view({'get': 'list'})(request)
+        if response.status_code != 200:
+            raise CommandError(f'Student list returned {response.status_code}: {response.data}')
+        response.render()
+        return response
+
+    def measure(self, admin, params, repeat):
+        """Fastest of `repeat` requests, plus peak memory and queries of one more"""
+        timings = []
+        for _ in range(repeat):
+            began = time.perf_counter()
+            response = self.request(admin, params)
+            timings.append(time.perf_counter() - began)
+
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                self.request(admin, params)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'seconds': min(timings),
+            'peak_mb': peak / 2**20,
+            'queries': len(queries),
+            'rows': len(response.data),
+            'bytes': len(response.content),
+        }
+
+    def write_summary(self, results, options):
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(f'Students listed: {options["students"]}')
+        for mode, result in results.items():
+            self.stdout.write(
+                f'{mode:<8} {result["seconds"]:.2f}s, peak {result["peak_mb"]:.1f} MB, '
+                f'{result["queries"]} queries, {result["rows"]} rows, '
+                f'{result["bytes"] / 1024:.0f} KiB'
+            )
+        speedup = results['full']['seconds'] / results['compact']['seconds']
+        self.stdout.write(self.style.SUCCESS(f'Compact list is {speedup:.1f}x faster'))
+        self.stdout.write('='*50 + '\n')
+
+        logger.info(f'Student list benchmark: full {results["full"]["seconds"]:.2f}s, '
+                    f'compact {results["compact"]["seconds"]:.2f}s')
@@ -0,0 +1,329 @@
+# users/management/commands/generate_department.py
+from datetime import date, timedelta
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from academics.models import Subject, FacultySubject, Attendance, InternalMark
+from academics.utils import refresh_attendance_summaries
+from events.models import Event
+from library.models import Note
+from users.counters import reconcile_counters
+from users.models import CustomUser, Student, Faculty
+from users.search import index_profiles
+from users.utils import (allocate_student_ids, calculate_current_semester, generate_faculty_id,
+                         invalidate_batch_dashboards, invalidate_batch_student_counts)
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+FIRST_NAMES = ['Aarav', 'Aditi', 'Akhil', 'Anjali', 'Arjun', 'Devika', 'Farhan', 'Gayathri',
+               'Hari', 'Irfan', 'Jasmine', 'Karthik', 'Lakshmi', 'Meera', 'Nikhil', 'Nisha',
+               'Pranav', 'Riya', 'Sandeep', 'Sneha', 'Tara', 'Varun', 'Vishnu', 'Zainab']
+LAST_NAMES = ['Abraham', 'Babu', 'Chandran', 'Das', 'George', 'Joseph', 'Kumar', 'Menon',
+              'Nair', 'Pillai', 'Rahman', 'Raj', 'Thomas', 'Varghese', 'Warrier']
+SUBJECTS = [
+    'Basic Electrical Engineering', 'Engineering Mathematics I', 'Engineering Physics',
+    'Engineering Graphics', 'Programming in C', 'Engineering Mathematics II',
+    'Circuits and Networks', 'Engineering Chemistry', 'Basic Electronics', 'Engineering Mechanics',
+    'Electrical Machines I', 'Analog Electronics', 'Signals and Systems',
+    'Measurements and Instrumentation', 'Network Theory', 'Electrical Machines II',
+    'Digital Electronics', 'Electromagnetic Theory', 'Control Systems', 'Microprocessors',
+    'Power Systems I', 'Power Electronics', 'Linear Integrated Circuits',
+    'Digital Signal Processing', 'Electrical Drives', 'Power Systems II', 'Switchgear and Protection',
+    'Embedded Systems', 'High Voltage Engineering', 'Renewable Energy Systems',
+    'Power System Analysis', 'Electrical Design', 'Smart Grid Technology', 'Industrial Automation',
+    'Energy Auditing', 'Power Quality', 'Electric Vehicles', 'FACTS Controllers',
+    'Special Electrical Machines', 'Project Management',
+]
+NOTE_KINDS = ['Lecture notes', 'Solved problems', 'Module summary', 'Previous year questions',
+              'Lab manual', 'Formula sheet']
+NOTE_TOPICS = ['transformers', 'induction motors', 'Fourier series', 'Laplace transform',
+               'op-amp circuits', 'load flow', 'fault analysis', 'rectifiers', 'inverters',
+               'stability', 'PID control', 'Kirchhoff laws', 'three phase circuits',
+               'synchronous machines', 'filters', 'sampling theorem', 'protection relays']
+EVENTS = ['Technical Talk', 'Workshop', 'Project Expo', 'Hackathon', 'Alumni Meet',
+          'Industrial Visit', 'Paper Presentation', 'Quiz Competition']
+VENUES = ['Seminar Hall', 'EE Department Lab', 'Main Auditorium', 'Conference Room', 'Online']
+
+class Command(BaseCommand):
+    help = ('Generate a synthetic department (students across batches, faculty, subjects, '
+            'teaching assignments, attendance, internal marks, notes and events) with bulk '
+            'inserts, for benchmarks and load tests. Every generated user gets --password')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=400,
+                            help='Number of students, spread evenly over the batches')
+        parser.add_argument('--batches', type=int, default=4,
+                            help='Number of batches, enrolled in consecutive years up to now')
+        parser.add_argument('--faculty', type=int, default=24, help='Number of faculty')
+        parser.add_argument('--subjects-per-semester', type=int, default=5,
+                            help='Subjects taught in each semester')
+        parser.add_argument('--attendance', type=int, default=40,
+                            help='Attendance rows per student per semester studied')
+        parser.add_argument('--tests', type=int, default=2,
+                            help='Internal tests marked per student per subject')
+        parser.add_argument('--notes', type=int, default=300, help='Number of library notes')
+        parser.add_argument('--events', type=int, default=20, help='Number of events')
+        parser.add_argument('--branch', default='Electrical',
+                            help='Branch (and faculty department) of the generated people')
+        parser.add_argument('--password', default='loadtest123',
+                            help='Password of every generated user (hashed once)')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed, so runs with the same options match')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows per bulk INSERT')
+
+    def handle(self, *args, **options):
+        if options['students'] < options['batches'] or options['faculty'] < 1:
+            raise CommandError('Need at least one student per batch and one faculty member')
+
+        self.random = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.password = make_password(options['password'])
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            subjects = self.create_subjects(options['subjects_per_semester'])
+            faculty = self.create_faculty(options['faculty'], options['branch'])
+            admin = self.create_admin(options['branch'])
+            batches = self.create_students(options['students'], options['batches'], options['branch'])
+            teachers = self.assign_subjects(batches, subjects, faculty)
+            attendance = self.create_attendance(batches, subjects, teachers, options['attendance'])
+            marks = self.create_marks(batches, subjects, teachers, options['tests'])
+            notes = self.create_notes(batches, faculty, options['notes'])
+            events = self.create_events(faculty, options['events'])
+
+            # bulk_create skipped the counter signals and cached batch figures
+            reconcile_counters()
+            for batch in batches:
+                invalidate_batch_dashboards(batch)
+            invalidate_batch_student_counts(batches)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(f'Batches: {", ".join(batches)}')
+        self.stdout.write(f'Students: {sum(len(students) for _, students in batches.values())}')
+        self.stdout.write(f'Faculty: {len(faculty)}')
+        self.stdout.write(f'Admin: {admin.username}')
+        self.stdout.write(f'Subjects: {sum(len(semester) for semester in subjects.values())}')
+        self.stdout.write(f'Teaching assignments: {len(teachers)}')
+        self.stdout.write(f'Attendance rows: {attendance}')
+        self.stdout.write(f'Internal marks: {marks}')
+        self.stdout.write(f'Notes: {notes}')
+        self.stdout.write(f'Events: {events}')
+        self.stdout.write(self.style.SUCCESS(f'Department generated in {elapsed:.1f}s'))
+        self.stdout.write('='*50 + '\n')
+        logger.info(f'Generated department: {attendance} attendance rows in {elapsed:.1f}s')
+
+    def name(self):
+        return self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+
+    def create_subjects(self, per_semester):
+        """Subjects for semesters 1-8, reusing any that already exist; {semester: [Subject]}"""
+        names = iter(SUBJECTS)
+        codes = {}
+        for semester in range(1, 9):
+            for number in range(1, per_semester + 1):
+                codes[f'EE{semester}{number:02d}'] = (
+                    semester, next(names, f'Elective {semester}.{number}')
+                )
+        Subject.objects.bulk_create(
+            [Subject(code=code, name=name, semester=semester)
+             for code, (semester, name) in codes.items()],
+            ignore_conflicts=True,
+        )
+
+        subjects = {semester: [] for semester in range(1, 9)}
+        for subject in Subject.objects.filter(code__in=codes).order_by('code'):
+            subjects[codes[subject.code][0]].append(subject)
+        return subjects
+
+    def create_faculty(self, count, department):
+        designations = [choice for choice, _ in Faculty.DESIGNATION_CHOICES]
+        members = []
+        for _ in range(count):
+            joining_year = self.random.randint(2005, timezone.now().year)
+            faculty_id = generate_faculty_id(department, joining_year)
+            first_name, last_name = self.name()
+            user = CustomUser(
+                username=faculty_id.lower(), password=self.password, user_type='faculty',
+                first_name=first_name, last_name=last_name,
+                email=f'{faculty_id.lower()}@eesa.example',
+            )
+            members.append(Faculty(
+                user=user, faculty_id=faculty_id, department=department,
+                designation=self.random.choice(designations[:3]),
+                joining_date=date(joining_year, 7, 1),
+                experience_years=timezone.now().year - joining_year,
+            ))
+
+        CustomUser.objects.bulk_create([member.user for member in members], batch_size=self.chunk_size)
+        for member in members:
+            member.user_id = member.user.pk
+        Faculty.objects.bulk_create(members, batch_size=self.chunk_size)
+        index_profiles(faculty=members)
+        return members
+
+    def create_admin(self, department):
+        """The department's admin user, for the admin dashboard; reused if it exists"""
+        username = f'{department.lower()}_admin'
+        CustomUser.objects.bulk_create([
+            CustomUser(username=username, password=self.password, user_type='admin',
+                       first_name=department, last_name='Admin',
+                       email=f'{username}@eesa.example')
+        ], ignore_conflicts=True)
+        return CustomUser.objects.get(username=username)
+
+    def create_students(self, count, batch_count, branch):
+        """{batch: (current semester, [Student])}, one batch per enrollment year"""
+        now = timezone.now()
+        academic_year = now.year if now.month >= 8 else now.year - 1
+        batches = {}
+        for index in range(batch_count):
+            enrollment_year = academic_year - index
+            size = count // batch_count + (1 if index < count % batch_count else 0)
+            semester = calculate_current_semester(enrollment_year)
+            batch = f'{enrollment_year}-{enrollment_year + 4}'
+
+            students = []
+            for student_id in allocate_student_ids(enrollment_year, 'BTech', branch, size):
+                first_name, last_name = self.name()
+                user = CustomUser(
+                    username=student_id.lower(), password=self.password, user_type='student',
+                    first_name=first_name, last_name=last_name,
+                    email=f'{student_id.lower()}@eesa.example',
+                )
+                students.append(Student(
+                    user=user, student_id=student_id, enrollment_year=enrollment_year,
+                    current_semester=semester, course='BTech', branch=branch, batch=batch,
+                ))
+
+            CustomUser.objects.bulk_create([student.user for student in students],
+                                           batch_size=self.chunk_size)
+            for student in students:
+                student.user_id = student.user.pk
+            Student.objects.bulk_create(students, batch_size=self.chunk_size)
+            index_profiles(students=students)
+            batches[batch] = (semester, students)
+        return batches
+
+    def assign_subjects(self, batches, subjects, faculty):
+        """Give every subject a batch has studied a teacher; {(subject pk, batch): Faculty}"""
+        teachers = {}
+        position = 0
+        for batch, (current_semester, _) in batches.items():
+            for semester in range(1, current_semester + 1):
+                for subject in subjects[semester]:
+                    teachers[(subject.pk, batch)] = faculty[position % len(faculty)]
+                    position += 1
+
+        FacultySubject.objects.bulk_create(
+            [FacultySubject(faculty=member, subject_id=subject_id, batch=batch)
+             for (subject_id, batch), member in teachers.items()],
+            batch_size=self.chunk_size, ignore_conflicts=True,
+        )
+        return teachers
+
+    def semester_days(self, enrollment_year, semester):
+        """Teaching days (weekdays) of a semester, up to today"""
+        start = date(enrollment_year + semester // 2, 1 if semester % 2 == 0 else 8, 1)
+        end = min(start + timedelta(days=120), timezone.now().date())
+        return [start + timedelta(days=offset) for offset in range((end - start).days + 1)
+                if (start + timedelta(days=offset)).weekday() < 5]
+
+    def create_attendance(self, batches, subjects, teachers, per_semester):
+        """
+        Class sessions are shared by the whole batch: each semester every
+        subject gets per_semester / subjects (date, hour) slots and every
+        student has a row per slot
+        """
+        total = 0
+        for batch, (current_semester, students) in batches.items():
+            enrollment_year = students[0].enrollment_year
+            for semester in range(1, current_semester + 1):
+                days = self.semester_days(enrollment_year, semester)
+                semester_subjects = subjects[semester]
+                if not days or not semester_subjects:
+                    continue
+
+                slots_per_subject = max(1, per_semester // len(semester_subjects))
+                rows = []
+                for subject in semester_subjects:
+                    faculty = teachers[(subject.pk, batch)]
+                    slots = self.random.sample(
+                        [(day, hour) for day in days for hour in range(1, 7)],
+                        min(slots_per_subject, len(days) * 6)
+                    )
+                    for student in students:
+                        # Each student has their own attendance habit
+                        habit = 0.6 + (student.pk * 7919 % 40) / 100
+                        rows.extend(
+                            Attendance(student_id=student.pk, subject_id=subject.pk,
+                                       faculty=faculty, date=day, hour=hour,
+                                       present=self.random.random() < habit)
+                            for day, hour in slots
+                        )
+                Attendance.objects.bulk_create(rows, batch_size=self.chunk_size)
+                total += len(rows)
+
+                refresh_attendance_summaries(
+                    (student.pk, subject.pk) for student in students for subject in semester_subjects
+                )
+        return total
+
+    def create_marks(self, batches, subjects, teachers, tests):
+        total = 0
+        for batch, (current_semester, students) in batches.items():
+            rows = [
+                InternalMark(
+                    student_id=student.pk, subject_id=subject.pk,
+                    faculty=teachers[(subject.pk, batch)], test_name=f'Internal {test}',
+                    max_mark=50,
+                    obtained_mark=round(min(50, max(0, self.random.gauss(34, 8))), 1),
+                )
+                for semester in range(1, current_semester + 1)
+                for subject in subjects[semester]
+                for student in students
+                for test in range(1, tests + 1)
+            ]
+            InternalMark.objects.bulk_create(rows, batch_size=self.chunk_size, ignore_conflicts=True)
+            total += len(rows)
+        return total
+
+    def create_notes(self, batches, faculty, count):
+        students = [student for _, batch_students in batches.values() for student in batch_students]
+        notes = []
+        for _ in range(count):
+            status = self.random.choices(['approved', 'pending', 'rejected'], [6, 3, 1])[0]
+            subject = self.random.choice(SUBJECTS)
+            topic = self.random.choice(NOTE_TOPICS)
+            notes.append(Note(
+                title=f'{self.random.choice(NOTE_KINDS)}: {topic}',
+                description=(f'{subject} notes covering {topic}, with worked examples '
+                             f'and key points for the internal exams.'),
+                file='notes/generated.pdf',
+                uploaded_by=self.random.choice(students),
+                subject=subject,
+                status=status,
+                reviewer=self.random.choice(faculty) if status != 'pending' else None,
+            ))
+        Note.objects.bulk_create(notes, batch_size=self.chunk_size)
+        return len(notes)
+
+    def create_events(self, faculty, count):
+        now = timezone.now()
+        events = [
+            Event(
+                title=f'{self.random.choice(EVENTS)} {number}',
+                description='Organised by the Electrical Engineering Students Association.',
+                date=now + timedelta(days=self.random.randint(-180, 90)),
+                location=self.random.choice(VENUES),
+                organizer_id=self.random.choice(faculty).user_id,
+            )
+            for number in range(1, count + 1)
+        ]
+        Event.objects.bulk_create(events, batch_size=self.chunk_size)
+        return len(events)
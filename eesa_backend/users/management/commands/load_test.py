@@ -0,0 +1,296 @@
+# users/management/commands/load_test.py
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from academics.models import FacultySubject
+from users.models import CustomUser, Student
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+# scenario -> role of the client that sends it
+SCENARIOS = {
+    'bulk_mark': 'faculty',
+    'faculty_dashboard': 'faculty',
+    'student_list': 'faculty',
+    'student_dashboard': 'student',
+    'attendance_summary': 'student',
+    'notes_search': 'student',
+    'admin_dashboard': 'admin',
+}
+SEARCH_WORDS = ['transformers', 'motors', 'fourier', 'laplace', 'circuits', 'load flow',
+                'rectifiers', 'control', 'lecture notes', 'solved', 'power', 'filters']
+
+
+class Command(BaseCommand):
+    help = ('Drive the real API routes with concurrent clients (attendance bulk_mark, '
+            'dashboards, notes search, student list) and report throughput, p50/p95/p99 '
+            'latency and queries per request, saved as JSON. Run it against a database '
+            'filled by generate_department; bulk_mark writes attendance')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=10,
+                            help='Concurrent clients (one thread each)')
+        parser.add_argument('--duration', type=float, default=20,
+                            help='Seconds to run after the warm-up')
+        parser.add_argument('--warmup', type=int, default=2,
+                            help='Unrecorded requests per client before measuring')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help=f'Comma-separated scenarios to mix (default: all of {", ".join(SCENARIOS)})')
+        parser.add_argument('--base-url',
+                            help='Send real HTTP requests to a running server (e.g. '
+                                 'http://127.0.0.1:8000) instead of calling Django in-process. '
+                                 'Queries per request are only measured in-process')
+        parser.add_argument('--host', default='localhost',
+                            help='Host header for in-process requests (must be allowed)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--output',
+                            help='JSON results file (default: load-test-<timestamp>.json)')
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+
+        self.identities = self.load_identities({SCENARIOS[name] for name in scenarios})
+        skipped = [name for name in scenarios if not self.identities[SCENARIOS[name]]]
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Skipping {", ".join(skipped)}: no {", ".join(sorted({SCENARIOS[name] for name in skipped}))} users'
+            ))
+        scenarios = [name for name in scenarios if name not in skipped]
+        if not scenarios:
+            raise CommandError('No users to run the scenarios as; run generate_department first')
+
+        self.stdout.write(
+            f'Running {", ".join(scenarios)} with {options["clients"]} clients for '
+            f'{options["duration"]:g}s ({"HTTP " + options["base_url"] if options["base_url"] else "in-process"})...'
+        )
+        samples, elapsed = self.run(scenarios, options)
+        results = self.summarize(samples, elapsed, options)
+
+        output = options['output'] or f'load-test-{timezone.now():%Y%m%d-%H%M%S}.json'
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+        self.write_summary(results, output)
+        logger.info(f'Load test: {results["total"]["requests"]} requests, '
+                    f'{results["total"]["throughput"]} req/s, saved to {output}')
+
+    def load_identities(self, roles):
+        """Tokens and the data each role's requests need, per role"""
+        identities = {'faculty': [], 'student': [], 'admin': []}
+
+        if 'faculty' in roles:
+            rosters = defaultdict(list)
+            for student_id, batch in Student.objects.values_list('pk', 'batch').iterator():
+                rosters[batch].append(student_id)
+            teaching = defaultdict(list)
+            for assignment in FacultySubject.objects.select_related('faculty__user'):
+                if rosters[assignment.batch]:
+                    teaching[assignment.faculty.user].append(
+                        (assignment.subject_id, assignment.batch, rosters[assignment.batch])
+                    )
+            identities['faculty'] = [
+                {'token': self.token(user), 'teaching': classes}
+                for user, classes in list(teaching.items())[:200]
+            ]
+
+        if 'student' in roles:
+            identities['student'] = [
+                {'token': self.token(student.user)}
+                for student in Student.objects.select_related('user').order_by('pk')[:200]
+            ]
+
+        if 'admin' in roles:
+            admin = CustomUser.objects.filter(user_type='admin').first() or \
+                CustomUser.objects.filter(is_superuser=True).first()
+            if admin:
+                identities['admin'] = [{'token': self.token(admin)}]
+
+        return identities
+
+    def token(self, user):
+        return Token.objects.get_or_create(user=user)[0].key
+
+    def build_request(self, scenario, identity, rng):
+        """(method, path, JSON body) for one request of a scenario"""
+        if scenario == 'bulk_mark':
+            subject_id, batch, roster = rng.choice(identity['teaching'])
+            day = timezone.now().date() - timedelta(days=rng.randint(0, 90))
+            return 'POST', '/api/academics/attendance/bulk_mark/', {
+                'subject': subject_id,
+                'date': day.isoformat(),
+                'hour': rng.randint(1, 6),
+                'attendance': [{'student': student_id, 'present': rng.random() < 0.85}
+                               for student_id in roster],
+            }
+        if scenario == 'student_list':
+            subject_id, batch, roster = rng.choice(identity['teaching'])
+            return 'GET', f'/api/users/students/?batch={batch}&page_size=50', None
+        if scenario == 'notes_search':
+            word = rng.choice(SEARCH_WORDS).replace(' ', '+')
+            return 'GET', f'/api/library/notes/?search={word}&limit=20', None
+        return 'GET', {
+            'faculty_dashboard': '/api/users/faculty/dashboard_stats/',
+            'student_dashboard': '/api/users/students/dashboard_stats/',
+            'attendance_summary': '/api/academics/attendance/summary/',
+            'admin_dashboard': '/api/users/admin/dashboard-stats/',
+        }[scenario], None
+
+    def run(self, scenarios, options):
+        """Run every client until the deadline; returns ([(scenario, status, seconds, queries)], seconds)"""
+        samples = []
+        lock = threading.Lock()
+        clock = {}
+
+        def start():
+            clock['began'] = time.perf_counter()
+            clock['deadline'] = clock['began'] + options['duration']
+
+        # Every client finishes its warm-up before the clock starts
+        ready = threading.Barrier(options['clients'], action=start)
+
+        def client(number):
+            rng = random.Random(options['seed'] * 1000 + number)
+            send = self.http_sender(options['base_url']) if options['base_url'] \
+                else self.local_sender(options['host'])
+            try:
+                try:
+                    for attempt in range(options['warmup'] + 1):
+                        if attempt == options['warmup']:
+                            ready.wait()
+                        scenario = rng.choice(scenarios)
+                        identity = rng.choice(self.identities[SCENARIOS[scenario]])
+                        if attempt < options['warmup']:
+                            send(identity['token'], *self.build_request(scenario, identity, rng))
+                except threading.BrokenBarrierError:
+                    # Another client failed its warm-up
+                    return
+                except BaseException:
+                    # Release the clients waiting at the barrier instead of hanging
+                    ready.abort()
+                    raise
+
+                while time.perf_counter() < clock['deadline']:
+                    scenario = rng.choice(scenarios)
+                    identity = rng.choice(self.identities[SCENARIOS[scenario]])
+                    request = self.build_request(scenario, identity, rng)
+                    began = time.perf_counter()
+                    status, queries = send(identity['token'], *request)
+                    sample = (scenario, status, time.perf_counter() - began, queries)
+                    with lock:
+                        samples.append(sample)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client, args=(number,))
+                   for number in range(options['clients'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if ready.broken:
+            raise CommandError('A client failed during the warm-up; see the error above')
+        return samples, time.perf_counter() - clock['began']
+
+    def local_sender(self, host):
+        """Send through Django's full request stack in this thread, counting queries"""
+        client = Client(HTTP_HOST=host)
+
+        def send(token, method, path, body):
+            headers = {'HTTP_AUTHORIZATION': f'Token {token}'}
+            with CaptureQueriesContext(connection) as queries:
+                if method == 'POST':
+                    response = client.post(path, json.dumps(body), content_type='application/json', **headers)
+                else:
+                    response = client.get(path, **headers)
+            return response.status_code, len(queries)
+        return send
+
+    def http_sender(self, base_url):
+        def send(token, method, path, body):
+            request = urllib.request.Request(
+                base_url.rstrip('/') + path, method=method,
+                data=json.dumps(body).encode() if body is not None else None,
+                headers={'Authorization': f'Token {token}', 'Content-Type': 'application/json'},
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    response.read()
+                    return response.status, None
+            except urllib.error.HTTPError as e:
+                return e.code, None
+            except (urllib.error.URLError, OSError):
+                return 0, None
+        return send
+
+    def summarize(self, samples, elapsed, options):
+        def stats(rows):
+            latencies = sorted(seconds for _, _, seconds, _ in rows)
+            queries = [count for _, _, _, count in rows if count is not None]
+
+            def percentile(p):
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1)
+
+            return {
+                'requests': len(rows),
+                'errors': sum(1 for _, status, _, _ in rows if not 200 <= status < 400),
+                'throughput': round(len(rows) / elapsed, 1),
+                'p50_ms': percentile(0.50),
+                'p95_ms': percentile(0.95),
+                'p99_ms': percentile(0.99),
+                'mean_queries': round(sum(queries) / len(queries), 1) if queries else None,
+            }
+
+        by_scenario = defaultdict(list)
+        for sample in samples:
+            by_scenario[sample[0]].append(sample)
+
+        return {
+            'started_at': timezone.now().isoformat(),
+            'mode': 'http' if options['base_url'] else 'in-process',
+            'base_url': options['base_url'],
+            'database': connection.vendor,
+            'settings': {
+                'CONN_MAX_AGE': connection.settings_dict.get('CONN_MAX_AGE'),
+                'REPLICA_DATABASES': getattr(settings, 'REPLICA_DATABASES', []),
+                'SQLITE_PRAGMAS': getattr(settings, 'SQLITE_PRAGMAS', {}) if connection.vendor == 'sqlite' else None,
+                'SQLITE_SERIALIZE_WRITES': getattr(settings, 'SQLITE_SERIALIZE_WRITES', False),
+            },
+            'clients': options['clients'],
+            'duration_s': round(elapsed, 2),
+            'seed': options['seed'],
+            'total': stats(samples),
+            'scenarios': {name: stats(rows) for name, rows in sorted(by_scenario.items())},
+        }
+
+    def write_summary(self, results, output):
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(f'{"scenario":<20}{"req":>6}{"err":>5}{"req/s":>8}'
+                          f'{"p50":>8}{"p95":>8}{"p99":>8}{"queries":>9}')
+        for name, row in [*results['scenarios'].items(), ('total', results['total'])]:
+            self.stdout.write(
+                f'{name:<20}{row["requests"]:>6}{row["errors"]:>5}{row["throughput"]:>8}'
+                f'{row["p50_ms"] or "-":>8}{row["p95_ms"] or "-":>8}{row["p99_ms"] or "-":>8}'
+                f'{row["mean_queries"] if row["mean_queries"] is not None else "-":>9}'
+            )
+        self.stdout.write('='*50 + '\n')
+        if results['total']['errors']:
+            self.stdout.write(self.style.WARNING(f'{results["total"]["errors"]} requests failed'))
+        self.stdout.write(self.style.SUCCESS(f'Results saved to {output}'))
@@ -0,0 +1,23 @@
+# users/management/commands/rebuild_people_search.py
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from users.search import install_people_search, reindex_all
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = ('Rebuild the people search entries from the student and faculty tables, '
+            'recreating the search index if a table rebuild dropped it')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding people search...')
+
+        with connection.schema_editor() as schema_editor:
+            install_people_search(schema_editor)
+
+        with transaction.atomic():
+            total = reindex_all()
+
+        self.stdout.write(self.style.SUCCESS(f'People search entries rebuilt: {total}'))
+        logger.info(f'Rebuilt people search with {total} entries')
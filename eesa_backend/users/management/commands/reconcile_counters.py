@@ -0,0 +1,36 @@
+# users/management/commands/reconcile_counters.py
+from django.core.management.base import BaseCommand
+from users.counters import reconcile_counters
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Recount dashboard counters from their tables and fix any drift (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without updating the counters',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        drift = reconcile_counters(dry_run=dry_run)
+
+        for name, (stored, actual) in drift.items():
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{"[DRY RUN] " if dry_run else ""}'
+                    f'Counter {name}: stored {stored}, actual {actual}'
+                )
+            )
+            logger.info(f'Counter {name} drifted: stored {stored}, actual {actual}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{"[DRY RUN] " if dry_run else ""}'
+                f'Counters reconciled: {len(drift)} out of sync'
+            )
+        )
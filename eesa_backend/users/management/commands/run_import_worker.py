@@ -0,0 +1,66 @@
+# users/management/commands/run_import_worker.py
+import time
+from django.core.management.base import BaseCommand
+from users.utils import claim_student_import_job, run_student_import_job
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Process queued student CSV import jobs (run alongside the web server)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs currently queued and exit',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between checks when the queue is empty',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='Rows imported per transaction',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Password hashing processes per job (default: CPU count; 1 hashes in-process)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Waiting for student import jobs...')
+
+        while True:
+            job = claim_student_import_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Running student import job {job.pk}...')
+            logger.info(f'Started student import job {job.pk}')
+            job = run_student_import_job(
+                job, chunk_size=options['chunk_size'], workers=options['workers']
+            )
+
+            if job.status == 'running':
+                self.stdout.write(self.style.WARNING(
+                    f'Job {job.pk} was taken over by another worker after its lease expired'
+                ))
+                continue
+
+            style = self.style.SUCCESS if job.status == 'completed' else self.style.ERROR
+            self.stdout.write(style(
+                f'Job {job.pk} {job.status}: {job.rows_done} created, '
+                f'{job.rows_failed} failed'
+                f'{f" ({job.failure_reason})" if job.failure_reason else ""}'
+            ))
+            logger.info(f'Student import job {job.pk} {job.status}')
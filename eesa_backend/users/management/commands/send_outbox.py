@@ -0,0 +1,51 @@
+# users/management/commands/send_outbox.py
+import time
+from django.core.management.base import BaseCommand
+from users.utils import send_outbox
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Send queued outbox emails in batches over one connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Send the emails that are due now and exit',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Emails sent per connection (default: EMAIL_OUTBOX_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=10.0,
+            help='Seconds to wait between checks when nothing is due',
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+
+        while True:
+            sent, failed = send_outbox(batch_size=options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} emails, {failed} failed')
+                logger.info(f'Outbox batch: {sent} sent, {failed} failed')
+                # A full batch may mean more is waiting
+                continue
+
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Outbox drained: {total_sent} sent, {total_failed} failed attempts'
+        ))
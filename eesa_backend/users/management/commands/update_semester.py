@@ -1,7 +1,8 @@
-# users/management/commands/update_semesters.py
+# users/management/commands/update_semester.py
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from users.models import Student
+from users.utils import update_all_student_semesters
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,11 +21,20 @@ class Command(BaseCommand):
             type=int,
             help='Update only students from specific enrollment year',
         )
+        parser.add_argument(
+            '--set-based',
+            action='store_true',
+            help='Update each (enrollment year, course) group with a single UPDATE '
+                 'instead of saving students one by one',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         enrollment_year = options.get('enrollment_year')
         
+        if options['set_based']:
+            return self.handle_set_based(dry_run, enrollment_year)
+        
         # Get students to update
         students = Student.objects.filter(is_active=True)
         if enrollment_year:
@@ -37,7 +47,7 @@ class Command(BaseCommand):
         
         self.stdout.write(f'Processing {total_students} active students...')
         
-        for student in students:
+        for student in students.select_related('user'):
             try:
                 old_semester = student.current_semester
                 calculated_semester = student.calculated_semester
@@ -74,6 +84,49 @@ class Command(BaseCommand):
                     f'Error updating student {student.student_id}: {str(e)}'
                 )
         
+        self.write_summary(dry_run, total_students, updated_count, error_count)
+    
+    def handle_set_based(self, dry_run, enrollment_year):
+        if enrollment_year:
+            self.stdout.write(f'Filtering students from enrollment year {enrollment_year}')
+        
+        result = update_all_student_semesters(
+            dry_run=dry_run, enrollment_year=enrollment_year, set_based=True
+        )
+        
+        for group in result['results']:
+            label = f'{group["course"]} {group["enrollment_year"]}'
+            if group['status'] == 'error':
+                self.stdout.write(
+                    self.style.ERROR(
+                        f'Error updating {group["count"]} students of {label}: {group["error"]}'
+                    )
+                )
+                logger.error(f'Error updating students of {label}: {group["error"]}')
+                continue
+            
+            old_semesters = ', '.join(
+                f'{count} from semester {semester}'
+                for semester, count in group['old_semesters'].items()
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{"[DRY RUN] " if dry_run else ""}'
+                    f'Updated {group["count"]} students of {label} '
+                    f'to semester {group["new_semester"]} ({old_semesters})'
+                )
+            )
+            logger.info(
+                f'{"[DRY RUN] " if dry_run else ""}'
+                f'Updated {group["count"]} students of {label} '
+                f'to semester {group["new_semester"]}'
+            )
+        
+        self.write_summary(
+            dry_run, result['total_students'], result['updated_count'], result['error_count']
+        )
+    
+    def write_summary(self, dry_run, total_students, updated_count, error_count):
         # Summary
         self.stdout.write('\n' + '='*50)
         self.stdout.write(
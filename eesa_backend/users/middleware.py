@@ -0,0 +1,18 @@
+# users/middleware.py
+from django.utils.functional import SimpleLazyObject
+from .principal import Principal
+
+
+class PrincipalMiddleware:
+    """
+    Attach request.principal, built from request.user on first use.
+    DRF authenticates inside the view and then sets request.user, so views
+    and permissions should read it through users.principal.get_principal().
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(lambda: Principal(request.user))
+        return self.get_response(request)
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:12
+
+from django.db import migrations, models
+
+
+# The counters as they were when this migration was written; later changes
+# to users.counters.COUNTERS must not change what this migration does
+COUNTERS = {
+    'students': ('users', 'Student', {}),
+    'faculty': ('users', 'Faculty', {}),
+    'subjects': ('academics', 'Subject', {}),
+    'notes': ('library', 'Note', {}),
+    'notes_pending': ('library', 'Note', {'status': 'pending'}),
+    'notes_approved': ('library', 'Note', {'status': 'approved'}),
+    'notes_rejected': ('library', 'Note', {'status': 'rejected'}),
+    'events': ('events', 'Event', {}),
+}
+
+
+def seed_counters(apps, schema_editor):
+    Counter = apps.get_model('users', 'Counter')
+    Counter.objects.bulk_create([
+        Counter(name=name, value=apps.get_model(app_label, model_name).objects.filter(**match).count())
+        for name, (app_label, model_name, match) in COUNTERS.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_customuser_date_joined'),
+        ('academics', '0003_attendancesummary'),
+        ('library', '0001_initial'),
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
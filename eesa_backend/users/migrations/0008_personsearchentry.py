@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from users.search import install_people_search, uninstall_people_search, reindex_all
+
+
+def create_search_index(apps, schema_editor):
+    install_people_search(schema_editor)
+    reindex_all(apps)
+
+
+def drop_search_index(apps, schema_editor):
+    uninstall_people_search(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_idsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonSearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('student', 'Student'), ('faculty', 'Faculty')], max_length=10)),
+                ('profile_id', models.BigIntegerField()),
+                ('name', models.CharField(max_length=301)),
+                ('identifier', models.CharField(max_length=20)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('text', models.TextField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('kind', 'profile_id')},
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
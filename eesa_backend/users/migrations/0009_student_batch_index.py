@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_personsearchentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['batch'], name='users_stude_batch_2314c4_idx'),
+        ),
+    ]
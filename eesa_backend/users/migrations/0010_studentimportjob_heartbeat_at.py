@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_student_batch_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentimportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_studentimportjob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='faculty',
+            name='users_facul_departm_f3d096_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='users_stude_enrollm_7b110c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='faculty',
+            index=models.Index(fields=['department', 'designation', 'faculty_id'], name='users_facul_departm_0ecb5d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-enrollment_year', 'student_id'], name='users_stude_enrollm_56b26e_idx'),
+        ),
+    ]
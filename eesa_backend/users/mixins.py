@@ -0,0 +1,119 @@
+# users/mixins.py
+from functools import lru_cache
+from django.db.models import Prefetch
+from django.db.models.query import ModelIterable
+from rest_framework import serializers
+
+
+def _relation(model, attr):
+    """Return the relation field a model exposes as `attr`, or None"""
+    for field in model._meta.get_fields():
+        if not field.is_relation:
+            continue
+        if field.name == attr or (field.auto_created and not field.concrete
+                                  and field.get_accessor_name() == attr):
+            return field
+    return None
+
+
+def _walk_source(model, attrs, path, plan, prefetching, needs_object):
+    """
+    Follow dotted source attributes across model relations, recording
+    select_related paths for single-valued hops and a prefetch_related path
+    once a multi-valued hop is crossed
+    """
+    for position, attr in enumerate(attrs):
+        field = _relation(model, attr)
+        if field is None:
+            return
+
+        # A bare foreign key rendered as its pk never touches the related row
+        is_last = position == len(attrs) - 1
+        if is_last and not needs_object:
+            return
+
+        path = f'{path}__{attr}' if path else attr
+        if field.many_to_many or field.one_to_many:
+            prefetching = True
+        (plan['prefetch'] if prefetching else plan['select']).add(path)
+        model = field.related_model
+
+    return model, path, prefetching
+
+
+def _plan_fields(serializer, model, path, plan, prefetching):
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        attrs = field.source_attrs
+        if isinstance(field, serializers.ListSerializer):
+            walked = _walk_source(model, attrs, path, plan, prefetching, True)
+            if walked:
+                _plan_fields(field.child, walked[0], walked[1], plan, True)
+        elif isinstance(field, serializers.BaseSerializer):
+            walked = _walk_source(model, attrs, path, plan, prefetching, True)
+            if walked:
+                _plan_fields(field, walked[0], walked[1], plan, walked[2])
+        elif isinstance(field, serializers.ManyRelatedField):
+            _walk_source(model, attrs, path, plan, prefetching, True)
+        else:
+            needs_object = not (
+                isinstance(field, serializers.RelatedField)
+                and field.use_pk_only_optimization()
+            )
+            _walk_source(model, attrs, path, plan, prefetching, needs_object)
+
+
+@lru_cache(maxsize=None)
+def plan_related_lookups(serializer_class, model):
+    """
+    Work out the select_related and prefetch_related lookups a serializer
+    needs by reading the dotted `source` of each of its fields, e.g.
+    ReadOnlyField(source='faculty.user.get_full_name') -> 'faculty__user'.
+    Fields the planner cannot see into (SerializerMethodField) can declare
+    extra lookups with `select_related` / `prefetch_related` on the
+    serializer's Meta.
+    """
+    plan = {'select': set(), 'prefetch': set()}
+    _plan_fields(serializer_class(), model, '', plan, False)
+
+    meta = getattr(serializer_class, 'Meta', None)
+    plan['select'].update(getattr(meta, 'select_related', ()))
+    plan['prefetch'].update(getattr(meta, 'prefetch_related', ()))
+
+    # 'a__b' already joins 'a'
+    select = [
+        lookup for lookup in plan['select']
+        if not any(other.startswith(f'{lookup}__') for other in plan['select'])
+    ]
+    return tuple(sorted(select)), tuple(sorted(plan['prefetch']))
+
+
+class AutoPrefetchMixin:
+    """
+    Viewset mixin that applies the select_related/prefetch_related lookups
+    the serializer needs, so list endpoints run a constant number of queries
+    """
+
+    def optimize_queryset(self, queryset):
+        if not issubclass(queryset._iterable_class, ModelIterable):
+            return queryset
+
+        select, prefetch = plan_related_lookups(self.get_serializer_class(), queryset.model)
+        if select:
+            queryset = queryset.select_related(*select)
+
+        # Leave lookups the viewset already prefetches (possibly with a custom queryset)
+        existing = {
+            lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup
+            for lookup in queryset._prefetch_related_lookups
+        }
+        prefetch = [lookup for lookup in prefetch if lookup not in existing]
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+
+        return queryset
+
+    def filter_queryset(self, queryset):
+        return self.optimize_queryset(super().filter_queryset(queryset))
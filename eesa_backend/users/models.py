@@ -79,8 +79,9 @@ class Student(models.Model):
     @property
     def calculated_semester(self):
         """Calculate current semester based on enrollment year"""
-        current_year = timezone.now().year
-        current_month = timezone.now().month
+        now = timezone.now()
+        current_year = now.year
+        current_month = now.month
         
         # Assuming academic year starts in August
         if current_month >= 8:
@@ -116,10 +117,12 @@ class Student(models.Model):
     class Meta:
         ordering = ['-enrollment_year', 'student_id']
         indexes = [
-            models.Index(fields=['enrollment_year']),
+            # Meta.ordering, so list pages (see KeysetPagination) read in index order
+            models.Index(fields=['-enrollment_year', 'student_id']),
             models.Index(fields=['current_semester']),
             models.Index(fields=['student_id']),
             models.Index(fields=['branch']),
+            models.Index(fields=['batch']),
         ]
 
 class Faculty(models.Model):
@@ -168,7 +171,134 @@ class Faculty(models.Model):
     class Meta:
         ordering = ['department', 'designation', 'faculty_id']
         indexes = [
-            models.Index(fields=['department']),
+            # Meta.ordering, so list pages (see KeysetPagination) read in index order
+            models.Index(fields=['department', 'designation', 'faculty_id']),
             models.Index(fields=['designation']),
             models.Index(fields=['faculty_id']),
-        ]
\ No newline at end of file
+        ]
+
+
+class Counter(models.Model):
+    """Named row count kept up to date by users.counters for dashboard reads"""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+class StudentImportJob(models.Model):
+    """Bulk student CSV upload processed in the background by run_import_worker"""
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    
+    csv_file = models.FileField(upload_to='student_imports/')
+    send_welcome_email = models.BooleanField(default=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    
+    # Progress
+    total_rows = models.IntegerField(null=True, blank=True)
+    rows_done = models.IntegerField(default=0)
+    rows_failed = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    failure_reason = models.TextField(blank=True, default='')
+    
+    created_by = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='student_import_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Renewed by the worker after each chunk; a running job whose heartbeat
+    # is older than STUDENT_IMPORT_LEASE_SECONDS can be claimed by another
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Student import #{self.pk} ({self.get_status_display()})"
+    
+    @property
+    def rows_processed(self):
+        return self.rows_done + self.rows_failed
+    
+    @property
+    def eta_seconds(self):
+        """Seconds left at the rate seen so far, or None if it can't be estimated yet"""
+        if self.status != 'running' or not self.total_rows or not self.rows_processed:
+            return None
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        remaining = self.total_rows - self.rows_processed
+        return round(elapsed / self.rows_processed * remaining, 1)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+class OutboxEmail(models.Model):
+    """Queued outgoing email, sent in batches by the send_outbox command"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    
+    subject = models.CharField(max_length=255)
+    # Cleared once sent, so generated passwords don't stay in the database
+    body = models.TextField(blank=True, default='')
+    from_email = models.CharField(max_length=254, blank=True, default='')
+    recipients = models.JSONField(default=list)
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.get_status_display()})"
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+class IdSequence(models.Model):
+    """Last sequence number handed out for an ID prefix (see users.sequences)"""
+    key = models.CharField(max_length=50, unique=True)
+    last_value = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.key}: {self.last_value}"
+
+class PersonSearchEntry(models.Model):
+    """Denormalized, normalized search text for a student or faculty profile (see users.search)"""
+    KIND_CHOICES = (
+        ('student', 'Student'),
+        ('faculty', 'Faculty'),
+    )
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    profile_id = models.BigIntegerField()
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='search_entries')
+    
+    # Display fields, so autocomplete needs no joins
+    name = models.CharField(max_length=301)
+    identifier = models.CharField(max_length=20)
+    email = models.EmailField(blank=True)
+    
+    text = models.TextField()
+    
+    def __str__(self):
+        return f"{self.name} ({self.identifier})"
+    
+    class Meta:
+        unique_together = ('kind', 'profile_id')
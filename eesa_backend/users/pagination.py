@@ -0,0 +1,115 @@
+# users/pagination.py
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset (cursor) pagination in the model's Meta.ordering.
+
+    Pagination only applies when the request sends `cursor` or `page_size`;
+    otherwise paginate_queryset returns None and the view keeps returning
+    the plain list. Each page is fetched with a WHERE clause that continues
+    after the last row of the previous page, so the database never has to
+    skip over earlier rows and memory stays constant per page.
+    """
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def is_requested(self, request):
+        return (self.cursor_query_param in request.query_params or
+                self.page_size_query_param in request.query_params)
+
+    def get_ordering(self, model):
+        ordering = list(model._meta.ordering)
+        # The last ordering field must be unique for the cursor to be exact
+        last = ordering[-1].lstrip('-') if ordering else None
+        if last is None or not model._meta.get_field(last).unique:
+            ordering.append('pk')
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            return json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode('ascii')).decode('ascii')
+
+    def after(self, ordering, values):
+        """Rows strictly after `values` in `ordering`, as a lexicographic Q"""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        ordering = self.get_ordering(queryset.model)
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*ordering)
+        values = self.decode_cursor(request)
+        if values is not None:
+            if not isinstance(values, list) or len(values) != len(ordering):
+                raise NotFound('Invalid cursor')
+            # A tampered cursor can hold values the fields won't accept
+            try:
+                queryset = queryset.filter(self.after(ordering, values))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound('Invalid cursor')
+
+        rows = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            self.next_cursor = self.encode_cursor([
+                getattr(last, field.lstrip('-')) if not isinstance(last, dict)
+                else last[field.lstrip('-')]
+                for field in ordering
+            ])
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_first_link(self):
+        url = self.request.build_absolute_uri()
+        return remove_query_param(url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'first': self.get_first_link(),
+            'results': data,
+        })
@@ -1,29 +1,25 @@
 from rest_framework import permissions
+from .principal import get_principal
 
 class IsAdmin(permissions.BasePermission):
     """Only allow admins"""
     def has_permission(self, request, view):
-        return request.user.is_authenticated and (
-            request.user.is_superuser or request.user.user_type == 'admin'
-        )
+        return get_principal(request).is_admin
 
 class IsFaculty(permissions.BasePermission):
     """Only allow faculty users"""
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.user_type == 'faculty'
+        return get_principal(request).is_faculty
 
 class IsStudent(permissions.BasePermission):
     """Only allow student users"""
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.user_type == 'student'
+        return get_principal(request).is_student
 
 class IsAdminOrFaculty(permissions.BasePermission):
     """Allow admin or faculty users"""
     def has_permission(self, request, view):
-        return request.user.is_authenticated and (
-            request.user.is_superuser or 
-            request.user.user_type in ['admin', 'faculty']
-        )
+        return get_principal(request).is_admin_or_faculty
 
 class IsOwnerOrAdminOrFaculty(permissions.BasePermission):
     """
@@ -31,21 +27,24 @@ class IsOwnerOrAdminOrFaculty(permissions.BasePermission):
     Admins and faculty can view/edit all.
     """
     def has_object_permission(self, request, view, obj):
+        principal = get_principal(request)
+        
         # Admin and faculty have full access
-        if request.user.is_superuser or request.user.user_type in ['admin', 'faculty']:
+        if principal.is_admin_or_faculty:
             return True
         
+        # Compare foreign keys, so the related objects are never loaded
         # Check if the object has a user attribute and if it matches the request user
-        if hasattr(obj, 'user'):
-            return obj.user == request.user
+        if hasattr(obj, 'user_id'):
+            return obj.user_id == principal.user_id
         
         # Check if the object has an uploaded_by attribute and if it matches the request user's student profile
-        if hasattr(obj, 'uploaded_by') and hasattr(request.user, 'student_profile'):
-            return obj.uploaded_by == request.user.student_profile
+        if hasattr(obj, 'uploaded_by_id') and principal.student_id is not None:
+            return obj.uploaded_by_id == principal.student_id
         
         # Check if the object has a student attribute and if it matches the request user's student profile
-        if hasattr(obj, 'student') and hasattr(request.user, 'student_profile'):
-            return obj.student == request.user.student_profile
+        if hasattr(obj, 'student_id') and principal.student_id is not None:
+            return obj.student_id == principal.student_id
         
         return False
 
@@ -60,13 +59,15 @@ class IsOwnerOrAdminOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         
+        principal = get_principal(request)
+        
         # Write permissions are only allowed to the owner or admin
-        if request.user.is_superuser or request.user.user_type == 'admin':
+        if principal.is_admin:
             return True
         
         # Check if the object has a user attribute
-        if hasattr(obj, 'user'):
-            return obj.user == request.user
+        if hasattr(obj, 'user_id'):
+            return obj.user_id == principal.user_id
         
         return False
 
@@ -79,18 +80,19 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         
-        return request.user.is_superuser or request.user.user_type == 'admin'
+        return get_principal(request).is_admin
 
 class IsOwnerOrAdmin(permissions.BasePermission):
     """
     Custom permission to only allow owners or admin to view/edit.
     """
     def has_object_permission(self, request, view, obj):
-        if request.user.is_superuser or request.user.user_type == 'admin':
+        principal = get_principal(request)
+        if principal.is_admin:
             return True
         
-        if hasattr(obj, 'user'):
-            return obj.user == request.user
+        if hasattr(obj, 'user_id'):
+            return obj.user_id == principal.user_id
         
         return False
 
@@ -100,7 +102,4 @@ class IsFacultyOrAdmin(permissions.BasePermission):
     Same as IsAdminOrFaculty but with a different name for clarity.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and (
-            request.user.is_superuser or 
-            request.user.user_type in ['admin', 'faculty']
-        )
\ No newline at end of file
+        return get_principal(request).is_admin_or_faculty
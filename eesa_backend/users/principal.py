@@ -0,0 +1,78 @@
+# users/principal.py
+from django.utils.functional import cached_property
+
+
+class Principal:
+    """
+    Who is making the request, resolved once per request: role flags plus
+    the primary keys of the user's profiles and the student's batch.
+    Permissions and querysets compare these keys instead of loading and
+    comparing related objects. Profiles already loaded with the user
+    (CachedTokenAuthentication preloads both) cost no queries; otherwise
+    each profile is read on first use with a single values query.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.is_authenticated = user.is_authenticated
+        self.user_id = user.pk if self.is_authenticated else None
+        user_type = getattr(user, 'user_type', None)
+
+        self.is_admin = self.is_authenticated and (user.is_superuser or user_type == 'admin')
+        self.is_faculty = self.is_authenticated and user_type == 'faculty'
+        self.is_student = self.is_authenticated and user_type == 'student'
+        self.is_admin_or_faculty = self.is_admin or self.is_faculty
+
+    def _profile(self, accessor, fields):
+        if not self.is_authenticated:
+            return None
+        # __class__ rather than type(), which would see Django's lazy user wrapper
+        relation = self.user._meta.get_field(accessor)
+        descriptor = getattr(self.user.__class__, accessor)
+        if descriptor.is_cached(self.user):
+            profile = getattr(self.user, accessor, None)
+            return tuple(getattr(profile, field) for field in fields) if profile else None
+        return (
+            relation.related_model.objects.filter(user_id=self.user_id)
+            .values_list(*fields).first()
+        )
+
+    @cached_property
+    def _student(self):
+        return self._profile('student_profile', ('pk', 'batch'))
+
+    @cached_property
+    def _faculty(self):
+        return self._profile('faculty_profile', ('pk',))
+
+    @property
+    def student_id(self):
+        """pk of the user's Student profile, or None"""
+        return self._student[0] if self._student else None
+
+    @property
+    def batch(self):
+        """Batch of the user's Student profile, or None"""
+        return self._student[1] if self._student else None
+
+    @property
+    def faculty_id(self):
+        """pk of the user's Faculty profile, or None"""
+        return self._faculty[0] if self._faculty else None
+
+    def __repr__(self):
+        return f'<Principal user={self.user_id} admin={self.is_admin} faculty={self.is_faculty} student={self.is_student}>'
+
+
+def get_principal(request):
+    """
+    The request's Principal, as built by PrincipalMiddleware. Rebuilt if it
+    was first read before DRF authenticated the request (or the middleware
+    isn't installed).
+    """
+    principal = getattr(request, 'principal', None)
+    user = request.user
+    if principal is None or principal.user is not user:
+        principal = Principal(user)
+        request.principal = principal
+    return principal
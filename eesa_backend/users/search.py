@@ -0,0 +1,218 @@
+# users/search.py
+"""
+People search index for students and faculty.
+
+Every student and faculty profile has a PersonSearchEntry row holding its
+display fields and one normalized text column (lowercased, accents
+stripped) made of the name, email, username, ID and, for faculty, the
+department. Searching matches every word of the query as a substring of
+that column, so one narrow table is searched instead of OR-ing icontains
+lookups across the profile/user join.
+
+The column is indexed for substring search: an FTS5 trigram table
+(users_person_fts, kept in sync by triggers) on SQLite and a pg_trgm GIN
+index on PostgreSQL, both created by the 0008_personsearchentry migration.
+Words shorter than three characters can't use a trigram index and are
+matched with LIKE on the already narrowed rows.
+
+Entries are kept current by the signals in users/signals.py and by the
+bulk importer; the rebuild_people_search command reindexes everything.
+"""
+import unicodedata
+from django.db import connections
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'users_person_fts'
+TRIGRAM_INDEX = 'users_person_search_trgm'
+AUTOCOMPLETE_LIMIT = 10
+
+_SQLITE_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON users_personsearchentry BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON users_personsearchentry BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF text ON users_personsearchentry BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+)
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse whitespace"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.lower().split())
+
+
+def _entry(model, kind, profile, identifier, extra=()):
+    user = profile.user
+    name = f"{user.first_name} {user.last_name}".strip()
+    return model(
+        kind=kind,
+        profile_id=profile.pk,
+        user_id=user.pk,
+        name=name,
+        identifier=identifier,
+        email=user.email,
+        text=normalize(' '.join([
+            name, user.email, user.username, identifier, *extra
+        ])),
+    )
+
+
+def index_profiles(students=(), faculty=(), model=None):
+    """
+    Create or refresh the entries for these profiles with one upsert.
+    Profiles must have their user loaded (or cached) to avoid a query each.
+    `model` lets migrations pass the historical PersonSearchEntry.
+    """
+    if model is None:
+        from .models import PersonSearchEntry as model
+    entries = [
+        _entry(model, 'student', student, student.student_id) for student in students
+    ] + [
+        _entry(model, 'faculty', member, member.faculty_id, [member.department])
+        for member in faculty
+    ]
+    if entries:
+        model.objects.bulk_create(
+            entries,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['kind', 'profile_id'],
+            update_fields=['user', 'name', 'identifier', 'email', 'text'],
+        )
+
+
+def reindex_all(apps=None, chunk_size=1000):
+    """Rebuild every entry from the profile tables; returns the number indexed"""
+    if apps is None:
+        from django.apps import apps
+    Student = apps.get_model('users', 'Student')
+    Faculty = apps.get_model('users', 'Faculty')
+    PersonSearchEntry = apps.get_model('users', 'PersonSearchEntry')
+
+    PersonSearchEntry.objects.all().delete()
+    total = 0
+    for profile_model, key in ((Student, 'students'), (Faculty, 'faculty')):
+        chunk = []
+        for profile in profile_model.objects.select_related('user').iterator(chunk_size=chunk_size):
+            chunk.append(profile)
+            if len(chunk) == chunk_size:
+                index_profiles(model=PersonSearchEntry, **{key: chunk})
+                total += len(chunk)
+                chunk = []
+        index_profiles(model=PersonSearchEntry, **{key: chunk})
+        total += len(chunk)
+    return total
+
+
+def _sqlite_has_trigram(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT sqlite_version()')
+        version = tuple(int(part) for part in cursor.fetchone()[0].split('.'))
+        cursor.execute('PRAGMA compile_options')
+        return version >= (3, 34, 0) and any(
+            row[0] == 'ENABLE_FTS5' for row in cursor.fetchall()
+        )
+
+
+def install_people_search(schema_editor):
+    """Create the substring index for the connection's database (idempotent)"""
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        if not _sqlite_has_trigram(connection):
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"text, content='users_personsearchentry', content_rowid='id', "
+                f"tokenize='trigram')"
+            )
+            for trigger in _SQLITE_TRIGGERS:
+                cursor.execute(trigger)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} '
+                f'ON users_personsearchentry USING gin (text gin_trgm_ops)'
+            )
+    connection.people_search_index = None
+
+
+def uninstall_people_search(schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+    connection.people_search_index = None
+
+
+def _has_fts_table(connection):
+    """Whether SQLite has the trigram table (checked once per connection)"""
+    available = getattr(connection, 'people_search_index', None)
+    if available is None:
+        available = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+        connection.people_search_index = available
+    return available
+
+
+def search_entries(text, kinds=None):
+    """
+    PersonSearchEntry queryset matching every word of text, best matches
+    first (entries starting with the first word, then by name)
+    """
+    from .models import PersonSearchEntry
+    words = normalize(text).split()
+    queryset = PersonSearchEntry.objects.all()
+    if kinds is not None:
+        queryset = queryset.filter(kind__in=kinds)
+    if not words:
+        return queryset.none()
+
+    connection = connections[queryset.db]
+    long_words = [word for word in words if len(word) >= 3]
+    if long_words and _has_fts_table(connection):
+        # Quoted so trigram matching treats each word as a literal substring
+        match = ' '.join('"{}"'.format(word.replace('"', '""')) for word in long_words)
+        queryset = queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        )
+        words = [word for word in words if len(word) < 3]
+
+    for word in words:
+        queryset = queryset.filter(text__contains=word)
+
+    return queryset.annotate(
+        starts_with=Case(
+            When(text__startswith=normalize(text).split()[0], then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField()
+        )
+    ).order_by('starts_with', 'name', 'pk')
+
+
+def matching_profile_ids(kind, text):
+    """Subquery of the profile ids of one kind matching text, for pk__in filters"""
+    return search_entries(text, [kind]).order_by().values('profile_id')
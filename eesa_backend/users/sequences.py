@@ -0,0 +1,65 @@
+# users/sequences.py
+"""
+Gap-tolerant sequence allocator for generated IDs.
+
+Each key (e.g. 'student:22BTEE') has a row in the IdSequence table holding
+the last number handed out. allocate() reserves a block of numbers with a
+single UPDATE ... RETURNING statement, so concurrent requests and bulk
+imports never pick the same number and never have to probe for a free one.
+The first allocation for a key seeds the row from the highest number
+already in use, so IDs created before the table existed are skipped.
+
+allocate() runs in the caller's transaction (as a savepoint when there is
+one), so the UPDATE keeps the key's row locked until that transaction
+commits: concurrent allocations for the same key wait for it, and other
+keys are unaffected. If the caller's transaction rolls back, so does the
+reservation, and the same numbers are handed out again; numbers only go
+unused when they were committed but the IDs were never saved.
+"""
+from django.db import connection, transaction
+
+
+def _sequence_table():
+    from .models import IdSequence
+    quote = connection.ops.quote_name
+    return quote(IdSequence._meta.db_table)
+
+def allocate(key, count=1, seed=None):
+    """
+    Reserve `count` consecutive numbers for `key` and return them as a range.
+    `seed` is called (only when the key has no row yet) to get the highest
+    number already in use.
+    Call it as late as possible in a long transaction: the key stays locked
+    until that transaction ends.
+    """
+    table = _sequence_table()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} SET "last_value" = "last_value" + %s '
+            f'WHERE "key" = %s RETURNING "last_value"',
+            [count, key]
+        )
+        row = cursor.fetchone()
+        
+        if row is None:
+            floor = seed() if seed else 0
+            # Another process may create the row first; then just add to it
+            cursor.execute(
+                f'INSERT INTO {table} ("key", "last_value") VALUES (%s, %s) '
+                f'ON CONFLICT ("key") DO UPDATE SET "last_value" = {table}."last_value" + %s '
+                f'RETURNING "last_value"',
+                [key, floor + count, count]
+            )
+            row = cursor.fetchone()
+    
+    last_value = row[0]
+    return range(last_value - count + 1, last_value + 1)
+
+def max_sequence(values, prefix):
+    """Highest numeric suffix among `values` that start with `prefix`"""
+    highest = 0
+    for value in values:
+        suffix = value[len(prefix):]
+        if value.startswith(prefix) and suffix.isdigit():
+            highest = max(highest, int(suffix))
+    return highest
@@ -1,6 +1,8 @@
 from rest_framework import serializers
-from .models import CustomUser, Student, Faculty
+from .models import CustomUser, Student, Faculty, StudentImportJob
 from django.contrib.auth.password_validation import validate_password
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Trim
 
 class CustomUserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
@@ -254,6 +256,10 @@ class FacultyUpdateSerializer(serializers.ModelSerializer):
         
         return instance
 
+def full_name_expression(prefix='user__'):
+    """SQL equivalent of CustomUser.get_full_name()"""
+    return Trim(Concat(f'{prefix}first_name', Value(' '), f'{prefix}last_name'))
+
 # Simplified list serializers for better performance
 class StudentListSerializer(serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
@@ -266,6 +272,18 @@ class StudentListSerializer(serializers.ModelSerializer):
     
     def get_full_name(self, obj):
         return obj.user.get_full_name()
+    
+    @staticmethod
+    def values(queryset):
+        """
+        Same rows as the serializer, read with queryset.values() so no
+        model instances are built
+        """
+        return queryset.values(
+            'id', 'student_id', 'enrollment_year', 'current_semester', 
+            'course', 'branch', 'is_active',
+            full_name=full_name_expression(), email=F('user__email')
+        )
 
 class FacultyListSerializer(serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
@@ -277,4 +295,29 @@ class FacultyListSerializer(serializers.ModelSerializer):
                  'designation', 'is_active']
     
     def get_full_name(self, obj):
-        return obj.user.get_full_name()
\ No newline at end of file
+        return obj.user.get_full_name()
+    
+    @staticmethod
+    def values(queryset):
+        """
+        Same rows as the serializer, read with queryset.values() so no
+        model instances are built
+        """
+        return queryset.values(
+            'id', 'faculty_id', 'department', 'designation', 'is_active',
+            full_name=full_name_expression(), email=F('user__email')
+        )
+
+
+class StudentImportJobSerializer(serializers.ModelSerializer):
+    created_by = serializers.ReadOnlyField(source='created_by.username')
+    rows_processed = serializers.ReadOnlyField()
+    eta_seconds = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = StudentImportJob
+        fields = ['id', 'status', 'send_welcome_email', 'total_rows', 'rows_done', 
+                 'rows_failed', 'rows_processed', 'eta_seconds', 'errors', 
+                 'failure_reason', 'created_by', 'created_at', 'started_at', 'heartbeat_at', 
+                 'finished_at']
+        read_only_fields = fields
@@ -1,7 +1,8 @@
 # users/signals.py
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_init, post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
+from rest_framework.authtoken.models import Token
 from .models import CustomUser, Student, Faculty
 import logging
 
@@ -87,6 +88,123 @@ def validate_faculty_data(sender, instance, **kwargs):
             instance.joining_date.year if instance.joining_date else timezone.now().year
         )
 
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_student_dashboard(sender, instance, **kwargs):
+    """
+    Drop the cached dashboard when the student profile changes
+    """
+    from .utils import invalidate_student_dashboards
+    invalidate_student_dashboards([instance.pk])
+
+@receiver(post_init, sender=Student)
+def remember_student_batch(sender, instance, **kwargs):
+    """
+    Keep the loaded batch so a save or delete after a batch change can
+    reach the batch the student left
+    """
+    # Reading a deferred field here would cost a query per loaded row
+    if 'batch' not in instance.get_deferred_fields():
+        instance._loaded_batch = instance.batch
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_batch_student_count(sender, instance, **kwargs):
+    """
+    Drop the cached roster counts of the student's batch and of the batch
+    it was loaded with
+    """
+    from .utils import invalidate_batch_student_counts
+    batches = {instance.batch, getattr(instance, '_loaded_batch', instance.batch)}
+    invalidate_batch_student_counts(batches)
+    instance._loaded_batch = instance.batch
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user_dashboard(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Drop the cached dashboard when the student's user details change
+    """
+    # Login only touches last_login, which the dashboard doesn't show
+    if update_fields and set(update_fields) <= {'last_login', 'last_active'}:
+        return
+    
+    if not created and instance.user_type == 'student':
+        from .utils import invalidate_student_dashboards
+        invalidate_student_dashboards(
+            Student.objects.filter(user=instance).values_list('pk', flat=True)
+        )
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Faculty)
+def index_profile_for_search(sender, instance, **kwargs):
+    """
+    Refresh the profile's people search entry
+    """
+    from .search import index_profiles
+    if sender is Student:
+        index_profiles(students=[instance])
+    else:
+        index_profiles(faculty=[instance])
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Faculty)
+def remove_profile_from_search(sender, instance, **kwargs):
+    """
+    Drop the profile's people search entry
+    """
+    from .models import PersonSearchEntry
+    kind = 'student' if sender is Student else 'faculty'
+    PersonSearchEntry.objects.filter(kind=kind, profile_id=instance.pk).delete()
+
+@receiver(post_save, sender=CustomUser)
+def reindex_user_for_search(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Refresh the search entries of the user's profiles when searchable fields change
+    """
+    searchable = {'first_name', 'last_name', 'email', 'username'}
+    # New users have no profile yet; the profile's own save indexes it
+    if created or (update_fields and not searchable & set(update_fields)):
+        return
+    
+    from .search import index_profiles
+    students = list(Student.objects.filter(user=instance))
+    faculty = list(Faculty.objects.filter(user=instance))
+    for profile in students + faculty:
+        profile.user = instance
+    index_profiles(students=students, faculty=faculty)
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """
+    Stop accepting a deleted token from the authentication cache
+    """
+    from .authentication import invalidate_token
+    invalidate_token(instance.key, instance.user_id)
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def evict_user_tokens(sender, instance, update_fields=None, **kwargs):
+    """
+    Reload the user on the next request after it changes
+    """
+    # Login only touches last_login, which doesn't affect authentication
+    if update_fields and set(update_fields) <= {'last_login', 'last_active'}:
+        return
+    
+    from .authentication import invalidate_user_tokens
+    invalidate_user_tokens(instance.pk)
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Faculty)
+@receiver(post_delete, sender=Faculty)
+def evict_profile_user_tokens(sender, instance, **kwargs):
+    """
+    Reload the user's cached profile on the next request after it changes
+    """
+    from .authentication import invalidate_user_tokens
+    invalidate_user_tokens(instance.user_id)
+
 # Register signals in apps.py
 # Add this to your users/apps.py file:
 """
@@ -0,0 +1,42 @@
+# users/testing.py
+"""
+Helpers shared by the apps' tests.
+
+Users are bulk created, which skips password hashing and the profile
+auto-creation signal; the helpers create the profiles themselves.
+"""
+import tempfile
+from django.test import override_settings
+from .models import CustomUser, Student, Faculty
+
+
+def create_faculty(username='faculty1', faculty_id='FAC001'):
+    user, = CustomUser.objects.bulk_create([
+        CustomUser(username=username, user_type='faculty', password='!')
+    ])
+    return Faculty.objects.create(user=user, faculty_id=faculty_id)
+
+
+def create_students(count, batch='2022-2026', prefix='STU'):
+    users = CustomUser.objects.bulk_create([
+        CustomUser(username=f'{prefix.lower()}{i}', user_type='student', password='!')
+        for i in range(count)
+    ])
+    return [
+        Student.objects.create(user=user, student_id=f'{prefix}{i:04d}', batch=batch)
+        for i, user in enumerate(users)
+    ]
+
+
+def use_shared_cache(test_case):
+    """
+    Point CACHES['default'] at a file-based cache, which every process
+    shares, for the rest of the test; token_cache is only used with one
+    """
+    location = test_case.enterContext(tempfile.TemporaryDirectory())
+    test_case.enterContext(override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location,
+        }
+    }))
@@ -1,3 +1,957 @@
-from django.test import TestCase
+import re
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from academics.models import (Subject, FacultySubject, Attendance, AttendanceSummary,
+                              InternalMark, Assignment, AssignmentSubmission, StudyMaterial)
+from eesa_backend import routers
+from library.models import Note
+from .models import (CustomUser, Student, StudentImportJob, Counter, OutboxEmail, IdSequence,
+                     PersonSearchEntry)
+from .authentication import token_cache
+from .counters import read_counters, reconcile_counters
+from .pagination import KeysetPagination
+from .principal import Principal
+from .search import AUTOCOMPLETE_LIMIT, FTS_TABLE, index_profiles, search_entries
+from .sequences import allocate
+from .testing import create_faculty, create_students, use_shared_cache
+from .utils import (StudentImporter, allocate_student_ids, claim_student_import_job,
+                    run_student_import_job, send_outbox, update_all_student_semesters)
 
-# Create your tests here.
+
+class StudentDashboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student, cls.author = create_students(2)
+        cls.note = Note.objects.create(title='Circuits', description='', file='notes/c.pdf',
+                                       uploaded_by=cls.author, subject='Circuits')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student.user)
+
+    def dashboard(self):
+        response = self.client.get('/api/users/students/dashboard_stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def add_coursework(self, count):
+        faculty = create_faculty(username=f'faculty{count}', faculty_id=f'FAC{count:03d}')
+        for i in range(count):
+            subject = Subject.objects.create(code=f'EE{count}{i:02d}', name=f'Subject {i}', semester=1)
+            AttendanceSummary.objects.create(student=self.student, subject=subject, total=10, present=8)
+            InternalMark.objects.create(student=self.student, subject=subject, faculty=faculty,
+                                        test_name='Internal 1', max_mark=50, obtained_mark=40)
+            Assignment.objects.create(title=f'Assignment {i}', description='', subject=subject,
+                                      faculty=faculty, batch=self.student.batch, due_date=timezone.now())
+
+    def test_query_budget(self):
+        # One SELECT however much coursework the student has, none once cached
+        self.add_coursework(1)
+        with self.assertNumQueries(1):
+            self.dashboard()
+        with self.assertNumQueries(0):
+            self.dashboard()
+
+        cache.clear()
+        self.add_coursework(10)
+        with self.assertNumQueries(1):
+            stats = self.dashboard()
+        self.assertEqual(stats['attendance']['total'], 110)
+        self.assertEqual(stats['assignments']['total'], 11)
+        self.assertEqual(stats['internals']['total'], 11)
+
+    def test_cache_is_filled_from_the_primary(self):
+        # A lagging replica could cache figures from before the write that
+        # just expired them; replica1 is not a configured database
+        self.add_coursework(1)
+        with override_settings(REPLICA_DATABASES=['replica1']):
+            self.assertEqual(self.dashboard()['assignments']['total'], 1)
+
+    def test_cache_hit_under_session_auth(self):
+        # Session and user, then the principal's one profile lookup
+        client = APIClient()
+        client.force_login(self.student.user)
+        self.assertEqual(client.get('/api/users/students/dashboard_stats/').status_code, 200)
+        with self.assertNumQueries(3):
+            response = client.get('/api/users/students/dashboard_stats/')
+        self.assertEqual(response.data['profile']['student_id'], self.student.student_id)
+
+    def test_moving_an_assignment_expires_both_batches(self):
+        self.add_coursework(1)
+        self.assertEqual(self.dashboard()['assignments']['total'], 1)
+
+        assignment = Assignment.objects.get()
+        assignment.batch = '2023-2027'
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment.save()
+        self.assertEqual(self.dashboard()['assignments']['total'], 0)
+
+    def test_approving_a_note_expires_cached_dashboards(self):
+        self.assertEqual(self.dashboard()['notes']['approved'], 0)
+
+        note = Note.objects.get(pk=self.note.pk)
+        note.status = 'approved'
+        with self.captureOnCommitCallbacks(execute=True):
+            note.save()
+        self.assertEqual(self.dashboard()['notes']['approved'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            note.delete()
+        self.assertEqual(self.dashboard()['notes']['approved'], 0)
+
+
+class FacultyDashboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.faculty = create_faculty()
+        cls.batches = ['2021-2025', '2022-2026', '2023-2027']
+        for i, batch in enumerate(cls.batches):
+            subject = Subject.objects.create(code=f'EE10{i}', name=f'Subject {i}', semester=1)
+            FacultySubject.objects.create(faculty=cls.faculty, subject=subject, batch=batch)
+            create_students(5, batch=batch, prefix=f'S{i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.faculty.user)
+
+    def dashboard(self):
+        response = self.client.get('/api/users/faculty/dashboard_stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_query_budget(self):
+        # Profile with counts, subjects, and the batch roster counts on a miss
+        with self.assertNumQueries(3):
+            stats = self.dashboard()
+        self.assertEqual(stats['subjects']['total'], 3)
+        self.assertEqual(stats['students']['total'], 15)
+
+        # Cached roster counts; the same for one batch or three
+        with self.assertNumQueries(2):
+            self.dashboard()
+        FacultySubject.objects.exclude(batch=self.batches[0]).delete()
+        with self.assertNumQueries(2):
+            stats = self.dashboard()
+        self.assertEqual(stats['students']['total'], 5)
+
+    def test_moving_a_student_expires_both_batch_counts(self):
+        self.assertEqual(self.dashboard()['students']['total'], 15)
+
+        student = Student.objects.filter(batch=self.batches[0]).first()
+        student.batch = '2024-2028'
+        with self.captureOnCommitCallbacks(execute=True):
+            student.save()
+        self.assertEqual(self.dashboard()['students']['total'], 14)
+
+        # Deleting after a batch edit still reaches the batch it was loaded in
+        student = Student.objects.filter(batch=self.batches[1]).first()
+        student.batch = '2024-2028'
+        with self.captureOnCommitCallbacks(execute=True):
+            student.delete()
+        self.assertEqual(self.dashboard()['students']['total'], 13)
+
+
+class KeysetPaginationTests(TestCase):
+    """Opt-in cursor pages over the student and faculty lists"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, = CustomUser.objects.bulk_create([
+            CustomUser(username='admin', user_type='admin', password='!')
+        ])
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f'student{i}', user_type='student', password='!')
+            for i in range(7)
+        ])
+        # Two enrollment years, so pages cross from one to the other
+        for i, user in enumerate(users):
+            Student.objects.create(user=user, student_id=f'STU{i:04d}', enrollment_year=2022 + i % 2)
+        cls.order = list(Student.objects.values_list('student_id', flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def get(self, url='/api/users/students/', **params):
+        return self.client.get(url, params)
+
+    def test_pages_follow_the_list_order(self):
+        response = self.get(page_size=3)
+        self.assertEqual(response.status_code, 200)
+        seen = [student['student_id'] for student in response.data['results']]
+        self.assertEqual(len(seen), 3)
+
+        pages = 1
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            self.assertEqual(response.status_code, 200)
+            seen += [student['student_id'] for student in response.data['results']]
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, self.order)
+
+    def test_exact_last_page_has_no_next(self):
+        response = self.get(page_size=7)
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertIsNone(response.data['next'])
+
+    def test_plain_list_without_parameters(self):
+        response = self.get()
+        self.assertIsInstance(response.data, list)
+        self.assertEqual([student['student_id'] for student in response.data], self.order)
+
+    def test_invalid_cursor(self):
+        pagination = KeysetPagination()
+        for cursor in ['not base64!', pagination.encode_cursor(['x']),
+                       pagination.encode_cursor({'a': 1}), pagination.encode_cursor(['abc', 'x'])]:
+            with self.subTest(cursor=cursor):
+                response = self.get(cursor=cursor)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(str(response.data['detail']), 'Invalid cursor')
+
+    def test_pages_are_read_in_index_order(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Checks SQLite query plans')
+        # A page after a cursor, and a first page
+        for url in [self.get(page_size=3).data['next'], '/api/users/faculty/?page_size=3']:
+            with self.subTest(url=url), CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {queries[-1]["sql"]}')
+                    plan = ' '.join(row[-1] for row in cursor.fetchall())
+                self.assertNotIn('TEMP B-TREE', plan)
+
+
+class CounterTests(TestCase):
+    """Signals keep the dashboard counters in step; reconcile repairs drift"""
+
+    def assertCounters(self, expected):
+        self.assertEqual(read_counters(list(expected)), expected)
+
+    def test_create_and_delete(self):
+        student, other = create_students(2)
+        Subject.objects.create(code='EE101', name='Circuits', semester=1)
+        self.assertCounters({'students': 2, 'subjects': 1})
+
+        # Cascaded deletes count too
+        CustomUser.objects.filter(pk=other.user_id).delete()
+        student.delete()
+        self.assertCounters({'students': 0, 'subjects': 1})
+
+    def test_note_status_moves_between_buckets(self):
+        author, = create_students(1)
+        note = Note.objects.create(title='Circuits', description='', file='notes/c.pdf',
+                                   uploaded_by=author, subject='Circuits')
+        self.assertCounters({'notes': 1, 'notes_pending': 1, 'notes_approved': 0})
+
+        note.status = 'approved'
+        note.save()
+        note.save()
+        self.assertCounters({'notes': 1, 'notes_pending': 0, 'notes_approved': 1})
+
+        # A freshly loaded row remembers the status it was loaded with
+        note = Note.objects.get(pk=note.pk)
+        note.status = 'rejected'
+        note.save()
+        self.assertCounters({'notes_approved': 0, 'notes_rejected': 1})
+
+        note.delete()
+        self.assertCounters({'notes': 0, 'notes_pending': 0, 'notes_approved': 0,
+                             'notes_rejected': 0})
+
+    def test_read_counters_is_one_query(self):
+        with self.assertNumQueries(1):
+            counters = read_counters(['students', 'faculty', 'notes', 'no_such_counter'])
+        self.assertEqual(counters, {'students': 0, 'faculty': 0, 'notes': 0,
+                                    'no_such_counter': 0})
+
+    def test_reconcile_repairs_drift(self):
+        create_students(3)
+        Counter.objects.filter(name='students').update(value=99)
+        Counter.objects.filter(name='events').delete()
+
+        drift = reconcile_counters(dry_run=True)
+        self.assertEqual(drift, {'students': (99, 3), 'events': (None, 0)})
+        self.assertCounters({'students': 99})
+
+        self.assertEqual(reconcile_counters(), drift)
+        self.assertCounters({'students': 3, 'events': 0})
+        self.assertTrue(Counter.objects.filter(name='events').exists())
+        self.assertEqual(reconcile_counters(), {})
+
+
+class IdSequenceTests(TestCase):
+    """allocate() hands out consecutive numbers per key, starting after existing IDs"""
+
+    def test_first_use_seeds_from_existing_ids(self):
+        # student_id_prefix(2022, 'BTech', 'Electrical') is 22BTEL
+        create_students(3, prefix='22BTEL')
+
+        self.assertEqual(allocate_student_ids(2022, 'BTech', 'Electrical'), ['22BTEL003'])
+        self.assertEqual(IdSequence.objects.get(key='student:22BTEL').last_value, 3)
+
+    def test_seed_is_only_used_for_a_new_key(self):
+        seed = mock.Mock(return_value=10)
+
+        self.assertEqual(list(allocate('test', seed=seed)), [11])
+        self.assertEqual(list(allocate('test', seed=seed)), [12])
+        seed.assert_called_once()
+
+    def test_block_allocation(self):
+        self.assertEqual(list(allocate('test', count=5)), [1, 2, 3, 4, 5])
+        self.assertEqual(list(allocate('test', count=2)), [6, 7])
+        self.assertEqual(list(allocate('other', count=2)), [1, 2])
+
+    def test_allocate_student_ids_are_consecutive(self):
+        self.assertEqual(
+            allocate_student_ids(2023, 'MTech', 'Power Systems', 3),
+            ['23MTPO001', '23MTPO002', '23MTPO003']
+        )
+        self.assertEqual(allocate_student_ids(2023, 'MTech', 'Power Systems'), ['23MTPO004'])
+
+    def test_numbers_from_a_rolled_back_transaction_are_reused(self):
+        allocate('test')
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.assertEqual(list(allocate('test', count=2)), [2, 3])
+            raise RuntimeError
+
+        self.assertEqual(list(allocate('test')), [2])
+
+
+class PeopleSearchTests(TestCase):
+    """People search matches substrings of every word and follows profile changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.anjali, cls.arun, cls.priya = create_students(3)
+        for student, (first, last) in zip(
+            [cls.anjali, cls.arun, cls.priya],
+            [('Anjali', 'Raghavan'), ('Arun', 'Menon'), ('Priya', 'Anand')]
+        ):
+            CustomUser.objects.filter(pk=student.user_id).update(first_name=first, last_name=last)
+        cls.faculty = create_faculty()
+        cls.faculty.user.first_name, cls.faculty.user.last_name = 'Renée', 'Thomas'
+        cls.faculty.user.save()
+        cls.faculty.department = 'Electrical'
+        cls.faculty.save()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.faculty.user)
+
+    def names(self, text, kinds=None):
+        return [entry.name for entry in search_entries(text, kinds)]
+
+    def test_words_match_as_substrings(self):
+        # Queryset.update() skips the signals, so index the names set above
+        index_profiles(students=Student.objects.select_related('user'))
+
+        # The trigram index is in use, not just the LIKE fallback
+        self.assertIn(FTS_TABLE, connection.introspection.table_names())
+        self.assertEqual(self.names('ghava'), ['Anjali Raghavan'])
+        self.assertEqual(self.names('nan'), ['Priya Anand'])
+        # Every word has to match; short words are matched without the index
+        self.assertEqual(self.names('an ragh'), ['Anjali Raghavan'])
+        self.assertEqual(self.names('menon priya'), [])
+        # Entries starting with the first word come first, then by name
+        self.assertEqual(self.names('a', ['student']),
+                         ['Anjali Raghavan', 'Arun Menon', 'Priya Anand'])
+        # Accents, case, IDs and departments
+        self.assertEqual(self.names('RENEE', ['faculty']), ['Renée Thomas'])
+        self.assertEqual(self.names('electr'), ['Renée Thomas'])
+        self.assertEqual(self.names('stu0001'), ['Arun Menon'])
+        self.assertEqual(self.names('"ragh*'), [])
+        self.assertEqual(self.names('  '), [])
+
+    def test_list_search(self):
+        index_profiles(students=Student.objects.select_related('user'))
+        response = self.client.get('/api/users/students/', {'search': 'ghava'})
+        self.assertEqual([row['id'] for row in response.data], [self.anjali.pk])
+
+    def test_entries_follow_user_and_profile_changes(self):
+        user = CustomUser.objects.get(pk=self.arun.user_id)
+        user.first_name = 'Varun'
+        user.save()
+        self.assertEqual(self.names('varun'), ['Varun Menon'])
+
+        # Saves of fields that aren't searched leave the entry alone
+        with mock.patch('users.search.index_profiles') as index:
+            user.save(update_fields=['last_login'])
+        index.assert_not_called()
+
+        self.faculty.department = 'Electronics'
+        self.faculty.save()
+        self.assertEqual(self.names('electronics'), ['Renée Thomas'])
+        self.assertEqual(self.names('electrical'), [])
+
+        self.arun.delete()
+        self.assertEqual(self.names('varun'), [])
+        CustomUser.objects.filter(pk=self.faculty.user_id).delete()
+        self.assertEqual(self.names('renee'), [])
+        self.assertFalse(PersonSearchEntry.objects.filter(kind='faculty').exists())
+
+    def test_autocomplete_query_budget(self):
+        url = reverse('people_autocomplete')
+        # The first search checks once per connection whether the index exists
+        self.client.get(url, {'q': 'stu'})
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'q': 'stu'})
+        self.assertEqual(len(response.data), 3)
+
+        create_students(AUTOCOMPLETE_LIMIT + 5, prefix='STV')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'q': 'st'})
+        self.assertEqual(len(response.data), AUTOCOMPLETE_LIMIT)
+
+    def test_students_only_find_faculty(self):
+        self.client.force_authenticate(user=self.anjali.user)
+        response = self.client.get(reverse('people_autocomplete'), {'q': 'e'})
+        self.assertEqual([row['type'] for row in response.data], ['faculty'])
+        response = self.client.get(reverse('people_autocomplete'), {'type': 'staff'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SemesterUpdateTests(TestCase):
+    """The set-based semester update matches saving students one by one"""
+
+    @classmethod
+    def setUpTestData(cls):
+        year = timezone.now().year
+        # (enrollment year, course, current semester); the last group's
+        # enrollment year is far enough ahead that its target is below 1
+        groups = [(year - 1, 'BTech', 1), (year - 1, 'BTech', 2), (year - 3, 'BTech', 3),
+                  (year - 6, 'BTech', 8), (year - 3, 'MTech', 1), (year + 2, 'BTech', 1)]
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f'student{i}', user_type='student', password='!')
+            for i in range(len(groups) * 2)
+        ])
+        Student.objects.bulk_create([
+            Student(user=user, student_id=f'STU{i:04d}', enrollment_year=year, course=course,
+                    current_semester=semester, batch=f'{year}-{year + 4}')
+            for i, (user, (year, course, semester)) in enumerate(zip(users, groups * 2))
+        ])
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+
+    def semesters(self):
+        return dict(Student.objects.values_list('pk', 'current_semester'))
+
+    def counts(self, result):
+        return {key: result[key] for key in
+                ['total_students', 'updated_count', 'error_count', 'unchanged_count']}
+
+    def test_set_based_matches_per_row(self):
+        before = self.semesters()
+        per_row = update_all_student_semesters()
+        per_row_semesters = self.semesters()
+
+        Student.objects.bulk_update(
+            [Student(pk=pk, current_semester=semester) for pk, semester in before.items()],
+            ['current_semester']
+        )
+        set_based = update_all_student_semesters(set_based=True)
+
+        self.assertEqual(self.semesters(), per_row_semesters)
+        self.assertEqual(self.counts(set_based), self.counts(per_row))
+        # The exact split depends on the month; the future group always errors
+        self.assertEqual(set_based['error_count'], 2)
+        self.assertGreater(set_based['updated_count'], 0)
+        self.assertGreater(set_based['unchanged_count'], 0)
+
+    def test_dry_run_writes_nothing(self):
+        before = self.semesters()
+        dry_run = update_all_student_semesters(dry_run=True, set_based=True)
+        self.assertEqual(self.semesters(), before)
+        self.assertEqual({group['status'] for group in dry_run['results']},
+                         {'would_update', 'error'})
+
+        self.assertEqual(self.counts(update_all_student_semesters(set_based=True)),
+                         self.counts(dry_run))
+
+    def test_targets_below_semester_one_are_errors(self):
+        year = timezone.now().year + 2
+        result = update_all_student_semesters(set_based=True)
+        errors = [group for group in result['results'] if group['status'] == 'error']
+        self.assertEqual([(group['enrollment_year'], group['count']) for group in errors],
+                         [(year, 2)])
+        self.assertEqual(set(Student.objects.filter(enrollment_year=year)
+                             .values_list('current_semester', flat=True)), {1})
+
+    def test_cached_token_users_are_reloaded(self):
+        use_shared_cache(self)
+        student = Student.objects.select_related('user').get(student_id='STU0000')
+        token = Token.objects.create(user=student.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(client.get('/api/users/students/me/').status_code, 200)
+        self.assertIsNotNone(token_cache.get(token.key))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            update_all_student_semesters(set_based=True)
+        self.assertIsNone(token_cache.get(token.key))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Revoking access reaches workers that still hold the token in memory"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student, = create_students(1)
+
+    def setUp(self):
+        use_shared_cache(self)
+        token_cache.clear()
+        self.token = Token.objects.create(user=self.student.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get(self):
+        return self.client.get('/api/users/students/dashboard_stats/').status_code
+
+    def as_other_worker(self, change):
+        """
+        Make `change` in this process, then put back the token cache entry
+        it evicted, as another worker's in-memory cache would still hold it
+        """
+        self.assertEqual(self.get(), 200)
+        entry = token_cache.get(self.token.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        token_cache.set(self.token.key, entry)
+
+    def test_cache_hit_costs_no_queries(self):
+        self.assertEqual(self.get(), 200)
+        # The dashboard itself is cached too
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(), 200)
+
+    def test_deactivated_user_is_refused(self):
+        user = CustomUser.objects.get(pk=self.student.user_id)
+        user.is_active = False
+        self.as_other_worker(user.save)
+        self.assertEqual(self.get(), 401)
+
+    def test_deleted_token_is_refused(self):
+        self.as_other_worker(Token.objects.get(pk=self.token.pk).delete)
+        self.assertEqual(self.get(), 401)
+
+    def test_login_keeps_the_cached_user(self):
+        self.assertEqual(self.get(), 200)
+        user = CustomUser.objects.get(pk=self.student.user_id)
+        user.last_login = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save(update_fields=['last_login'])
+        self.assertIsNotNone(token_cache.get(self.token.key))
+
+    def test_not_cached_with_a_per_process_cache(self):
+        with override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        }):
+            self.assertEqual(self.get(), 200)
+            # The dashboard is cached, but the token is loaded every time
+            with self.assertNumQueries(1):
+                self.assertEqual(self.get(), 200)
+        self.assertIsNone(token_cache.get(self.token.key))
+
+
+class PrincipalPermissionTests(TestCase):
+    """Role and ownership checks go through the request's Principal"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student, cls.other = create_students(2)
+        cls.faculty = create_faculty()
+        subject = Subject.objects.create(code='EE101', name='Circuits', semester=1)
+        cls.attendance, cls.other_attendance = [
+            Attendance.objects.create(student=student, subject=subject, faculty=cls.faculty,
+                                      date=timezone.now().date(), hour=1)
+            for student in (cls.student, cls.other)
+        ]
+        cls.note, cls.other_note = [
+            Note.objects.create(title='Circuits', description='', file='notes/c.pdf',
+                                subject='Circuits', status='approved', uploaded_by=student)
+            for student in (cls.student, cls.other)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        # A plain user, as session auth loads it: the profiles aren't preloaded
+        self.client.force_authenticate(user=CustomUser.objects.get(pk=self.student.user_id))
+
+    def test_students_cannot_reach_other_students_objects(self):
+        for url, own, other in [
+            ('/api/academics/attendance/{}/', self.attendance, self.other_attendance),
+            ('/api/users/students/{}/', self.student, self.other),
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url.format(own.pk)).status_code, 200)
+                self.assertEqual(self.client.get(url.format(other.pk)).status_code, 404)
+
+        # Approved notes are visible to everyone but only editable by their uploader
+        url = '/api/library/notes/{}/'
+        self.assertEqual(self.client.get(url.format(self.other_note.pk)).status_code, 200)
+        self.assertEqual(
+            self.client.patch(url.format(self.other_note.pk), {'title': 'Mine'}).status_code, 403
+        )
+        self.assertEqual(
+            self.client.patch(url.format(self.note.pk), {'title': 'Mine'}).status_code, 200
+        )
+
+    def test_faculty_only_actions_reject_students(self):
+        review_url = f'/api/library/notes/{self.other_note.pk}/review/'
+        for method, url, data in [
+            ('post', review_url, {'status': 'rejected'}),
+            ('get', '/api/library/notes/pending/', None),
+            ('get', '/api/library/notes/dashboard_stats/', None),
+            ('patch', f'/api/academics/attendance/{self.attendance.pk}/', {'present': True}),
+        ]:
+            with self.subTest(url=url):
+                response = getattr(self.client, method)(url, data)
+                self.assertEqual(response.status_code, 403)
+        self.assertFalse(Attendance.objects.get(pk=self.attendance.pk).present)
+
+        self.client.force_authenticate(user=CustomUser.objects.get(pk=self.faculty.user_id))
+        self.assertEqual(self.client.post(review_url, {'status': 'rejected'}).status_code, 200)
+
+    def test_principal_is_built_once_per_request(self):
+        url = f'/api/library/notes/{self.note.pk}/'
+        with mock.patch.object(Principal, '__init__', autospec=True,
+                               side_effect=Principal.__init__) as init, \
+                CaptureQueriesContext(connection) as queries:
+            # The permission check and the queryset both read the student's pk
+            response = self.client.patch(url, {'title': 'Renamed'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(init.call_count, 1)
+        profile_reads = [query['sql'] for query in queries.captured_queries
+                         if 'FROM "users_student"' in query['sql']]
+        self.assertEqual(len(profile_reads), 1)
+
+    def test_preloaded_profiles_cost_no_queries(self):
+        user = CustomUser.objects.select_related('student_profile', 'faculty_profile').get(
+            pk=self.student.user_id
+        )
+        principal = Principal(user)
+        with self.assertNumQueries(0):
+            self.assertEqual((principal.student_id, principal.batch, principal.faculty_id),
+                             (self.student.pk, self.student.batch, None))
+        self.assertTrue(principal.is_student)
+        self.assertFalse(principal.is_admin_or_faculty)
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class StudentExportRoutingTests(TestCase):
+    """The streamed export reads from the database picked during the request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, = CustomUser.objects.bulk_create([
+            CustomUser(username='admin', user_type='admin', password='!')
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_export_streams_from_the_replica(self):
+        read_from = []
+
+        def record_database(queryset):
+            # Runs when the response is consumed, after the middleware returned
+            read_from.append(queryset.db)
+            yield ''
+
+        with mock.patch('users.views.iter_students_csv', record_database):
+            response = self.client.get('/api/users/students/export/')
+            b''.join(response.streaming_content)
+        self.assertEqual(read_from, ['replica1'])
+
+    def test_routing_flag_does_not_leak(self):
+        read_from = []
+        with mock.patch('users.views.iter_students_csv',
+                        lambda queryset: read_from.append(queryset.db) or iter([''])):
+            response = self.client.get('/api/users/students/export/')
+            b''.join(response.streaming_content)
+        self.assertEqual(read_from, ['replica1'])
+
+        # The next request, or code running after it in this thread, reads the primary
+        self.assertIsNone(routers._state.get())
+        self.assertEqual(routers.ReplicaRouter().db_for_read(Student), 'default')
+
+    def test_replicas_require_a_shared_cache(self):
+        self.assertEqual([error.id for error in routers.check_sticky_cache(None)],
+                         ['eesa_backend.E001'])
+        use_shared_cache(self)
+        self.assertEqual(routers.check_sticky_cache(None), [])
+        with override_settings(REPLICA_DATABASES=[], CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        }):
+            self.assertEqual(routers.check_sticky_cache(None), [])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class StudentImportJobLeaseTests(TestCase):
+    CSV = 'first_name,last_name,email,phone,enrollment_year,course,branch\n' + ''.join(
+        f'First{i},Last{i},student{i}@example.com,,2024,BTech,Electrical\n' for i in range(5)
+    )
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.job = StudentImportJob.objects.create(
+            csv_file=ContentFile(self.CSV.encode(), name='students.csv'), send_welcome_email=False
+        )
+
+    def expire_lease(self):
+        StudentImportJob.objects.filter(pk=self.job.pk).update(
+            heartbeat_at=timezone.now() - timedelta(seconds=settings.STUDENT_IMPORT_LEASE_SECONDS + 1)
+        )
+
+    def test_live_lease_is_not_claimed(self):
+        self.assertEqual(claim_student_import_job().pk, self.job.pk)
+        self.assertIsNone(claim_student_import_job())
+
+    def test_expired_lease_is_resumed_after_the_last_chunk(self):
+        import_rows = StudentImporter.import_rows
+        calls = []
+
+        def die_on_second_chunk(importer, rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise KeyboardInterrupt  # the worker is killed mid-chunk
+            return import_rows(importer, rows)
+
+        job = claim_student_import_job()
+        with mock.patch.object(StudentImporter, 'import_rows', die_on_second_chunk):
+            with self.assertRaises(KeyboardInterrupt):
+                run_student_import_job(job, chunk_size=2, workers=1)
+        self.assertEqual(Student.objects.count(), 2)
+        self.assertIsNone(claim_student_import_job())
+
+        self.expire_lease()
+        with self.assertLogs('users.utils', 'WARNING'):
+            job = claim_student_import_job()
+        self.assertEqual(job.pk, self.job.pk)
+        job = run_student_import_job(job, chunk_size=2, workers=1)
+
+        self.assertEqual((job.status, job.rows_done, job.rows_failed), ('completed', 5, 0))
+        self.assertEqual(
+            sorted(CustomUser.objects.filter(user_type='student').values_list('username', flat=True)),
+            [f'first{i}.last{i}' for i in range(5)]
+        )
+
+    def test_lost_lease_rolls_back_the_chunk(self):
+        import_rows = StudentImporter.import_rows
+
+        def taken_over_mid_chunk(importer, rows):
+            result = import_rows(importer, rows)
+            self.expire_lease()
+            claim_student_import_job()
+            return result
+
+        job = claim_student_import_job()
+        with mock.patch.object(StudentImporter, 'import_rows', taken_over_mid_chunk), \
+                self.assertLogs('users.utils', 'WARNING'):
+            job = run_student_import_job(job, chunk_size=2, workers=1)
+
+        self.assertEqual(job.status, 'running')
+        self.assertEqual(job.rows_processed, 0)
+        self.assertFalse(Student.objects.exists())
+
+
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN every query the main faculty and student endpoints run and fail
+    if any of them reads a whole table; every one is filtered by the user
+    """
+    # (URL name, role, query params)
+    ENDPOINTS = [
+        ('attendance-list', 'faculty', {}),
+        ('attendance-list', 'student', {}),
+        ('attendance-summary', 'faculty', {}),
+        ('attendance-summary', 'student', {}),
+        ('facultysubject-list', 'faculty', {}),
+        ('facultysubject-list', 'student', {}),
+        ('internal-mark-list', 'faculty', {}),
+        ('internal-mark-list', 'student', {}),
+        ('assignment-list', 'faculty', {}),
+        ('assignment-list', 'student', {}),
+        ('assignment-submission-list', 'faculty', {}),
+        ('assignment-submission-list', 'student', {}),
+        ('study-material-list', 'faculty', {}),
+        ('study-material-list', 'student', {}),
+        ('note-list', 'student', {}),
+        ('note-list', 'faculty', {'status': 'pending'}),
+        ('note-pending', 'faculty', {}),
+        ('note-my-notes', 'student', {}),
+        ('student-list', 'student', {}),
+        ('student-list', 'faculty', {'batch': '2022-2026'}),
+    ]
+
+    SQLITE_SCAN = re.compile(r'\bSCAN (\S+)')
+    POSTGRESQL_SCAN = re.compile(r'Seq Scan on (\S+)')
+
+    @classmethod
+    def setUpTestData(cls):
+        """A few related rows per table, so every endpoint has data to return"""
+        now = timezone.now()
+        faculty = create_faculty()
+        student, = create_students(1)
+        subject = Subject.objects.create(code='EE101', name='Circuits', semester=1)
+        FacultySubject.objects.create(faculty=faculty, subject=subject, batch=student.batch)
+        Attendance.objects.create(student=student, subject=subject, faculty=faculty,
+                                  date=now.date(), hour=1, present=True)
+        AttendanceSummary.objects.create(student=student, subject=subject, total=1, present=1)
+        InternalMark.objects.create(student=student, subject=subject, faculty=faculty,
+                                    test_name='Internal 1', max_mark=50, obtained_mark=40)
+        assignment = Assignment.objects.create(title='Assignment 1', description='', subject=subject,
+                                               faculty=faculty, batch=student.batch, due_date=now)
+        AssignmentSubmission.objects.create(assignment=assignment, student=student,
+                                            file='assignment_submissions/1.pdf')
+        StudyMaterial.objects.create(title='Material 1', description='', subject=subject,
+                                     faculty=faculty, batch=student.batch,
+                                     file='study_materials/1.pdf')
+        Note.objects.create(title='Circuits', description='', file='notes/c.pdf',
+                            uploaded_by=student, subject='Circuits')
+        cls.users = {'faculty': faculty.user, 'student': student.user}
+
+    def setUp(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest(f'Query plan checks support SQLite and PostgreSQL, not {connection.vendor}')
+        if connection.vendor == 'postgresql':
+            # Small tables would be scanned anyway; only fall back to a scan
+            # when no index can serve the query
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        cache.clear()
+
+    def full_scans(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                details = [row[-1] for row in cursor.fetchall()]
+                return [
+                    match.group(1) for detail in details
+                    for match in [self.SQLITE_SCAN.search(detail)]
+                    # FTS lookups show up as scans of their virtual tables
+                    if match and 'VIRTUAL TABLE' not in detail
+                    and match.group(1) not in ('CONSTANT', '(subquery')
+                ]
+            cursor.execute(f'EXPLAIN {sql}')
+            return [
+                match.group(1) for (line,) in cursor.fetchall()
+                for match in [self.POSTGRESQL_SCAN.search(line)] if match
+            ]
+
+    def test_no_full_table_scans(self):
+        for url_name, role, params in self.ENDPOINTS:
+            with self.subTest(endpoint=url_name, role=role):
+                client = APIClient()
+                client.force_authenticate(user=self.users[role])
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(reverse(url_name), params)
+                self.assertEqual(response.status_code, 200)
+
+                for query in queries.captured_queries:
+                    if query['sql'].lstrip().upper().startswith('SELECT'):
+                        self.assertEqual(self.full_scans(query['sql']), [], query['sql'])
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                   EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_DELAY=60)
+class SendOutboxTests(TestCase):
+    """send_outbox against the locmem email backend"""
+
+    def queue(self, *recipients):
+        return OutboxEmail.objects.bulk_create([
+            OutboxEmail(subject='Welcome', body='Your password is secret', recipients=[recipient])
+            for recipient in recipients
+        ])
+
+    def make_due(self):
+        OutboxEmail.objects.filter(status='pending').update(next_attempt_at=timezone.now())
+
+    def reject(self, address):
+        """Patch the backend to fail messages to `address`"""
+        send_messages = EmailBackend.send_messages
+
+        def send(backend, messages):
+            if any(address in message.to for message in messages):
+                raise ConnectionRefusedError(f'{address} refused')
+            return send_messages(backend, messages)
+        return mock.patch.object(EmailBackend, 'send_messages', send)
+
+    def test_sends_due_emails(self):
+        self.queue('a@example.com', 'b@example.com')
+        self.assertEqual(send_outbox(), (2, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['a@example.com', 'b@example.com'])
+        # Sent emails drop their body, which may hold a password
+        self.assertEqual(list(OutboxEmail.objects.order_by().values_list('status', 'body').distinct()),
+                         [('sent', '')])
+        self.assertEqual(send_outbox(), (0, 0))
+
+    def test_failures_back_off_then_give_up(self):
+        self.queue('good@example.com', 'bad@example.com')
+        bad = OutboxEmail.objects.get(recipients=['bad@example.com'])
+
+        with self.reject('bad@example.com'):
+            for attempt, delay in [(1, 60), (2, 120)]:
+                began = timezone.now()
+                self.assertEqual(send_outbox()[1], 1)
+                bad.refresh_from_db()
+                self.assertEqual((bad.status, bad.attempts), ('pending', attempt))
+                self.assertIn('refused', bad.last_error)
+                self.assertGreaterEqual(bad.next_attempt_at, began + timedelta(seconds=delay))
+                self.assertLess(bad.next_attempt_at, began + timedelta(seconds=delay + 5))
+                # Not due again until the delay has passed
+                self.assertEqual(send_outbox(), (0, 0))
+                self.make_due()
+
+            with self.assertLogs('users.utils', 'ERROR'):
+                self.assertEqual(send_outbox(), (0, 1))
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), ('failed', 3))
+        self.make_due()
+        self.assertEqual(send_outbox(), (0, 0))
+        self.assertEqual([message.to for message in mail.outbox], [['good@example.com']])
+
+    def test_claimed_batch_is_not_sent_twice(self):
+        self.queue('a@example.com', 'b@example.com', 'c@example.com')
+        send_messages = EmailBackend.send_messages
+        concurrent = []
+
+        def send(backend, messages):
+            # Another sender runs while this one is part way through its batch
+            if not concurrent:
+                concurrent.append(None)
+                concurrent[0] = send_outbox()
+            return send_messages(backend, messages)
+
+        with mock.patch.object(EmailBackend, 'send_messages', send):
+            self.assertEqual(send_outbox(batch_size=2), (2, 0))
+        self.assertEqual(concurrent, [(1, 0)])
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['a@example.com', 'b@example.com', 'c@example.com'])
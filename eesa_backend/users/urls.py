@@ -5,11 +5,14 @@ from . import views
 router = DefaultRouter()
 router.register(r'students', views.StudentViewSet, basename='student')
 router.register(r'faculty', views.FacultyViewSet, basename='faculty')
+router.register(r'import-jobs', views.StudentImportJobViewSet, basename='student-import-job')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('register/', views.RegisterView.as_view(), name='register'),
     path('login/', views.login_view, name='login'),
+    path('admin/dashboard-stats/', views.admin_dashboard_stats, name='admin_dashboard_stats'),
+    path('people/autocomplete/', views.people_autocomplete, name='people_autocomplete'),
     
     # Custom student endpoints (these are now handled by viewset actions)
     # path('students/by-year/', ...),  # Use /students/by_year/ instead
@@ -27,6 +30,10 @@ urlpatterns = [
 # /students/{id}/promote/ - Promote a specific student
 # /students/statistics/ - Get student statistics
 
+# Background student CSV imports (admin only):
+# /import-jobs/ - Upload a CSV (POST, returns 202) or list jobs (GET)
+# /import-jobs/{id}/ - Job status with rows done, rows failed and ETA
+
 # Similar endpoints for faculty:
 # /faculty/ - List all faculty (GET) or create new (POST)
 # /faculty/{id}/ - Retrieve (GET), update (PUT/PATCH), or delete (DELETE) faculty
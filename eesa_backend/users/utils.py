@@ -1,21 +1,40 @@
 # users/utils.py
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
 import string
 import random
 import csv
 import io
+import os
+import uuid
+import logging
+from collections import defaultdict
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from django.core.management.base import BaseCommand
-from django.core.mail import send_mail
+from django.contrib.auth.hashers import make_password
+from django.core.mail import EmailMessage, get_connection
+from django.core.cache import cache
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from .models import CustomUser, Student, Faculty
+from .signals import validate_student_data
+from .sequences import allocate, max_sequence
+from .search import index_profiles
+from .authentication import invalidate_user_tokens
+
+logger = logging.getLogger(__name__)
 
 def calculate_current_semester(enrollment_year, course='BTech'):
     """
     Calculate current semester based on enrollment year
     """
-    current_year = timezone.now().year
-    current_month = timezone.now().month
+    now = timezone.now()
+    current_year = now.year
+    current_month = now.month
     
     # Assuming academic year starts in August
     if current_month >= 8:
@@ -37,12 +56,109 @@ def calculate_current_semester(enrollment_year, course='BTech'):
     
     return min(calculated_sem, max_semesters.get(course, 8))
 
-def generate_student_id(enrollment_year, course, branch, sequence_number=None):
+def count_subquery(queryset, group_by, aggregate=None):
     """
-    Generate student ID based on enrollment year, course, and branch
-    Format: YEAR_COURSE_BRANCH_SEQUENCE
-    Example: 2022_BT_CS_001
+    Turn a correlated queryset into a scalar subquery that returns COUNT(*)
+    (or the given aggregate), defaulting to 0, so several figures can be
+    annotated onto one outer query. Grouping by the correlated field keeps
+    the subquery to a single row.
+    """
+    aggregate = aggregate or Count('pk')
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values(group_by).annotate(value=aggregate).values('value')
+        ),
+        0
+    )
+
+def _batch_dashboard_version_key(batch):
+    return f'dashboard:batch:{batch}:version'
+
+# Every dashboard shows the approved notes total
+NOTES_DASHBOARD_VERSION_KEY = 'dashboard:notes:version'
+
+def _dashboard_versions(batch):
+    """
+    Current cache versions of a batch's assignments and of the approved
+    notes; each is replaced whenever what it covers changes
+    """
+    keys = [_batch_dashboard_version_key(batch), NOTES_DASHBOARD_VERSION_KEY]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+def get_cached_student_dashboard(student_id, batch):
+    """
+    Return the cached dashboard for a student, or None if it is missing or
+    was cached under older batch or notes versions
+    """
+    cached = cache.get(f'dashboard:student:{student_id}')
+    if cached and cached.get('versions') == _dashboard_versions(batch):
+        return cached['stats']
+    return None
+
+def cache_student_dashboard(student_id, batch, stats):
+    cache.set(
+        f'dashboard:student:{student_id}',
+        {'versions': _dashboard_versions(batch), 'stats': stats},
+        settings.DASHBOARD_CACHE_TIMEOUT
+    )
+
+def invalidate_student_dashboards(student_ids):
+    """Drop cached dashboards for these students once the current transaction commits"""
+    keys = [f'dashboard:student:{student_id}' for student_id in student_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+def invalidate_batch_dashboards(batch):
+    """Expire every cached dashboard in a batch by moving it to a new version"""
+    key = _batch_dashboard_version_key(batch)
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, None))
+
+def invalidate_notes_dashboards():
+    """Expire every cached student dashboard after the approved notes total changes"""
+    transaction.on_commit(lambda: cache.set(NOTES_DASHBOARD_VERSION_KEY, uuid.uuid4().hex, None))
+
+def _batch_student_count_key(batch):
+    return f'batch:{batch}:student_count'
+
+def get_batch_student_counts(batches):
+    """
+    Number of students in each batch. Counts are cached per batch and the
+    missing ones are filled in with a single grouped query.
     """
+    keys = {_batch_student_count_key(batch): batch for batch in batches}
+    cached = cache.get_many(keys.keys())
+    counts = {keys[key]: count for key, count in cached.items()}
+    
+    missing = [batch for batch in batches if batch not in counts]
+    if missing:
+        fresh = dict.fromkeys(missing, 0)
+        fresh.update(
+            Student.objects.filter(batch__in=missing)
+            .order_by()
+            .values_list('batch')
+            .annotate(count=Count('pk'))
+        )
+        cache.set_many(
+            {_batch_student_count_key(batch): count for batch, count in fresh.items()},
+            settings.DASHBOARD_CACHE_TIMEOUT
+        )
+        counts.update(fresh)
+    
+    return counts
+
+def invalidate_batch_student_counts(batches):
+    """Drop cached student counts for these batches once the transaction commits"""
+    keys = [_batch_student_count_key(batch) for batch in batches]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+def student_id_prefix(enrollment_year, course, branch):
+    """Year, course and branch part of a student ID, e.g. 22BTCS"""
     year_code = str(enrollment_year)[-2:]  # Last 2 digits of year
     
     course_codes = {
@@ -56,25 +172,55 @@ def generate_student_id(enrollment_year, course, branch, sequence_number=None):
     # Simple branch code (first 2 letters)
     branch_code = branch[:2].upper() if branch else 'XX'
     
+    return f"{year_code}{course_code}{branch_code}"
+
+def allocate_student_ids(enrollment_year, course, branch, count=1):
+    """Reserve `count` unused student IDs for a year/course/branch in one statement"""
+    prefix = student_id_prefix(enrollment_year, course, branch)
+    sequence_numbers = allocate(
+        f'student:{prefix}', count,
+        seed=lambda: max_sequence(
+            Student.objects.filter(student_id__startswith=prefix)
+            .values_list('student_id', flat=True).iterator(),
+            prefix
+        )
+    )
+    return [f"{prefix}{number:03d}" for number in sequence_numbers]
+
+def generate_student_id(enrollment_year, course, branch, sequence_number=None):
+    """
+    Generate student ID based on enrollment year, course, and branch
+    Format: YEAR_COURSE_BRANCH_SEQUENCE
+    Example: 2022_BT_CS_001
+    Without a sequence_number the next free one is allocated.
+    """
     if sequence_number is None:
-        # Generate random sequence if not provided
-        sequence_number = random.randint(1, 999)
+        return allocate_student_ids(enrollment_year, course, branch)[0]
     
-    return f"{year_code}{course_code}{branch_code}{sequence_number:03d}"
+    return f"{student_id_prefix(enrollment_year, course, branch)}{sequence_number:03d}"
 
 def generate_faculty_id(department, joining_year, sequence_number=None):
     """
     Generate faculty ID based on department and joining year
     Format: DEPT_YEAR_SEQUENCE
     Example: CS_22_001
+    Without a sequence_number the next free one is allocated.
     """
     dept_code = department[:2].upper() if department else 'XX'
     year_code = str(joining_year)[-2:]  # Last 2 digits of year
+    prefix = f"{dept_code}{year_code}"
     
     if sequence_number is None:
-        sequence_number = random.randint(1, 999)
+        sequence_number = allocate(
+            f'faculty:{prefix}',
+            seed=lambda: max_sequence(
+                Faculty.objects.filter(faculty_id__startswith=prefix)
+                .values_list('faculty_id', flat=True).iterator(),
+                prefix
+            )
+        )[0]
     
-    return f"{dept_code}{year_code}{sequence_number:03d}"
+    return f"{prefix}{sequence_number:03d}"
 
 def generate_random_password(length=12):
     """
@@ -84,92 +230,349 @@ def generate_random_password(length=12):
     password = ''.join(random.choice(characters) for _ in range(length))
     return password
 
-def bulk_create_students_from_csv(csv_file):
+def _init_hash_worker():
+    """Make sure Django is configured in password hashing worker processes"""
+    import django
+    django.setup()
+
+@contextmanager
+def password_hash_pool(workers=None):
     """
-    Create multiple students from a CSV file
-    Expected CSV format: first_name,last_name,email,phone,enrollment_year,course,branch
+    Process pool for hash_passwords, shared by every chunk of an import.
+    Yields None (hash in-process) when there is only one worker. Only the
+    background import worker uses a pool; forking from a threaded web
+    worker is not safe.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker) as pool:
+        yield pool
+
+def hash_passwords(passwords, pool=None):
     """
-    created_students = []
-    errors = []
+    Hash passwords with the configured hasher, spread over `pool` when one
+    is given (see password_hash_pool). Hashing is deliberately slow (and
+    CPU bound), so for an import of hundreds of users it dominates the run
+    time when done one by one.
+    """
+    if pool is None or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
     
-    csv_reader = csv.DictReader(csv_file)
-    for row_num, row in enumerate(csv_reader, start=2):  # Start from 2 (header is 1)
-        try:
-            # Generate username and password
-            username = f"{row['first_name'].lower()}.{row['last_name'].lower()}"
-            username = username.replace(' ', '')
-            
-            # Ensure unique username
-            base_username = username
-            counter = 1
-            while CustomUser.objects.filter(username=username).exists():
-                username = f"{base_username}{counter}"
-                counter += 1
-            
-            password = generate_random_password()
-            
-            # Create user
-            user = CustomUser.objects.create_user(
-                username=username,
-                email=row['email'],
-                first_name=row['first_name'],
-                last_name=row['last_name'],
-                phone_number=row.get('phone', ''),
-                user_type='student'
-            )
-            user.set_password(password)
-            user.save()
-            
-            # Generate student ID
-            student_id = generate_student_id(
-                int(row['enrollment_year']),
-                row['course'],
-                row['branch']
-            )
-            
-            # Ensure unique student ID
-            while Student.objects.filter(student_id=student_id).exists():
-                student_id = generate_student_id(
-                    int(row['enrollment_year']),
-                    row['course'],
-                    row['branch']
-                )
-            
-            # Create student profile
-            student = Student.objects.create(
-                user=user,
-                student_id=student_id,
-                enrollment_year=int(row['enrollment_year']),
-                current_semester=calculate_current_semester(
-                    int(row['enrollment_year']),
-                    row['course']
-                ),
-                course=row['course'],
-                branch=row['branch'],
-                batch=f"{row['enrollment_year']}-{int(row['enrollment_year'])+4}",
-                cgpa=float(row.get('cgpa', 0)) if row.get('cgpa') else None,
-                father_name=row.get('father_name', ''),
-                mother_name=row.get('mother_name', ''),
-                parent_phone=row.get('parent_phone', ''),
-                permanent_address=row.get('permanent_address', ''),
-                current_address=row.get('current_address', '')
-            )
-            
+    # Each hash takes far longer than handing it to a worker, so no chunking
+    return list(pool.map(make_password, passwords))
+
+def _unique_username(first_name, last_name, taken):
+    """first.last, or first.lastN when taken; `taken` is updated in place"""
+    base_username = f"{first_name.lower()}.{last_name.lower()}".replace(' ', '')
+    username = base_username
+    counter = 1
+    while username in taken:
+        username = f"{base_username}{counter}"
+        counter += 1
+    taken.add(username)
+    return username
+
+def _insert_students(entries):
+    """
+    bulk_create the users, then their profiles; post_save signals are
+    skipped, so the people search entries are written here
+    """
+    users = CustomUser.objects.bulk_create([entry['user'] for entry in entries])
+    for entry, user in zip(entries, users):
+        entry['student'].user = user
+    students = Student.objects.bulk_create([entry['student'] for entry in entries])
+    index_profiles(students=students)
+
+class StudentImporter:
+    """
+    Batch pipeline for creating students from CSV rows.
+    
+    Existing usernames are loaded into a set once and kept across calls,
+    so a large file can be fed through import_rows() a chunk at a time.
+    Student IDs are reserved from the ID sequence with one statement per
+    year/course/branch in each call. Passwords are hashed in `pool` when
+    one is given (see password_hash_pool), and users and profiles are inserted with bulk_create in chunks
+    of chunk_size, each chunk in its own transaction. If a chunk fails,
+    its rows are retried one by one so the error is reported against the
+    right row.
+    """
+    def __init__(self, chunk_size=200, pool=None):
+        self.chunk_size = chunk_size
+        self.pool = pool
+        self.taken_usernames = set(CustomUser.objects.values_list('username', flat=True))
+    
+    def build_entry(self, row_num, row):
+        """Unsaved user and profile for one row; raises on invalid data"""
+        enrollment_year = int(row['enrollment_year'])
+        username = _unique_username(row['first_name'], row['last_name'], self.taken_usernames)
+        
+        user = CustomUser(
+            username=username,
+            email=row['email'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            phone_number=row.get('phone', ''),
+            user_type='student'
+        )
+        
+        # student_id is allocated for the whole chunk in import_rows()
+        student = Student(
+            enrollment_year=enrollment_year,
+            current_semester=calculate_current_semester(enrollment_year, row['course']),
+            course=row['course'],
+            branch=row['branch'],
+            batch=f"{enrollment_year}-{enrollment_year + 4}",
+            cgpa=float(row.get('cgpa', 0)) if row.get('cgpa') else None,
+            father_name=row.get('father_name', ''),
+            mother_name=row.get('mother_name', ''),
+            parent_phone=row.get('parent_phone', ''),
+            permanent_address=row.get('permanent_address', ''),
+            current_address=row.get('current_address', '')
+        )
+        # Same checks the pre_save signal applies to single saves
+        validate_student_data(Student, student)
+        
+        return {
+            'row_num': row_num,
+            'row': row,
+            'user': user,
+            'student': student,
+            'password': generate_random_password()
+        }
+    
+    def import_rows(self, numbered_rows):
+        """
+        Create students for an iterable of (row_num, row dict) pairs.
+        Returns (created_students, errors) in the shape
+        bulk_create_students_from_csv has always returned.
+        """
+        created_students = []
+        errors = []
+        
+        # Build unsaved users and profiles, validating each row on its own
+        entries = []
+        for row_num, row in numbered_rows:
+            try:
+                entries.append(self.build_entry(row_num, row))
+            except Exception as e:
+                errors.append({
+                    'row_num': row_num,
+                    'error': str(e),
+                    'data': row
+                })
+        
+        # Reserve a block of student IDs per year/course/branch
+        by_prefix = defaultdict(list)
+        for entry in entries:
+            student = entry['student']
+            by_prefix[(student.enrollment_year, student.course, student.branch)].append(student)
+        for (enrollment_year, course, branch), students in by_prefix.items():
+            student_ids = allocate_student_ids(enrollment_year, course, branch, len(students))
+            for student, student_id in zip(students, student_ids):
+                student.student_id = student_id
+        
+        hashed = hash_passwords([entry['password'] for entry in entries], self.pool)
+        for entry, password_hash in zip(entries, hashed):
+            entry['user'].password = password_hash
+        
+        created = []
+        for start in range(0, len(entries), self.chunk_size):
+            chunk = entries[start:start + self.chunk_size]
+            try:
+                with transaction.atomic():
+                    _insert_students(chunk)
+                created.extend(chunk)
+            except Exception:
+                # Find the offending rows by retrying the chunk row by row
+                for entry in chunk:
+                    entry['user'].pk = None
+                    entry['student'].pk = None
+                    try:
+                        with transaction.atomic():
+                            _insert_students([entry])
+                        created.append(entry)
+                    except Exception as e:
+                        errors.append({
+                            'row_num': entry['row_num'],
+                            'error': str(e),
+                            'data': entry['row']
+                        })
+        
+        # bulk_create skips the signals that keep these caches current
+        if created:
+            from .counters import increment
+            increment({'students': len(created)})
+            invalidate_batch_student_counts({entry['student'].batch for entry in created})
+        
+        for entry in created:
             created_students.append({
-                'student': student,
-                'username': username,
-                'password': password,
-                'row_num': row_num
+                'student': entry['student'],
+                'username': entry['user'].username,
+                'password': entry['password'],
+                'row_num': entry['row_num']
             })
+        errors.sort(key=lambda error: error['row_num'])
+        
+        return created_students, errors
+
+def bulk_create_students_from_csv(csv_file, chunk_size=200):
+    """
+    Create multiple students from a CSV file, hashing passwords in-process
+    Expected CSV format: first_name,last_name,email,phone,enrollment_year,course,branch
+    """
+    importer = StudentImporter(chunk_size=chunk_size)
+    csv_reader = csv.DictReader(csv_file)
+    # Start from 2 (header is 1)
+    return importer.import_rows(enumerate(csv_reader, start=2))
+
+STUDENT_EXPORT_HEADERS = [
+    'Student ID', 'Username', 'First Name', 'Last Name', 'Email', 'Phone',
+    'Enrollment Year', 'Current Semester', 'Course', 'Branch', 'Batch',
+    'CGPA', 'Father Name', 'Mother Name', 'Parent Phone',
+    'Permanent Address', 'Current Address', 'Status'
+]
+
+class ImportLeaseLost(Exception):
+    """Another worker took over the import job after its lease expired"""
+
+def claim_student_import_job():
+    """
+    Take the oldest queued import job, or a running job whose worker stopped
+    renewing its lease (STUDENT_IMPORT_LEASE_SECONDS), and mark it running
+    with a fresh lease. The claim is an UPDATE conditional on the status and
+    heartbeat just read, so two workers can never claim the same job.
+    Returns the job, or None if there is nothing to run.
+    """
+    from .models import StudentImportJob
+    expired = timezone.now() - timedelta(seconds=settings.STUDENT_IMPORT_LEASE_SECONDS)
+    claimable = StudentImportJob.objects.filter(
+        Q(status='queued')
+        | Q(status='running', heartbeat_at__lt=expired)
+        | Q(status='running', heartbeat_at__isnull=True)
+    ).order_by('created_at')
+    
+    for job_id, status, heartbeat_at in claimable.values_list('pk', 'status', 'heartbeat_at')[:5]:
+        now = timezone.now()
+        fields = {'status': 'running', 'heartbeat_at': now}
+        if status == 'queued':
+            fields['started_at'] = now
+        claimed = StudentImportJob.objects.filter(
+            pk=job_id, status=status, heartbeat_at=heartbeat_at
+        ).update(**fields)
+        if claimed:
+            if status == 'running':
+                logger.warning(f"Taking over student import job {job_id} after its lease expired")
+            return StudentImportJob.objects.get(pk=job_id)
+    return None
+
+def _renew_import_lease(job, **fields):
+    """
+    Save `fields` on the job and renew its lease, provided this worker
+    still holds it; raises ImportLeaseLost otherwise
+    """
+    from .models import StudentImportJob
+    now = timezone.now()
+    renewed = StudentImportJob.objects.filter(
+        pk=job.pk, status='running', heartbeat_at=job.heartbeat_at
+    ).update(heartbeat_at=now, **fields)
+    if not renewed:
+        raise ImportLeaseLost(f"Student import job {job.pk} was taken over by another worker")
+    job.heartbeat_at = now
+
+def run_student_import_job(job, chunk_size=200, workers=None, max_errors=1000):
+    """
+    Import a job's CSV file chunk by chunk. The file is streamed through
+    csv.DictReader, so only one chunk of rows is held in memory at a time.
+    Passwords are hashed in one process pool of `workers` processes
+    (default: CPU count) for the whole job.
+    
+    Each chunk's students, welcome emails and progress are committed in one
+    transaction that also renews the job's lease, so a job taken over from
+    a dead worker resumes after its last committed chunk without importing
+    any row twice. If the lease was lost, the chunk is rolled back and the
+    job is left to the worker that took it over.
+    
+    Generated passwords only ever reach the students through the welcome
+    email; they are not stored on the job, and the outbox clears the email
+    body once it has been sent.
+    """
+    try:
+        with password_hash_pool(workers) as pool, job.csv_file.open('rb') as raw:
+            importer = StudentImporter(chunk_size=chunk_size, pool=pool)
+            text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+            job.total_rows = sum(1 for _ in csv.DictReader(text))
+            _renew_import_lease(job, total_rows=job.total_rows)
             
-        except Exception as e:
-            errors.append({
-                'row_num': row_num,
-                'error': str(e),
-                'data': row
-            })
+            text.seek(0)
+            # Start from 2 (header is 1), after the rows a previous worker committed
+            rows = islice(enumerate(csv.DictReader(text), start=2), job.rows_processed, None)
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                
+                with transaction.atomic():
+                    created_students, errors = importer.import_rows(chunk)
+                    
+                    if job.send_welcome_email:
+                        queue_welcome_emails(
+                            (item['student'].user, item['password']) for item in created_students
+                        )
+                    
+                    job.rows_done += len(created_students)
+                    job.rows_failed += len(errors)
+                    job.errors.extend(
+                        {'row_num': error['row_num'], 'error': error['error']}
+                        for error in errors[:max(max_errors - len(job.errors), 0)]
+                    )
+                    _renew_import_lease(job, rows_done=job.rows_done,
+                                        rows_failed=job.rows_failed, errors=job.errors)
+    except ImportLeaseLost as e:
+        logger.warning(str(e))
+        job.refresh_from_db()
+        return job
+    except Exception as e:
+        logger.exception(f"Student import job {job.pk} failed")
+        job.status = 'failed'
+        job.failure_reason = str(e)
+    else:
+        job.status = 'completed'
     
-    return created_students, errors
+    job.finished_at = timezone.now()
+    try:
+        _renew_import_lease(job, status=job.status, failure_reason=job.failure_reason,
+                            finished_at=job.finished_at)
+    except ImportLeaseLost as e:
+        logger.warning(str(e))
+        job.refresh_from_db()
+    return job
+
+def student_export_row(student):
+    """
+    One CSV row for a student, in STUDENT_EXPORT_HEADERS order
+    """
+    return [
+        student.student_id,
+        student.user.username,
+        student.user.first_name,
+        student.user.last_name,
+        student.user.email,
+        student.user.phone_number,
+        student.enrollment_year,
+        student.current_semester,
+        student.course,
+        student.branch,
+        student.batch,
+        student.cgpa or '',
+        student.father_name,
+        student.mother_name,
+        student.parent_phone,
+        student.permanent_address,
+        student.current_address,
+        'Active' if student.is_active else 'Inactive'
+    ]
 
 def export_students_to_csv(queryset, include_passwords=False):
     """
@@ -179,12 +582,7 @@ def export_students_to_csv(queryset, include_passwords=False):
     writer = csv.writer(output)
     
     # Header
-    headers = [
-        'Student ID', 'Username', 'First Name', 'Last Name', 'Email', 'Phone',
-        'Enrollment Year', 'Current Semester', 'Course', 'Branch', 'Batch',
-        'CGPA', 'Father Name', 'Mother Name', 'Parent Phone',
-        'Permanent Address', 'Current Address', 'Status'
-    ]
+    headers = list(STUDENT_EXPORT_HEADERS)
     
     if include_passwords:
         headers.append('Password')
@@ -192,37 +590,32 @@ def export_students_to_csv(queryset, include_passwords=False):
     writer.writerow(headers)
     
     # Data rows
-    for student in queryset:
-        row = [
-            student.student_id,
-            student.user.username,
-            student.user.first_name,
-            student.user.last_name,
-            student.user.email,
-            student.user.phone_number,
-            student.enrollment_year,
-            student.current_semester,
-            student.course,
-            student.branch,
-            student.batch,
-            student.cgpa or '',
-            student.father_name,
-            student.mother_name,
-            student.parent_phone,
-            student.permanent_address,
-            student.current_address,
-            'Active' if student.is_active else 'Inactive'
-        ]
-        
-        writer.writerow(row)
+    for student in queryset.select_related('user'):
+        writer.writerow(student_export_row(student))
     
     output.seek(0)
     return output
 
-def send_welcome_email(user, password=None):
+class _Echo:
+    """File-like object whose write() hands the formatted line straight back"""
+    def write(self, value):
+        return value
+
+def iter_students_csv(queryset, chunk_size=2000):
     """
-    Send welcome email to new user
+    Yield the student export CSV line by line. Rows are read with the user
+    join in chunks of chunk_size, so memory stays flat however many
+    students are exported; meant for StreamingHttpResponse.
     """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(STUDENT_EXPORT_HEADERS)
+    
+    for student in queryset.select_related('user').iterator(chunk_size=chunk_size):
+        yield writer.writerow(student_export_row(student))
+
+def _welcome_email(user, password=None):
+    """Unsaved outbox row holding the welcome email for a new user"""
+    from .models import OutboxEmail
     subject = 'Welcome to EESA System'
     message = f"""
     Dear {user.get_full_name()},
@@ -240,13 +633,117 @@ def send_welcome_email(user, password=None):
     EESA Team
     """
     
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [user.email],
-        fail_silently=False,
+    return OutboxEmail(
+        subject=subject,
+        body=message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipients=[user.email]
+    )
+
+def send_welcome_email(user, password=None):
+    """
+    Queue welcome email to new user; the send_outbox command delivers it
+    """
+    email = _welcome_email(user, password)
+    email.save()
+    return email
+
+def queue_welcome_emails(credentials):
+    """Queue welcome emails for (user, password) pairs with one INSERT"""
+    from .models import OutboxEmail
+    return OutboxEmail.objects.bulk_create(
+        [_welcome_email(user, password) for user, password in credentials]
+    )
+
+def claim_outbox_batch(batch_size, now):
+    """
+    Claim up to batch_size due outbox emails by moving each one's
+    next_attempt_at past EMAIL_OUTBOX_LEASE_SECONDS. Each claim is an
+    UPDATE conditional on the next_attempt_at just read, so two senders
+    never claim the same email; where the database can, the candidates are
+    also read with SKIP LOCKED so concurrent senders pick different rows.
+    No lock is held while the emails are sent. An email claimed by a
+    sender that dies is sent again once its lease runs out.
+    """
+    from .models import OutboxEmail
+    lease_until = now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+    with transaction.atomic():
+        due = (
+            OutboxEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'pk')
+        )
+        if transaction.get_connection().features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        
+        claimed = []
+        for email in due[:batch_size]:
+            if OutboxEmail.objects.filter(
+                pk=email.pk, status='pending', next_attempt_at=email.next_attempt_at
+            ).update(next_attempt_at=lease_until):
+                email.next_attempt_at = lease_until
+                claimed.append(email)
+    return claimed
+
+def send_outbox(batch_size=None, max_attempts=None, retry_delay=None):
+    """
+    Send one batch of due outbox emails over a single email connection.
+    The batch is claimed first (see claim_outbox_batch), so several senders
+    can run at once. Each message is handed to send_messages() on its own
+    so one bad address only fails that message; failures are retried with
+    exponential backoff and marked failed after max_attempts tries.
+    Returns (sent, failed) counts for the batch.
+    """
+    from .models import OutboxEmail
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    retry_delay = settings.EMAIL_OUTBOX_RETRY_DELAY if retry_delay is None else retry_delay
+    
+    now = timezone.now()
+    batch = claim_outbox_batch(batch_size, now)
+    if not batch:
+        return 0, 0
+    
+    sent, failed = [], []
+    try:
+        connection = get_connection(fail_silently=False)
+        with connection:
+            for email in batch:
+                message = EmailMessage(
+                    email.subject, email.body, email.from_email or None,
+                    email.recipients, connection=connection
+                )
+                try:
+                    connection.send_messages([message])
+                    sent.append(email)
+                except Exception as e:
+                    email.last_error = str(e)
+                    failed.append(email)
+    except Exception as e:
+        # Could not open (or cleanly close) the connection: retry what wasn't sent
+        sent_ids = {email.pk for email in sent}
+        for email in batch:
+            if email.pk not in sent_ids and email not in failed:
+                email.last_error = str(e)
+                failed.append(email)
+    
+    for email in sent:
+        email.status = 'sent'
+        email.sent_at = now
+        email.body = ''
+    
+    for email in failed:
+        email.attempts += 1
+        if email.attempts >= max_attempts:
+            email.status = 'failed'
+            logger.error(f"Giving up on email {email.pk} to {email.recipients}: {email.last_error}")
+        else:
+            delay = retry_delay * 2 ** (email.attempts - 1)
+            email.next_attempt_at = now + timedelta(seconds=delay)
+    
+    OutboxEmail.objects.bulk_update(
+        batch, ['status', 'sent_at', 'body', 'attempts', 'next_attempt_at', 'last_error']
     )
+    return len(sent), len(failed)
 
 def get_academic_year():
     """
@@ -277,16 +774,118 @@ def get_current_academic_semester():
     else:
         return "Even"
 
-def update_all_student_semesters(dry_run=False, enrollment_year=None):
+def update_student_semesters(queryset, dry_run=False, groups_per_statement=100):
+    """
+    Set-based semester update for the students in queryset.
+    
+    Every student in an (enrollment_year, course) group has the same target
+    semester, so the current semesters are read as counts per group and
+    semester (one grouped query), the targets are computed once per group,
+    and the changed rows are written with UPDATE ... SET current_semester =
+    CASE ... statements covering groups_per_statement groups each. Groups
+    whose target is below semester 1 (enrollment year in the future) are
+    reported as errors and left alone, as the per-row save would reject
+    them. Bypasses save() and its signals, so the caches those signals
+    would expire (batch and student dashboards, and the students' cached
+    token users, which carry the profile) are expired explicitly.
+    """
+    counts = defaultdict(dict)
+    rows = (
+        queryset.order_by()
+        .values_list('enrollment_year', 'course', 'current_semester')
+        .annotate(count=Count('id'))
+    )
+    for year, course, semester, count in rows:
+        counts[(year, course)][semester] = count
+    
+    total_students = 0
+    updated_count = 0
+    error_count = 0
+    results = []
+    changes = {}
+    
+    for (year, course), semesters in sorted(counts.items()):
+        group_total = sum(semesters.values())
+        total_students += group_total
+        target = calculate_current_semester(year, course)
+        
+        if target < 1:
+            error_count += group_total
+            results.append({
+                'enrollment_year': year,
+                'course': course,
+                'count': group_total,
+                'error': f"Calculated semester {target} is before semester 1",
+                'status': 'error'
+            })
+            continue
+        
+        changed = group_total - semesters.get(target, 0)
+        if changed:
+            changes[(year, course)] = target
+            updated_count += changed
+            results.append({
+                'enrollment_year': year,
+                'course': course,
+                'count': changed,
+                'old_semesters': {
+                    semester: count for semester, count in sorted(semesters.items())
+                    if semester != target
+                },
+                'new_semester': target,
+                'status': 'updated' if not dry_run else 'would_update'
+            })
+    
+    if changes and not dry_run:
+        groups = list(changes.items())
+        with transaction.atomic():
+            for start in range(0, len(groups), groups_per_statement):
+                chunk = groups[start:start + groups_per_statement]
+                stale = Q()
+                for (year, course), target in chunk:
+                    stale |= Q(enrollment_year=year, course=course) & ~Q(current_semester=target)
+                stale = queryset.filter(stale)
+                
+                affected = list(stale.order_by().values_list('pk', 'user_id', 'batch'))
+                for batch in {batch for _, _, batch in affected}:
+                    invalidate_batch_dashboards(batch)
+                invalidate_student_dashboards([student_id for student_id, _, _ in affected])
+                invalidate_user_tokens(*[user_id for _, user_id, _ in affected])
+                
+                stale.update(
+                    current_semester=Case(
+                        *[When(enrollment_year=year, course=course, then=Value(target))
+                          for (year, course), target in chunk],
+                        default=F('current_semester')
+                    ),
+                    updated_at=timezone.now()
+                )
+    
+    return {
+        'total_students': total_students,
+        'updated_count': updated_count,
+        'error_count': error_count,
+        'unchanged_count': total_students - updated_count - error_count,
+        'results': results,
+        'dry_run': dry_run
+    }
+
+def update_all_student_semesters(dry_run=False, enrollment_year=None, set_based=False):
     """
     Update all student semesters based on their enrollment year
     Used as a management command function
+    With set_based=True the update runs as a few UPDATE statements (see
+    update_student_semesters) and results are reported per
+    (enrollment_year, course) group instead of per student.
     """
     # Get students to update
     students = Student.objects.filter(is_active=True)
     if enrollment_year:
         students = students.filter(enrollment_year=enrollment_year)
     
+    if set_based:
+        return update_student_semesters(students, dry_run=dry_run)
+    
     total_students = students.count()
     updated_count = 0
     error_count = 0
@@ -333,5 +932,7 @@ class UpdateSemestersCommand:
     This can be called from views or as a scheduled task
     """
     @staticmethod
-    def execute(dry_run=False, enrollment_year=None):
-        return update_all_student_semesters(dry_run=dry_run, enrollment_year=enrollment_year)
\ No newline at end of file
+    def execute(dry_run=False, enrollment_year=None, set_based=False):
+        return update_all_student_semesters(
+            dry_run=dry_run, enrollment_year=enrollment_year, set_based=set_based
+        )
\ No newline at end of file
@@ -1,18 +1,29 @@
-from rest_framework import viewsets, generics, status, permissions
+from rest_framework import viewsets, generics, status, permissions, mixins
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes, action
 from django.contrib.auth import authenticate
 from rest_framework.authtoken.models import Token
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Sum, OuterRef
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from .models import CustomUser, Student, Faculty
+from .models import CustomUser, Student, Faculty, StudentImportJob
 from .serializers import (
     CustomUserSerializer, StudentSerializer, FacultySerializer,
     StudentCreateSerializer, FacultyCreateSerializer,
-    StudentUpdateSerializer, FacultyUpdateSerializer
+    StudentUpdateSerializer, FacultyUpdateSerializer,
+    StudentListSerializer, FacultyListSerializer, StudentImportJobSerializer
+)
+from .forms import BulkStudentUploadForm
+from .permissions import IsOwnerOrAdminOrReadOnly, IsAdmin, IsAdminOrFaculty, IsFaculty, IsStudent
+from .counters import read_counters
+from .pagination import KeysetPagination
+from .principal import get_principal
+from .search import AUTOCOMPLETE_LIMIT, matching_profile_ids, search_entries
+from .utils import (
+    count_subquery, get_cached_student_dashboard, cache_student_dashboard,
+    get_batch_student_counts, iter_students_csv
 )
-from .permissions import IsOwnerOrAdminOrReadOnly, IsAdmin, IsFaculty, IsStudent
 
 # Register view
 class RegisterView(generics.CreateAPIView):
@@ -125,16 +136,22 @@ def login_view(request):
 class StudentViewSet(viewsets.ModelViewSet):
     queryset = Student.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.action == 'create':
             return StudentCreateSerializer
         elif self.action in ['update', 'partial_update']:
             return StudentUpdateSerializer
+        elif self.action == 'list' and self.is_compact():
+            return StudentListSerializer
         return StudentSerializer
     
+    def is_compact(self):
+        return self.request.query_params.get('view') == 'compact'
+    
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         queryset = Student.objects.select_related('user').all()
         
         # Filter by enrollment year
@@ -167,36 +184,60 @@ class StudentViewSet(viewsets.ModelViewSet):
         if is_active is not None:
             queryset = queryset.filter(is_active=is_active.lower() == 'true')
         
-        # Search functionality
+        # Search functionality (name, email, username or ID via the people search index)
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                Q(student_id__icontains=search) |
-                Q(user__first_name__icontains=search) |
-                Q(user__last_name__icontains=search) |
-                Q(user__email__icontains=search) |
-                Q(user__username__icontains=search)
-            )
+            queryset = queryset.filter(pk__in=matching_profile_ids('student', search))
         
         # Permission-based filtering
-        if user.is_superuser or user.user_type in ['admin', 'faculty']:
+        if principal.is_admin_or_faculty:
             return queryset
-        elif user.user_type == 'student':
+        elif principal.is_student:
             # Students can only see their own profile
-            return queryset.filter(user=user)
+            return queryset.filter(user_id=principal.user_id)
         
         return queryset.none()
     
     def list(self, request, *args, **kwargs):
-        """Override list to return data as a list for compatibility"""
+        """
+        Override list to return data as a list for compatibility.
+        Sending ?page_size= or ?cursor= opts in to keyset pagination, and
+        ?view=compact returns the short list fields straight from values().
+        """
         queryset = self.filter_queryset(self.get_queryset())
+        
+        if self.is_compact():
+            rows = self.get_serializer_class().values(queryset)
+            page = self.paginate_queryset(rows)
+            if page is not None:
+                return self.get_paginated_response(page)
+            return Response(list(rows))
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminOrFaculty])
+    def export(self, request):
+        """Stream the filtered student list as CSV"""
+        # The rows are read after the view returns, once the replica routing
+        # for this request has ended, so pick the database now
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.using(queryset.db)
+        response = StreamingHttpResponse(
+            iter_students_csv(queryset), content_type='text/csv'
+        )
+        response['Content-Disposition'] = 'attachment; filename="students.csv"'
+        return response
+    
     @action(detail=False, methods=['get'])
     def me(self, request):
         """Get current student's profile"""
-        if request.user.user_type != 'student':
+        if not get_principal(request).is_student:
             return Response(
                 {'error': 'Not a student user'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -215,105 +256,104 @@ class StudentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def dashboard_stats(self, request):
         """Get dashboard statistics for current student"""
-        if request.user.user_type != 'student':
+        if not get_principal(request).is_student:
             return Response(
                 {'error': 'Not a student user'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        try:
-            student = Student.objects.get(user=request.user)
-            
-            # Initialize stats with default values
-            stats = {
-                'profile': StudentSerializer(student).data,
-                'attendance': {
-                    'total': 0,
-                    'present': 0,
-                    'percentage': 0
-                },
-                'assignments': {
-                    'total': 0,
-                    'submitted': 0,
-                    'pending': 0
-                },
-                'notes': {
-                    'approved': 0
-                },
-                'internals': {
-                    'total': 0,
-                    'subjects': []
-                }
-            }
-            
-            # Try to get attendance stats
-            try:
-                from academics.models import Attendance
-                total_attendance = Attendance.objects.filter(student=student).count()
-                present_count = Attendance.objects.filter(student=student, present=True).count()
-                attendance_percentage = (present_count / total_attendance * 100) if total_attendance > 0 else 0
-                
-                stats['attendance'] = {
-                    'total': total_attendance,
-                    'present': present_count,
-                    'percentage': round(attendance_percentage, 2)
-                }
-            except Exception as e:
-                print(f"Error fetching attendance: {e}")
-            
-            # Try to get assignment stats
-            try:
-                from academics.models import Assignment, AssignmentSubmission
-                assignments = Assignment.objects.filter(batch=student.batch)
-                submitted = AssignmentSubmission.objects.filter(student=student).count()
-                pending = assignments.count() - submitted
-                
-                stats['assignments'] = {
-                    'total': assignments.count(),
-                    'submitted': submitted,
-                    'pending': max(0, pending)
-                }
-            except Exception as e:
-                print(f"Error fetching assignments: {e}")
-            
-            # Try to get notes count
-            try:
-                from library.models import Note
-                approved_notes = Note.objects.filter(status='approved').count()
-                stats['notes']['approved'] = approved_notes
-            except Exception as e:
-                print(f"Error fetching notes: {e}")
-            
-            # Try to get internal marks
-            try:
-                from academics.models import InternalMark
-                internal_marks = InternalMark.objects.filter(student=student)
-                stats['internals']['total'] = internal_marks.count()
-            except Exception as e:
-                print(f"Error fetching internal marks: {e}")
-            
-            return Response(stats)
-            
-        except Student.DoesNotExist:
+        principal = get_principal(request)
+        if principal.student_id is None:
             return Response(
                 {'error': 'Student profile not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        # The principal already holds the batch, so a cache hit reads no profile
+        stats = get_cached_student_dashboard(principal.student_id, principal.batch)
+        if stats is not None:
+            return Response(stats)
+        
+        from academics.models import (AttendanceSummary, Assignment, 
+                                      AssignmentSubmission, InternalMark)
+        from library.models import Note
+        
+        # Every figure is a scalar subquery, so the whole dashboard is one SELECT
+        student = Student.objects.select_related('user').annotate(
+            attendance_total=count_subquery(
+                AttendanceSummary.objects.filter(student=OuterRef('pk')), 'student',
+                Sum('total')
+            ),
+            attendance_present=count_subquery(
+                AttendanceSummary.objects.filter(student=OuterRef('pk')), 'student',
+                Sum('present')
+            ),
+            assignments_total=count_subquery(
+                Assignment.objects.filter(batch=OuterRef('batch')), 'batch'
+            ),
+            assignments_submitted=count_subquery(
+                AssignmentSubmission.objects.filter(
+                    student=OuterRef('pk'), assignment__batch=OuterRef('batch')
+                ),
+                'student', Count('assignment', distinct=True)
+            ),
+            internals_total=count_subquery(
+                InternalMark.objects.filter(student=OuterRef('pk')), 'student'
+            ),
+            notes_approved=count_subquery(
+                Note.objects.filter(status='approved'), 'status'
+            ),
+        ).get(pk=principal.student_id)
+        
+        attendance_percentage = (
+            student.attendance_present / student.attendance_total * 100
+            if student.attendance_total > 0 else 0
+        )
+        
+        stats = {
+            'profile': StudentSerializer(student).data,
+            'attendance': {
+                'total': student.attendance_total,
+                'present': student.attendance_present,
+                'percentage': round(attendance_percentage, 2)
+            },
+            'assignments': {
+                'total': student.assignments_total,
+                'submitted': student.assignments_submitted,
+                'pending': max(0, student.assignments_total - student.assignments_submitted)
+            },
+            'notes': {
+                'approved': student.notes_approved
+            },
+            'internals': {
+                'total': student.internals_total,
+                'subjects': []
+            }
+        }
+        
+        cache_student_dashboard(student.pk, student.batch, stats)
+        return Response(stats)
 
 # Faculty viewset
 class FacultyViewSet(viewsets.ModelViewSet):
     queryset = Faculty.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.action == 'create':
             return FacultyCreateSerializer
         elif self.action in ['update', 'partial_update']:
             return FacultyUpdateSerializer
+        elif self.action == 'list' and self.is_compact():
+            return FacultyListSerializer
         return FacultySerializer
     
+    def is_compact(self):
+        return self.request.query_params.get('view') == 'compact'
+    
     def get_queryset(self):
-        user = self.request.user
+        principal = get_principal(self.request)
         queryset = Faculty.objects.select_related('user').all()
         
         # Filter by department
@@ -331,37 +371,48 @@ class FacultyViewSet(viewsets.ModelViewSet):
         if is_active is not None:
             queryset = queryset.filter(is_active=is_active.lower() == 'true')
         
-        # Search functionality
+        # Search functionality (name, email, username, ID or department via the people search index)
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                Q(faculty_id__icontains=search) |
-                Q(user__first_name__icontains=search) |
-                Q(user__last_name__icontains=search) |
-                Q(user__email__icontains=search) |
-                Q(department__icontains=search)
-            )
+            queryset = queryset.filter(pk__in=matching_profile_ids('faculty', search))
         
         # Permission-based filtering
-        if user.is_superuser or user.user_type == 'admin':
+        if principal.is_admin:
             return queryset
-        elif user.user_type == 'faculty':
+        elif principal.is_faculty:
             return queryset  # Faculty can see all faculty
-        elif user.user_type == 'student':
+        elif principal.is_student:
             return queryset  # Students can see all faculty
         
         return queryset
     
     def list(self, request, *args, **kwargs):
-        """Override list to return data as a list for compatibility"""
+        """
+        Override list to return data as a list for compatibility.
+        Sending ?page_size= or ?cursor= opts in to keyset pagination, and
+        ?view=compact returns the short list fields straight from values().
+        """
         queryset = self.filter_queryset(self.get_queryset())
+        
+        if self.is_compact():
+            rows = self.get_serializer_class().values(queryset)
+            page = self.paginate_queryset(rows)
+            if page is not None:
+                return self.get_paginated_response(page)
+            return Response(list(rows))
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def me(self, request):
         """Get current faculty's profile"""
-        if request.user.user_type != 'faculty':
+        if not get_principal(request).is_faculty:
             return Response(
                 {'error': 'Not a faculty user'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -380,131 +431,147 @@ class FacultyViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def dashboard_stats(self, request):
         """Get dashboard statistics for current faculty"""
-        if request.user.user_type != 'faculty':
+        if not get_principal(request).is_faculty:
             return Response(
                 {'error': 'Not a faculty user'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        from academics.models import FacultySubject, Assignment, StudyMaterial
+        from academics.serializers import FacultySubjectSerializer
+        from library.models import Note
+        
+        # Profile and every count in one SELECT
         try:
-            faculty = Faculty.objects.get(user=request.user)
-            
-            # Initialize stats with default values
-            stats = {
-                'profile': FacultySerializer(faculty).data,
-                'subjects': {
-                    'total': 0,
-                    'list': []
-                },
-                'students': {
-                    'total': 0
-                },
-                'assignments': {
-                    'total': 0,
-                    'active': 0
-                },
-                'notes': {
-                    'pending_review': 0
-                },
-                'study_materials': {
-                    'total': 0
-                }
-            }
-            
-            # Try to get subjects taught
-            try:
-                from academics.models import FacultySubject
-                from academics.serializers import FacultySubjectSerializer
-                subjects = FacultySubject.objects.filter(faculty=faculty)
-                
-                stats['subjects'] = {
-                    'total': subjects.count(),
-                    'list': FacultySubjectSerializer(subjects, many=True).data
-                }
-                
-                # Get students count (students in batches faculty teaches)
-                batches = subjects.values_list('batch', flat=True).distinct()
-                students_count = Student.objects.filter(batch__in=batches).count()
-                stats['students']['total'] = students_count
-                
-            except Exception as e:
-                print(f"Error fetching subjects: {e}")
-            
-            # Try to get assignments created
-            try:
-                from academics.models import Assignment
-                assignments = Assignment.objects.filter(faculty=faculty)
-                active_assignments = assignments.filter(due_date__gte=timezone.now())
-                
-                stats['assignments'] = {
-                    'total': assignments.count(),
-                    'active': active_assignments.count()
-                }
-            except Exception as e:
-                print(f"Error fetching assignments: {e}")
-            
-            # Try to get pending notes for review
-            try:
-                from library.models import Note
-                pending_notes = Note.objects.filter(status='pending').count()
-                stats['notes']['pending_review'] = pending_notes
-            except Exception as e:
-                print(f"Error fetching pending notes: {e}")
-            
-            # Try to get study materials
-            try:
-                from academics.models import StudyMaterial
-                study_materials = StudyMaterial.objects.filter(faculty=faculty)
-                stats['study_materials']['total'] = study_materials.count()
-            except Exception as e:
-                print(f"Error fetching study materials: {e}")
-            
-            return Response(stats)
-            
+            faculty = Faculty.objects.select_related('user').annotate(
+                assignments_total=count_subquery(
+                    Assignment.objects.filter(faculty=OuterRef('pk')), 'faculty'
+                ),
+                assignments_active=count_subquery(
+                    Assignment.objects.filter(faculty=OuterRef('pk')), 'faculty',
+                    Count('pk', filter=Q(due_date__gte=timezone.now()))
+                ),
+                study_materials_total=count_subquery(
+                    StudyMaterial.objects.filter(faculty=OuterRef('pk')), 'faculty'
+                ),
+                notes_pending=count_subquery(
+                    Note.objects.filter(status='pending'), 'status'
+                ),
+            ).get(user=request.user)
         except Faculty.DoesNotExist:
             return Response(
                 {'error': 'Faculty profile not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        # Names for the serializer come from the same query
+        subjects = list(
+            FacultySubject.objects.filter(faculty=faculty)
+            .select_related('subject', 'faculty__user')
+        )
+        
+        # Students in the batches the faculty teaches, from the per-batch cache
+        batch_counts = get_batch_student_counts({subject.batch for subject in subjects})
+        
+        stats = {
+            'profile': FacultySerializer(faculty).data,
+            'subjects': {
+                'total': len(subjects),
+                'list': FacultySubjectSerializer(subjects, many=True).data
+            },
+            'students': {
+                'total': sum(batch_counts.values())
+            },
+            'assignments': {
+                'total': faculty.assignments_total,
+                'active': faculty.assignments_active
+            },
+            'notes': {
+                'pending_review': faculty.notes_pending
+            },
+            'study_materials': {
+                'total': faculty.study_materials_total
+            }
+        }
+        
+        return Response(stats)
+
+# Background CSV imports
+class StudentImportJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                              mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Queue bulk student CSV uploads and poll their progress. The upload
+    returns 202 straight away; run_import_worker does the import.
+    """
+    queryset = StudentImportJob.objects.select_related('created_by')
+    serializer_class = StudentImportJobSerializer
+    permission_classes = [IsAdmin]
+    
+    def create(self, request, *args, **kwargs):
+        form = BulkStudentUploadForm(request.data, request.FILES)
+        if not form.is_valid():
+            return Response({'error': form.errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        job = StudentImportJob.objects.create(
+            csv_file=form.cleaned_data['csv_file'],
+            send_welcome_email=form.cleaned_data['send_welcome_email'],
+            created_by=request.user
+        )
+        serializer = self.get_serializer(job)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+# People search
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def people_autocomplete(request):
+    """
+    Top matches for ?q= among students and faculty, for search boxes.
+    ?type=student or ?type=faculty narrows the search; students only
+    ever get faculty back, matching what the list endpoints show them.
+    """
+    kinds = ['student', 'faculty']
+    requested = request.query_params.get('type')
+    if requested:
+        if requested not in kinds:
+            return Response({'error': 'type must be student or faculty'}, 
+                            status=status.HTTP_400_BAD_REQUEST)
+        kinds = [requested]
+    
+    if not get_principal(request).is_admin_or_faculty:
+        kinds = [kind for kind in kinds if kind == 'faculty']
+    
+    results = search_entries(request.query_params.get('q', ''), kinds).values(
+        'kind', 'profile_id', 'user_id', 'name', 'identifier', 'email'
+    )[:AUTOCOMPLETE_LIMIT]
+    
+    return Response([
+        {
+            'type': row['kind'],
+            'id': row['profile_id'],
+            'user': row['user_id'],
+            'name': row['name'],
+            'identifier': row['identifier'],
+            'email': row['email']
+        }
+        for row in results
+    ])
 
 # Admin dashboard stats
 @api_view(['GET'])
 @permission_classes([IsAdmin])
 def admin_dashboard_stats(request):
     """Get dashboard statistics for admin"""
-    try:
-        stats = {
-            'students': Student.objects.count(),
-            'faculty': Faculty.objects.count(),
-            'subjects': 0,
-            'notes': 0,
-            'events': 0,
-            'pending_notes': 0
-        }
-        
-        # Try to get additional stats
-        try:
-            from academics.models import Subject
-            stats['subjects'] = Subject.objects.count()
-        except:
-            pass
-        
-        try:
-            from library.models import Note
-            stats['notes'] = Note.objects.count()
-            stats['pending_notes'] = Note.objects.filter(status='pending').count()
-        except:
-            pass
-        
-        try:
-            from events.models import Event
-            stats['events'] = Event.objects.count()
-        except:
-            pass
-        
-        return Response(stats)
-    except Exception as e:
-        return Response(
-            {'error': f'Error fetching stats: {str(e)}'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+    counters = read_counters([
+        'students', 'faculty', 'subjects', 'notes', 'events', 'notes_pending'
+    ])
+    
+    stats = {
+        'students': counters['students'],
+        'faculty': counters['faculty'],
+        'subjects': counters['subjects'],
+        'notes': counters['notes'],
+        'events': counters['events'],
+        'pending_notes': counters['notes_pending']
+    }
+    
+    return Response(stats)
\ No newline at end of file